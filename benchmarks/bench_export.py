@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导出性能测试
+生成分层的模拟依赖图，对比整体渲染（中间图 + 拼接字符串）与流式导出的耗时、首块延迟和峰值内存
+
+用法: python benchmarks/bench_export.py [--views N] [--fanout N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from dependency_graph import DependencyGraph  # noqa: E402
+from export_manager import (ExportGraph, iter_chunks, iter_dot, iter_mermaid,  # noqa: E402
+                            render_dot, render_mermaid, walk_dependencies)
+
+
+def generate_graph(views: int, tables: int, fanout: int, seed: int = 42) -> DependencyGraph:
+    """生成模拟依赖图：视图 v{i} 依赖编号更大的视图或表，根视图 v0 依赖所有第一层视图"""
+    rng = random.Random(seed)
+    objects = {f"v{i:05d}": 'view' for i in range(views)}
+    objects.update({f"t{i:05d}": 'table' for i in range(tables)})
+    definitions = {}
+    for i in range(views):
+        deps = [f"t{rng.randrange(tables):05d}" for _ in range(fanout // 2)]
+        deps += [f"v{rng.randrange(i + 1, views):05d}" for _ in range(fanout - len(deps)) if i + 1 < views]
+        definitions[f"v{i:05d}"] = ' '.join(deps)
+    definitions["v00000"] += ' ' + ' '.join(f"v{i:05d}" for i in range(1, views))
+    return DependencyGraph.build(objects, definitions, str.split)
+
+
+def measure(name: str, produce):
+    """运行导出函数，输出总耗时、首块延迟、输出大小和峰值内存"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    size = 0
+    for chunk in produce():
+        if first is None:
+            first = time.perf_counter() - start
+        size += len(chunk)
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<16} 总耗时 {total * 1000:8.1f}ms  首块 {first * 1000:8.2f}ms  "
+          f"输出 {size / 1024:8.0f}KB  峰值内存 {peak / 1024 / 1024:6.1f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='导出性能测试')
+    parser.add_argument('--views', type=int, default=4000)
+    parser.add_argument('--tables', type=int, default=2000)
+    parser.add_argument('--fanout', type=int, default=5)
+    args = parser.parse_args()
+
+    graph = generate_graph(args.views, args.tables, args.fanout)
+    print(f"对象数: {len(graph)}  边数: {graph.edge_count}\n")
+
+    measure('mermaid 整体', lambda: [render_mermaid(ExportGraph.build(graph, 'v00000'))])
+    measure('mermaid 流式', lambda: iter_chunks(iter_mermaid(walk_dependencies(graph, 'v00000'))))
+    measure('dot 整体', lambda: [render_dot(ExportGraph.build(graph, 'v00000'))])
+    measure('dot 流式', lambda: iter_chunks(iter_dot(walk_dependencies(graph, 'v00000'))))
+
+
+if __name__ == '__main__':
+    main()
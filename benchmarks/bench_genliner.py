@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GenLiner 依赖遍历性能测试
+生成分层菱形依赖图（每层 width 个视图，每个视图依赖下一层的全部视图，路径数为 width^layers），
+对比旧的按路径复制 visited 的递归实现与当前的迭代实现
+
+用法: python benchmarks/bench_genliner.py [--width N] [--max-layers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Set
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.GenLiner import TableDependencyAnalyzer  # noqa: E402
+
+# 旧实现在层数超过该值后耗时过长，不再运行
+LEGACY_MAX_LAYERS = 14
+
+LAYER_STEPS = [2, 4, 6, 8, 10, 12, 14, 32, 64, 128, 256]
+
+
+def build_analyzer(layers: int, width: int) -> TableDependencyAnalyzer:
+    """构造分层菱形依赖图（直接填充 dependency_map，不连接数据库）"""
+    analyzer = TableDependencyAnalyzer(db_connection=None)
+    analyzer.dependency_map['root'] = {f"v0_{i}" for i in range(width)}
+    for layer in range(layers):
+        next_layer = {f"v{layer + 1}_{i}" for i in range(width)} if layer + 1 < layers else {'base'}
+        for i in range(width):
+            analyzer.dependency_map[f"v{layer}_{i}"] = next_layer
+    analyzer.dependency_map['base'] = set()
+    return analyzer
+
+
+def legacy_full_dependencies(analyzer, table_name: str, visited: Set[str] = None) -> Dict[str, Set[str]]:
+    """旧实现：每个分支复制 visited，菱形依赖按路径重复展开"""
+    if visited is None:
+        visited = set()
+    if table_name in visited:
+        return {}
+    visited.add(table_name)
+    dependencies = analyzer.get_dependencies_for_table(table_name)
+    result = {table_name: dependencies}
+    for dep in dependencies:
+        result.update(legacy_full_dependencies(analyzer, dep, visited.copy()))
+    return result
+
+
+def legacy_format(deps_dict: Dict[str, Set[str]], current_table: str, depth: int = 0,
+                  visited: Set[str] = None) -> str:
+    """旧实现：按路径展开完整的树"""
+    if visited is None:
+        visited = set()
+    if current_table in visited:
+        return f"{'  ' * depth}{current_table} (circular reference)\n"
+    visited.add(current_table)
+    result = f"{'  ' * depth}{current_table}\n"
+    for dep in sorted(deps_dict.get(current_table, ())):
+        result += f"{'  ' * (depth + 1)}-> {dep}\n"
+        if deps_dict.get(dep):
+            result += legacy_format(deps_dict, dep, depth + 2, visited.copy())
+    visited.remove(current_table)
+    return result
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='GenLiner 依赖遍历性能测试')
+    parser.add_argument('--width', type=int, default=2)
+    parser.add_argument('--max-layers', type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{'层数':>6} {'旧遍历(ms)':>12} {'旧输出(ms)':>12} {'旧输出行数':>12} "
+          f"{'新遍历(ms)':>12} {'新输出(ms)':>12} {'新输出行数':>12}")
+    for layers in [n for n in LAYER_STEPS if n <= args.max_layers]:
+        analyzer = build_analyzer(layers, args.width)
+
+        legacy = ['-'] * 3
+        if layers <= LEGACY_MAX_LAYERS:
+            deps, walk_ms = timed(lambda: legacy_full_dependencies(analyzer, 'root'))
+            text, format_ms = timed(lambda: legacy_format(deps, 'root'))
+            legacy = [f"{walk_ms:.1f}", f"{format_ms:.1f}", str(text.count('\n'))]
+
+        deps, walk_ms = timed(lambda: analyzer.get_full_dependencies_recursive('root'))
+        text, format_ms = timed(lambda: analyzer._format_full_dependency_tree(deps, 'root'))
+        print(f"{layers:>6} {legacy[0]:>12} {legacy[1]:>12} {legacy[2]:>12} "
+              f"{walk_ms:>12.2f} {format_ms:>12.2f} {text.count(chr(10)):>12}")
+
+
+if __name__ == '__main__':
+    main()
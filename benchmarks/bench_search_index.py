@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表搜索索引性能测试
+生成指定数量的模拟表/视图（分层前缀 + 业务词 + 中文注释），输出索引构建耗时和
+前缀、分词、纠错、中文注释、拼音等各类查询的延迟 p50/p99
+
+用法: python benchmarks/bench_search_index.py [--objects N] [--rounds N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from search_index import SearchIndex  # noqa: E402
+
+LAYERS = ['ods', 'dwd', 'dws', 'ads', 'dim', 'tmp']
+WORDS = ['user', 'order', 'live', 'anchor', 'gift', 'pay', 'refund', 'room', 'fans', 'device',
+         'channel', 'active', 'retention', 'revenue', 'detail', 'summary', 'daily', 'hour']
+COMMENT_WORDS = ['用户', '订单', '直播', '主播', '礼物', '支付', '退款', '房间', '粉丝', '设备',
+                 '渠道', '活跃', '留存', '收入', '明细', '汇总', '日表', '小时表']
+QUERIES = ['d', 'dw', 'dwd_', 'dws_live', 'order', 'gift_pay', 'retention', 'room_fans_daily',
+           '直播', '主播收入', '明细', 'xyz', 'ads_user_active',
+           # 拼写纠错
+           'odrer', 'retnetion', 'anchr_revnue', 'fnas dialy',
+           # 拼音 / 首字母（需安装 pypinyin）
+           'zhibo', 'zbsr', 'yonghuliucun']
+
+
+def generate_objects(count: int, seed: int = 42) -> dict:
+    """生成模拟对象 {名称: (类型, 注释)}"""
+    rng = random.Random(seed)
+    objects = {}
+    while len(objects) < count:
+        picks = rng.sample(range(len(WORDS)), rng.randint(2, 4))
+        name = '_'.join([rng.choice(LAYERS)] + [WORDS[i] for i in picks] + [str(rng.randint(0, 999))])
+        comment = ''.join(COMMENT_WORDS[i] for i in picks) if rng.random() < 0.8 else ''
+        objects[name] = ('view' if rng.random() < 0.3 else 'table', comment)
+    return objects
+
+
+def percentile(values: list, pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='表搜索索引性能测试')
+    parser.add_argument('--objects', type=int, default=50000)
+    parser.add_argument('--rounds', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    objects = generate_objects(args.objects)
+    start = time.perf_counter()
+    index = SearchIndex(objects, 'bench')
+    print(f"对象数: {len(index)}  构建耗时: {time.perf_counter() - start:.2f}s  {index.stats()}")
+
+    print(f"\n{'查询':<20} {'结果':>4} {'p50(ms)':>9} {'p99(ms)':>9}")
+    all_latencies = []
+    for query in QUERIES:
+        latencies = []
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            results, _ = index.search(query, args.limit)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        all_latencies.extend(latencies)
+        print(f"{query:<20} {len(results):>4} {statistics.median(latencies):>9.3f} "
+              f"{percentile(latencies, 0.99):>9.3f}")
+
+    print(f"\n全部查询  p50: {statistics.median(all_latencies):.3f}ms  "
+          f"p99: {percentile(all_latencies, 0.99):.3f}ms  max: {max(all_latencies):.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
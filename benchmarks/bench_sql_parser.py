@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQL 依赖解析性能测试
+对比 utils.sql_parser 与原先基于正则的提取方式，输出每秒可解析的定义数
+
+用法: python benchmarks/bench_sql_parser.py [SQL 文件] [--rounds N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sql_parser import extract_local_dependencies  # noqa: E402
+
+DEFAULT_SQL_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                'src', 'starrocks_tables_ddl.sql')
+
+
+def legacy_extract_dependencies(sql: str) -> set:
+    """原 web_view_analyzer.py 中基于正则的提取实现（仅用于对比）"""
+    sql = re.sub(r'--.*?$', '', sql, flags=re.MULTILINE)
+    sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
+
+    dependencies = set()
+    keywords = ['SELECT', 'WHERE', 'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'UNION', 'CASE', 'ON']
+
+    pattern1 = r'(?:FROM|JOIN)\s+`?(?:\w+)`?\.`?(\w+)`?\s+(?:AS\s+)?`?\w+`?'
+    for match in re.finditer(pattern1, sql, re.IGNORECASE):
+        if match.group(1).upper() not in keywords:
+            dependencies.add(match.group(1))
+
+    pattern2 = r'(?:FROM|JOIN)\s+`?(\w+)`?\s+(?:AS\s+)?`?\w+`?'
+    for match in re.finditer(pattern2, sql, re.IGNORECASE):
+        match_start = match.start()
+        if match_start > 0 and sql[match_start - 1] == '.':
+            continue
+        if match.group(1).upper() not in keywords:
+            dependencies.add(match.group(1))
+
+    return dependencies
+
+
+def load_definitions(path: str) -> list:
+    """读取 DDL 文件并按语句切分（语句之间以空行分隔、以 CREATE 开头）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    return [stmt.strip() for stmt in re.split(r'\n\s*\n(?=CREATE\s)', text) if stmt.strip()]
+
+
+def run(name: str, func, definitions: list, rounds: int):
+    """执行多轮解析并打印吞吐量"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for sql in definitions:
+            func(sql)
+    elapsed = time.perf_counter() - start
+    total = rounds * len(definitions)
+    print(f"{name:<12} {total:>8} 条定义  {elapsed:8.3f}s  {total / elapsed:12,.0f} 条/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SQL 依赖解析性能测试')
+    parser.add_argument('sql_file', nargs='?', default=DEFAULT_SQL_FILE)
+    parser.add_argument('--rounds', type=int, default=2000)
+    parser.add_argument('--database', default='donggua')
+    args = parser.parse_args()
+
+    definitions = load_definitions(args.sql_file)
+    size = sum(len(sql) for sql in definitions)
+    print(f"文件: {args.sql_file}（{len(definitions)} 条语句，{size} 字符），轮数: {args.rounds}")
+
+    run('tokenizer', lambda sql: extract_local_dependencies(sql, args.database), definitions, args.rounds)
+    run('legacy-regex', legacy_extract_dependencies, definitions, args.rounds)
+
+    print("\n依赖提取结果:")
+    for sql in definitions:
+        deps = extract_local_dependencies(sql, args.database)
+        if deps:
+            header = sql.split('(', 1)[0].strip()
+            print(f"  {header}: {', '.join(sorted(deps))}")
+
+
+if __name__ == '__main__':
+    main()
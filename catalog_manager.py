@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+对象目录模块
+按配置/数据库在内存中缓存 表/视图 名称 -> (类型, 注释) 映射，避免逐个查询 information_schema
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config_manager import add_invalidation_listener
+from metadata_manager import MetadataManager
+
+# 对象目录探测值变化时回调的函数列表（参数为数据库配置）
+_probe_listeners: List[Callable[[Dict], None]] = []
+
+
+def add_probe_listener(listener: Callable[[Dict], None]):
+    """
+    注册对象目录探测值变化的监听器（如在后台检测按对象的元数据变化）
+
+    Args:
+        listener: 回调函数，参数为数据库配置
+    """
+    _probe_listeners.append(listener)
+
+
+class CatalogManager:
+    """单个数据库的对象目录"""
+
+    def __init__(self, config: Dict, refresh_interval: float = 60):
+        """
+        初始化对象目录（首次访问时才加载）
+
+        Args:
+            config: 数据库配置（含明文密码）
+            refresh_interval: 两次变化探测的最小间隔（秒）
+        """
+        self.config = config
+        self.database = config['database']
+        self.refresh_interval = refresh_interval
+        self.metadata_manager = MetadataManager(config)
+
+        self._objects: Optional[Dict[str, Tuple[str, str]]] = None  # name -> (type, comment)
+        self._checksum: Optional[str] = None
+        self._fingerprint_checksum: Optional[str] = None
+        self._probe: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Tuple[str, str]]:
+        """一次查询加载整个数据库的对象目录"""
+        return self._load(self.metadata_manager.get_catalog_probe())
+
+    def _load(self, probe: str) -> Dict[str, Tuple[str, str]]:
+        """加载对象目录并记录加载前的探测值（加载期间的变化会在下次探测时被发现）"""
+        objects = self.metadata_manager.get_all_objects()
+        catalog = {obj['name']: (obj['type'], obj['comment']) for obj in objects}
+        checksum = MetadataManager.compute_checksum(catalog.keys())
+        with self._lock:
+            self._objects = catalog
+            self._checksum = checksum
+            self._probe = probe
+            self._checked_at = time.monotonic()
+        return catalog
+
+    def refresh(self, snapshot: Optional[Dict] = None) -> bool:
+        """
+        判断是否需要重新加载
+
+        传入元数据快照时比较名称校验和，快照带有对象指纹时指纹变化（表类型、注释等）同样会重新加载；
+        未传入时只执行一次单行的聚合探测（见 MetadataManager.get_catalog_probe），探测值变化才重新加载，
+        并通知探测监听器（字段、视图定义等对象内容的变化由监听器按对象检测）。
+        对象名称不变时目录校验和不变，依赖图和搜索索引不会因此整体重建
+
+        Args:
+            snapshot: 已获取的元数据快照，None 表示现场探测
+
+        Returns:
+            目录是否被重新加载
+        """
+        if snapshot is None:
+            probe = self.metadata_manager.get_catalog_probe()
+            with self._lock:
+                self._checked_at = time.monotonic()
+                unchanged = self._objects is not None and probe == self._probe
+            if unchanged:
+                return False
+            self._load(probe)
+            for listener in list(_probe_listeners):
+                try:
+                    listener(self.config)
+                except Exception as e:
+                    print(f"对象目录探测回调失败: {e}")
+            return True
+
+        fingerprint_checksum = snapshot.get('fingerprint_checksum')
+        with self._lock:
+            self._checked_at = time.monotonic()
+            unchanged = (self._objects is not None and snapshot['checksum'] == self._checksum
+                         and fingerprint_checksum in (None, self._fingerprint_checksum))
+        if unchanged:
+            return False
+        self.load()
+        if fingerprint_checksum is not None:
+            with self._lock:
+                self._fingerprint_checksum = fingerprint_checksum
+        return True
+
+    def invalidate(self):
+        """清空目录，下次访问时重新加载"""
+        with self._lock:
+            self._objects = None
+            self._checksum = None
+            self._fingerprint_checksum = None
+            self._probe = None
+
+    def get_objects(self) -> Dict[str, Tuple[str, str]]:
+        """获取 名称 -> (类型, 注释) 映射（只读），必要时加载或校验刷新"""
+        objects = self._objects
+        if objects is None:
+            return self.load()
+        if time.monotonic() - self._checked_at >= self.refresh_interval and self.refresh():
+            return self._objects or self.load()
+        return objects
+
+    @property
+    def checksum(self) -> Optional[str]:
+        """当前目录对应的名称校验和"""
+        return self._checksum
+
+    def get_object_type(self, object_name: str) -> Optional[str]:
+        """获取对象类型：'table', 'view', 或 None"""
+        entry = self.get_objects().get(object_name)
+        return entry[0] if entry else None
+
+    def get_comment(self, object_name: str) -> str:
+        """获取对象在数据库中的注释"""
+        entry = self.get_objects().get(object_name)
+        return entry[1] if entry else ''
+
+    def object_exists(self, object_name: str) -> bool:
+        """判断对象（表或视图）是否存在"""
+        return object_name in self.get_objects()
+
+    def is_view(self, object_name: str) -> bool:
+        """判断对象是否为视图"""
+        return self.get_object_type(object_name) == 'view'
+
+    def list_objects(self) -> List[Dict]:
+        """
+        列出所有表和视图（按名称排序，每次返回新的字典，调用方可自由修改）
+
+        Returns:
+            对象列表
+        """
+        objects = self.get_objects()
+        return [
+            {'name': name, 'type': obj_type, 'comment': comment}
+            for name, (obj_type, comment) in sorted(objects.items())
+        ]
+
+
+# 全局对象目录注册表
+_catalogs: Dict[Tuple[str, str], CatalogManager] = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(config: Dict) -> CatalogManager:
+    """
+    获取配置对应的对象目录（按 配置ID + 数据库 共享）
+
+    Args:
+        config: 数据库配置（含明文密码）
+
+    Returns:
+        CatalogManager 实例
+    """
+    key = (config.get('id') or config['host'], config['database'])
+    with _catalogs_lock:
+        catalog = _catalogs.get(key)
+        if catalog is None:
+            catalog = CatalogManager(config)
+            _catalogs[key] = catalog
+        return catalog
+
+
+def invalidate_catalog(config_id: str):
+    """
+    移除指定配置的所有对象目录
+
+    Args:
+        config_id: 配置ID
+    """
+    with _catalogs_lock:
+        for key in [key for key in _catalogs if key[0] == config_id]:
+            del _catalogs[key]
+
+
+add_invalidation_listener(invalidate_catalog)
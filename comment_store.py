@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表/字段注释存储模块
+注释以 table_comments.json 为快照，修改以追加方式写入日志文件（每行一条 JSON），
+日志过长时合并回快照；多进程通过文件锁互斥写入，并按偏移量增量读取其他进程追加的修改
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 默认注释快照文件路径
+COMMENTS_FILE = 'table_comments.json'
+
+# 日志累积超过该条数后合并回快照
+COMPACT_THRESHOLD = 500
+
+
+class CommentStore:
+    """注释存储（快照 + 追加日志）"""
+
+    def __init__(self, path: str = COMMENTS_FILE, compact_threshold: int = COMPACT_THRESHOLD):
+        """
+        初始化注释存储
+
+        Args:
+            path: 快照文件路径
+            compact_threshold: 日志条数超过该值时自动合并
+        """
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.lock_path = path + '.lock'
+        self.compact_threshold = compact_threshold
+
+        self._comments: Dict[str, Dict] = {}
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._loaded = False
+        self._lock = threading.RLock()
+        # 每次内容变化递增，供搜索索引等判断是否需要更新
+        self.version = 0
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool):
+        """跨进程文件锁（不支持 fcntl 的平台上仅使用进程内锁）"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_fd:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
+    def _load_snapshot(self):
+        """重新读取快照和完整日志（调用方需持有文件锁）"""
+        comments: Dict[str, Dict] = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    comments = json.load(f)
+            except Exception as e:
+                print(f"加载注释文件失败: {e}")
+        self._comments = comments
+        self._snapshot_signature = self._signature(self.path)
+        self._journal_offset = 0
+        self._journal_entries = 0
+        self._read_journal()
+        self._loaded = True
+        self.version += 1
+
+    def _read_journal(self) -> int:
+        """从上次的偏移量继续读取日志并应用（调用方需持有文件锁），返回应用的条数"""
+        try:
+            with open(self.journal_path, 'rb') as f:
+                f.seek(self._journal_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+
+        # 只处理完整的行
+        end = data.rfind(b'\n') + 1
+        applied = 0
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self._comments[record['key']] = record['value']
+            applied += 1
+        self._journal_offset += end
+        self._journal_entries += applied
+        return applied
+
+    def _catch_up_locked(self):
+        """追上其他进程的修改（调用方需持有文件锁）：快照被替换时全量重载，否则只读取新增日志"""
+        journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        if (not self._loaded or self._signature(self.path) != self._snapshot_signature
+                or journal_size < self._journal_offset):
+            self._load_snapshot()
+        elif journal_size > self._journal_offset and self._read_journal():
+            self.version += 1
+
+    def sync(self):
+        """
+        检查文件是否被其他进程修改（两次 stat），有变化时读取新增日志或重新加载快照并推进 version，
+        未变化时直接使用内存中的数据
+        """
+        if self._loaded and self._signature(self.path) == self._snapshot_signature:
+            journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+            if journal_size == self._journal_offset:
+                return
+        with self._file_lock(exclusive=False):
+            self._catch_up_locked()
+
+    def get(self, table_key: str) -> Dict:
+        """
+        获取表注释
+
+        Args:
+            table_key: db.table
+
+        Returns:
+            {'table_comment', 'column_comments', 'updated_at'}，不存在时返回空字典
+        """
+        self.sync()
+        return self._comments.get(table_key, {})
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """遍历所有注释 (db.table, 注释)"""
+        self.sync()
+        return iter(list(self._comments.items()))
+
+    def set(self, table_key: str, table_comment: str, column_comments: Dict) -> Dict:
+        """
+        保存表和字段注释（追加一条日志，开销与修改大小成正比）
+
+        Args:
+            table_key: db.table
+            table_comment: 表注释
+            column_comments: {字段名: 注释}
+
+        Returns:
+            保存的注释
+        """
+        value = {
+            'table_comment': table_comment,
+            'column_comments': column_comments,
+            'updated_at': datetime.now().isoformat()
+        }
+        line = json.dumps({'key': table_key, 'value': value}, ensure_ascii=False) + '\n'
+
+        with self._file_lock(exclusive=True):
+            # 先追上其他进程的修改，保证偏移量与文件内容一致
+            self._catch_up_locked()
+
+            with open(self.journal_path, 'ab') as f:
+                f.write(line.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            self._read_journal()
+            self.version += 1
+
+            if self._journal_entries >= self.compact_threshold:
+                self._compact_locked()
+        return value
+
+    def _compact_locked(self):
+        """将当前内容写成新快照并清空日志（调用方需持有排他文件锁）"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.table_comments.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._comments, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with open(self.journal_path, 'w'):
+            pass
+        self._snapshot_signature = self._signature(self.path)
+        self._journal_offset = 0
+        self._journal_entries = 0
+
+    def compact(self):
+        """合并日志到快照"""
+        with self._file_lock(exclusive=True):
+            self._load_snapshot()
+            self._compact_locked()
+
+    def __len__(self) -> int:
+        self.sync()
+        return len(self._comments)
+
+
+# 全局注释存储实例（按文件路径）
+_stores: Dict[str, CommentStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_comment_store(path: str = COMMENTS_FILE) -> CommentStore:
+    """
+    获取注释存储实例（每个文件一个实例）
+
+    Args:
+        path: 快照文件路径
+
+    Returns:
+        CommentStore 实例
+    """
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = CommentStore(path)
+                _stores[path] = store
+    return store
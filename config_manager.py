@@ -5,13 +5,46 @@
 支持多数据库配置的创建、读取、更新、删除和加密存储
 """
 
+import atexit
 import json
 import os
+import tempfile
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Dict, Optional
-import pymysql
+from typing import Callable, List, Dict, Optional, Tuple
 from utils.encryption import encrypt_password, decrypt_password
+from utils.cache import get_cache
+from utils.connection_pool import get_pool, get_pool_manager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 影响数据库连接的字段，其他进程修改这些字段后需要重建连接池和缓存
+CONNECTION_FIELDS = ('driver', 'host', 'port', 'database', 'catalog', 'user', 'password')
+
+# 配置被修改或删除时回调的函数列表（参数为配置ID）
+_invalidation_listeners: List[Callable[[str], None]] = []
+
+
+def add_invalidation_listener(listener: Callable[[str], None]):
+    """
+    注册配置失效监听器，配置被修改或删除（包括其他进程修改）时调用
+
+    Args:
+        listener: 回调函数，参数为配置ID
+    """
+    if listener not in _invalidation_listeners:
+        _invalidation_listeners.append(listener)
+
+
+# last_used 批量写盘的时间间隔（秒）与累积条数阈值
+LAST_USED_FLUSH_INTERVAL = 60
+LAST_USED_FLUSH_COUNT = 50
 
 
 class ConfigManager:
@@ -25,12 +58,43 @@ class ConfigManager:
             config_file: 配置文件路径
         """
         self.config_file = config_file
+        self.lock_file = config_file + '.lock'
         self._configs: Dict[str, Dict] = {}
+        self._file_signature: Optional[Tuple[int, int]] = None
+        self._lock = threading.RLock()
+
+        # 尚未写盘的最后使用时间 {config_id: iso 时间}
+        self._pending_last_used: Dict[str, str] = {}
+        self._last_flush = time.monotonic()
+
         self._load_configs()
 
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        """配置文件的 (mtime_ns, size)，文件不存在时返回 None"""
+        try:
+            stat = os.stat(self.config_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程文件锁（不支持 fcntl 的平台上仅使用进程内锁）"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_file, 'a') as lock_fd:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
     def _load_configs(self):
         """从文件加载配置"""
-        if os.path.exists(self.config_file):
+        signature = self._stat_signature()
+        if signature is not None:
             try:
                 with open(self.config_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
@@ -40,19 +104,82 @@ class ConfigManager:
                 self._configs = {}
         else:
             self._configs = {}
+        self._file_signature = signature
+
+        # 本进程尚未写盘的最后使用时间覆盖到新读取的配置上
+        for config_id, last_used in self._pending_last_used.items():
+            config = self._configs.get(config_id)
+            if config is not None and (config.get('last_used') or '') < last_used:
+                config['last_used'] = last_used
+
+    def reload_if_changed(self):
+        """
+        配置文件被其他进程修改（mtime/大小变化）时重新加载，
+        并清理连接参数发生变化或已删除的配置对应的连接池和缓存
+
+        只做一次 stat，未变化时开销很小，可在每个请求中调用
+        """
+        with self._lock:
+            if self._stat_signature() == self._file_signature:
+                return
+            old_configs = self._configs
+            self._load_configs()
+
+        for config_id, old in old_configs.items():
+            new = self._configs.get(config_id)
+            if new is None or any(old.get(k) != new.get(k) for k in CONNECTION_FIELDS):
+                self._invalidate_runtime(config_id)
+
+    @staticmethod
+    def _invalidate_runtime(config_id: str):
+        """关闭配置对应的连接池、丢弃查询缓存，并通知已注册的监听器（各模块由此清理自己的运行时状态）"""
+        get_pool_manager().close_pool(config_id)
+        get_cache().invalidate_namespace(config_id)
+        for listener in list(_invalidation_listeners):
+            try:
+                listener(config_id)
+            except Exception as e:
+                print(f"配置失效回调失败: {e}")
 
     def _save_configs(self):
-        """保存配置到文件"""
+        """保存配置到文件（先写临时文件再原子替换，调用方需持有文件锁）"""
+        data = {
+            'version': '1.0',
+            'configs': list(self._configs.values())
+        }
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        fd, tmp_path = tempfile.mkstemp(prefix='.db_configs.', suffix='.tmp', dir=directory)
         try:
-            data = {
-                'version': '1.0',
-                'configs': list(self._configs.values())
-            }
-            with open(self.config_file, 'w', encoding='utf-8') as f:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_file)
         except Exception as e:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
             raise Exception(f"保存配置文件失败: {e}")
 
+        self._file_signature = self._stat_signature()
+        self._pending_last_used.clear()
+        self._last_flush = time.monotonic()
+
+    @contextmanager
+    def _transaction(self):
+        """
+        修改配置的事务：加文件锁、合并其他进程的修改，退出时原子写盘
+
+        用法:
+            with self._transaction():
+                self._configs[...] = ...
+        """
+        with self._file_lock():
+            self.reload_if_changed()
+            yield
+            self._save_configs()
+
     def create_config(self, name: str, driver: str, host: str, port: int,
                      database: str, user: str, password: str,
                      catalog: Optional[str] = None) -> Dict:
@@ -89,8 +216,8 @@ class ConfigManager:
             'last_used': None
         }
 
-        self._configs[config_id] = config
-        self._save_configs()
+        with self._transaction():
+            self._configs[config_id] = config
         return config
 
     def get_config(self, config_id: str) -> Optional[Dict]:
@@ -103,6 +230,7 @@ class ConfigManager:
         Returns:
             配置字典，如果不存在则返回 None
         """
+        self.reload_if_changed()
         config = self._configs.get(config_id)
         if config:
             # 返回副本，隐藏密码
@@ -121,6 +249,7 @@ class ConfigManager:
         Returns:
             配置字典，如果不存在则返回 None
         """
+        self.reload_if_changed()
         config = self._configs.get(config_id)
         if config:
             config_copy = config.copy()
@@ -135,6 +264,7 @@ class ConfigManager:
         Returns:
             配置列表
         """
+        self.reload_if_changed()
         configs = []
         for config in self._configs.values():
             config_copy = config.copy()
@@ -153,22 +283,24 @@ class ConfigManager:
         Returns:
             更新后的配置，如果不存在则返回 None
         """
-        if config_id not in self._configs:
-            return None
+        with self._transaction():
+            if config_id not in self._configs:
+                return None
 
-        config = self._configs[config_id]
+            config = self._configs[config_id]
 
-        # 更新允许的字段
-        allowed_fields = ['name', 'driver', 'host', 'port', 'database', 'catalog', 'user']
-        for field in allowed_fields:
-            if field in kwargs:
-                config[field] = kwargs[field]
+            # 更新允许的字段
+            allowed_fields = ['name', 'driver', 'host', 'port', 'database', 'catalog', 'user']
+            for field in allowed_fields:
+                if field in kwargs:
+                    config[field] = kwargs[field]
 
-        # 如果更新密码，需要加密
-        if 'password' in kwargs and kwargs['password']:
-            config['password'] = encrypt_password(kwargs['password'])
+            # 如果更新密码，需要加密
+            if 'password' in kwargs and kwargs['password']:
+                config['password'] = encrypt_password(kwargs['password'])
 
-        self._save_configs()
+        # 连接参数可能已变化，关闭旧连接池并丢弃各模块的运行时状态
+        self._invalidate_runtime(config_id)
         return self.get_config(config_id)
 
     def delete_config(self, config_id: str) -> bool:
@@ -181,22 +313,46 @@ class ConfigManager:
         Returns:
             是否删除成功
         """
-        if config_id in self._configs:
+        with self._transaction():
+            if config_id not in self._configs:
+                return False
             del self._configs[config_id]
-            self._save_configs()
-            return True
-        return False
+
+        self._invalidate_runtime(config_id)
+        return True
 
     def update_last_used(self, config_id: str):
         """
         更新配置的最后使用时间
 
+        只更新内存并记入待写队列，超过 LAST_USED_FLUSH_INTERVAL 秒或累积
+        LAST_USED_FLUSH_COUNT 条后批量写盘，避免每个请求都重写配置文件
+
         Args:
             config_id: 配置ID
         """
-        if config_id in self._configs:
-            self._configs[config_id]['last_used'] = datetime.now().isoformat()
-            self._save_configs()
+        with self._lock:
+            config = self._configs.get(config_id)
+            if config is None:
+                return
+            now = datetime.now().isoformat()
+            config['last_used'] = now
+            self._pending_last_used[config_id] = now
+            due = (len(self._pending_last_used) >= LAST_USED_FLUSH_COUNT
+                   or time.monotonic() - self._last_flush >= LAST_USED_FLUSH_INTERVAL)
+        if due:
+            self.flush()
+
+    def flush(self):
+        """将缓冲的最后使用时间写入配置文件"""
+        with self._lock:
+            if not self._pending_last_used:
+                return
+        try:
+            with self._transaction():
+                pass
+        except Exception as e:
+            print(f"写入最后使用时间失败: {e}")
 
     def test_connection(self, config_id: str) -> tuple[bool, str]:
         """
@@ -215,15 +371,9 @@ class ConfigManager:
         try:
             # 目前只支持 MySQL/StarRocks（使用 PyMySQL）
             if config['driver'] in ['mysql', 'starrocks']:
-                conn = pymysql.connect(
-                    host=config['host'],
-                    port=config['port'],
-                    user=config['user'],
-                    password=config['password'],
-                    database=config['database'],
-                    connect_timeout=5
-                )
-                conn.close()
+                # 通过连接池借出连接并强制 ping，成功的连接留在池中供后续请求复用
+                with get_pool(config).connection(timeout=5, connect_timeout=5) as conn:
+                    conn.ping(reconnect=False)
                 return True, "连接成功"
             else:
                 return False, f"暂不支持 {config['driver']} 数据库类型"
@@ -233,6 +383,7 @@ class ConfigManager:
 
 # 全局配置管理器实例
 _config_manager: Optional[ConfigManager] = None
+_config_manager_lock = threading.Lock()
 
 
 def get_config_manager() -> ConfigManager:
@@ -244,5 +395,8 @@ def get_config_manager() -> ConfigManager:
     """
     global _config_manager
     if _config_manager is None:
-        _config_manager = ConfigManager()
+        with _config_manager_lock:
+            if _config_manager is None:
+                _config_manager = ConfigManager()
+                atexit.register(_config_manager.flush)
     return _config_manager
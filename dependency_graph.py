@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+依赖关系图模块
+一次性读取整个数据库的视图定义，构建正向/反向邻接表，之后所有依赖查询都在内存中完成
+（图结构本身在 utils.graph 中，这里负责按配置构建、缓存和失效）
+"""
+
+import threading
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from catalog_manager import get_catalog
+from config_manager import add_invalidation_listener
+from metadata_manager import MetadataManager
+from utils.graph import DependencyGraph
+from utils.parse_cache import get_parse_cache
+
+# 全局依赖图注册表
+_graphs: Dict[Tuple[str, str], DependencyGraph] = {}
+_build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+# 内容发生变化、等待重新解析的对象（对象名称集合不变时只增量更新这些对象）
+_stale_objects: Dict[Tuple[str, str], Set[str]] = {}
+_graphs_lock = threading.Lock()
+
+
+def get_dependency_graph(config: Dict, extract: Callable[[str], Iterable[str]],
+                         view_definitions: Optional[Dict[str, str]] = None) -> DependencyGraph:
+    """
+    获取配置对应的依赖关系图，不存在或对象目录已变化时重新构建，
+    只有部分对象内容变化时增量更新
+
+    对象目录校验和只覆盖对象名称；CREATE OR REPLACE VIEW 等只修改定义的变化由快照存储按对象检测，
+    经 invalidate_graph_objects 标记（对象目录探测值变化时会在后台触发一次检测）
+
+    Args:
+        config: 数据库配置（含明文密码）
+        extract: 从 SQL 中提取依赖对象名的函数
+        view_definitions: 已批量获取的整库视图定义（需要整体构建时直接使用，不再查询）
+
+    Returns:
+        DependencyGraph 实例
+    """
+    key = (config.get('id') or config['host'], config['database'])
+    catalog = get_catalog(config)
+    objects = catalog.get_objects()
+
+    graph = _graphs.get(key)
+    if graph is not None and graph.catalog_checksum == catalog.checksum:
+        if not _stale_objects.get(key):
+            return graph
+
+    with _graphs_lock:
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    # 同一配置同时只构建一次，其余请求等待构建结果
+    with build_lock:
+        graph = _graphs.get(key)
+        # 只复制待更新的对象，新依赖图存入后才移除，读取定义或解析失败时下次请求会重试
+        with _graphs_lock:
+            stale = set(_stale_objects.get(key, ()))
+        if graph is not None and graph.catalog_checksum == catalog.checksum:
+            if not stale:
+                return graph
+            changed = {name: objects[name][0] for name in stale if name in objects}
+            view_names = [name for name, obj_type in changed.items() if obj_type == 'view']
+            changed_definitions = MetadataManager(config).get_view_definitions(view_names) if view_names else {}
+            graph = graph.patch(changed, changed_definitions, extract)
+        else:
+            if view_definitions is None:
+                view_definitions = MetadataManager(config).get_view_definitions()
+            graph = DependencyGraph.build(
+                {name: entry[0] for name, entry in objects.items()},
+                view_definitions,
+                extract,
+                catalog_checksum=catalog.checksum
+            )
+        # 构建期间新解析的视图定义立即落盘，下次启动可直接复用
+        get_parse_cache().flush()
+        with _graphs_lock:
+            _graphs[key] = graph
+            remaining = _stale_objects.get(key)
+            if remaining is not None:
+                # 构建期间新标记的对象保留到下次更新
+                remaining.difference_update(stale)
+                if not remaining:
+                    del _stale_objects[key]
+        return graph
+
+
+def peek_dependency_graph(config: Dict) -> Optional[DependencyGraph]:
+    """
+    获取已构建且仍然有效的依赖关系图，不触发构建
+
+    Args:
+        config: 数据库配置（含明文密码）
+
+    Returns:
+        DependencyGraph 实例，尚未构建、已过期或有待更新的对象时返回 None
+    """
+    key = (config.get('id') or config['host'], config['database'])
+    graph = _graphs.get(key)
+    if graph is None or graph.catalog_checksum != get_catalog(config).checksum or _stale_objects.get(key):
+        return None
+    return graph
+
+
+def invalidate_graph_objects(config: Dict, names: Iterable[str]):
+    """
+    标记内容发生变化的对象（字段、视图定义等），下次获取依赖图时只重新解析这些对象
+
+    Args:
+        config: 数据库配置
+        names: 对象名
+    """
+    key = (config.get('id') or config['host'], config['database'])
+    with _graphs_lock:
+        _stale_objects.setdefault(key, set()).update(names)
+
+
+def invalidate_dependency_graph(config_id: str):
+    """
+    移除指定配置的所有依赖关系图
+
+    Args:
+        config_id: 配置ID
+    """
+    with _graphs_lock:
+        for key in [key for key in _graphs if key[0] == config_id]:
+            del _graphs[key]
+        for key in [key for key in _stale_objects if key[0] == config_id]:
+            del _stale_objects[key]
+
+
+add_invalidation_listener(invalidate_dependency_graph)
@@ -2,12 +2,272 @@
 # -*- coding: utf-8 -*-
 """
 导出管理模块
-支持多种格式导出依赖关系
+每次导出只遍历一次依赖图，生成中间图对象（带类型的节点/边列表），再渲染为 Mermaid / DOT /
+图片 / JSON 或多格式压缩包；中间图和渲染结果按 (配置, 根对象, 最大深度, 依赖图版本) 缓存。
+超大图可用流式导出：边遍历边生成 Mermaid / DOT 文本，不保存中间图
 """
 
-from typing import Dict, List, Set, Optional
-from graphviz import Digraph
 import io
+import json
+import zipfile
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from utils.cache import get_cache, make_cache_key
+from utils.render_pool import MAX_RENDER_NODES, choose_engine, get_render_pool
+
+# 导出结果缓存时间（秒）；键中包含依赖图版本，依赖变化后自然失效
+EXPORT_CACHE_TTL = 3600
+
+# 压缩包支持的格式及文件扩展名
+BUNDLE_FORMATS = {'mermaid': 'mmd', 'dot': 'dot', 'svg': 'svg', 'png': 'png', 'json': 'json'}
+
+# 需要 Graphviz 渲染的格式（节点数超过 MAX_RENDER_NODES 时压缩包中跳过）
+IMAGE_FORMATS = ('svg', 'png')
+
+# 支持流式导出的格式
+STREAM_FORMATS = ('mermaid', 'dot')
+
+
+# 依赖图遍历事件：展开节点 (NODE, 对象名, 类型, 深度)，随后是它的每条依赖边 (EDGE, 依赖方, 被依赖方)
+NODE = 'node'
+EDGE = 'edge'
+
+# 流式导出时每次发送的文本块大小（字符）
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def walk_dependencies(graph, root: str, max_depth: Optional[int] = None) -> Iterator[Tuple]:
+    """
+    广度优先遍历依赖图并逐个产出节点/边事件（显式队列，不递归，不保存边）
+
+    Args:
+        graph: DependencyGraph 实例
+        root: 根对象名称
+        max_depth: 最大深度（根对象深度为 0，只展开深度小于 max_depth 的节点），None 表示无限制
+
+    Yields:
+        (NODE, 对象名, 类型, 深度) 或 (EDGE, 依赖方, 被依赖方)；根对象不存在时不产出任何事件
+    """
+    root_type = graph.get_object_type(root)
+    if not root_type or (max_depth is not None and max_depth <= 0):
+        return
+
+    depths = {root: 0}
+    queue = deque([(root, root_type)])
+    while queue:
+        name, obj_type = queue.popleft()
+        depth = depths[name]
+        yield NODE, name, obj_type, depth
+        if max_depth is not None and depth + 1 >= max_depth:
+            continue
+        for dep in graph.get_dependencies(name):
+            if dep not in depths:
+                depths[dep] = depth + 1
+                queue.append((dep, graph.get_object_type(dep)))
+            yield EDGE, name, dep
+
+
+def iter_mermaid(events: Iterable[Tuple]) -> Iterator[str]:
+    """
+    逐行生成 Mermaid 图表代码
+
+    Args:
+        events: walk_dependencies 产出的事件
+
+    Yields:
+        以换行结尾的代码行
+    """
+    yield "graph TD\n"
+    node_ids: Dict[str, str] = {}
+
+    def node_id(name: str) -> str:
+        if name not in node_ids:
+            node_ids[name] = f"N{len(node_ids) + 1}"
+        return node_ids[name]
+
+    empty = True
+    for event in events:
+        if event[0] == NODE:
+            empty = False
+            _, name, obj_type, _ = event
+            # 视图用方框，表用圆角矩形
+            if obj_type == 'view':
+                yield f"    {node_id(name)}[\"{name} - {obj_type.upper()}\"]\n"
+            else:
+                yield f"    {node_id(name)}(\"{name} - {obj_type.upper()}\")\n"
+        else:
+            yield f"    {node_id(event[1])} --> {node_id(event[2])}\n"
+    if empty:
+        yield "    Error[对象不存在]\n"
+
+
+def _dot_quote(text: str) -> str:
+    """DOT 双引号字符串"""
+    return '"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"'
+
+
+def iter_dot(events: Iterable[Tuple], engine: str = 'dot') -> Iterator[str]:
+    """
+    逐行生成 Graphviz DOT 源码（DOT 导出和图片渲染共用）
+
+    Args:
+        events: walk_dependencies 产出的事件
+        engine: 渲染时使用的布局引擎，非 dot 引擎会额外设置防重叠属性
+
+    Yields:
+        以换行结尾的 DOT 行
+    """
+    yield "// Dependency Graph\ndigraph {\n\trankdir=TB\n"
+    if engine != 'dot':
+        yield "\toverlap=false\n\toutputorder=edgesfirst\n"
+    yield "\tnode [fontname=Arial shape=box style=filled]\n"
+
+    empty = True
+    for event in events:
+        if event[0] == NODE:
+            empty = False
+            _, name, obj_type, _ = event
+            label = _dot_quote(name)[:-1] + ('\\n(VIEW)"' if obj_type == 'view' else '\\n(TABLE)"')
+            # 视图用蓝色方框，表用绿色椭圆
+            if obj_type == 'view':
+                yield f"\t{_dot_quote(name)} [label={label} fillcolor=lightblue shape=box]\n"
+            else:
+                yield f"\t{_dot_quote(name)} [label={label} fillcolor=lightgreen shape=ellipse]\n"
+        else:
+            yield f"\t{_dot_quote(event[1])} -> {_dot_quote(event[2])}\n"
+    if empty:
+        yield '\tError [label="对象不存在"]\n'
+    yield "}\n"
+
+
+def iter_chunks(lines: Iterable[str], size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """
+    将逐行输出合并为较大的文本块，减少流式响应的写入次数
+
+    Args:
+        lines: 文本行
+        size: 每块的最小字符数
+
+    Yields:
+        文本块（第一块在满足大小或遍历结束时立即产出）
+    """
+    buffer: List[str] = []
+    length = 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(buffer)
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+class ExportGraph(NamedTuple):
+    """
+    导出用的中间图：从根对象出发、在最大深度内可达的节点和它们之间的全部依赖边
+
+    节点按广度优先顺序排列，深度为到根对象的最短距离
+    """
+    root: str
+    max_depth: Optional[int]
+    # [(对象名, 'table' | 'view', 深度), ...]
+    nodes: List[Tuple[str, str, int]]
+    # [(依赖方, 被依赖方), ...]
+    edges: List[Tuple[str, str]]
+
+    @classmethod
+    def build(cls, graph, root: str, max_depth: Optional[int] = None) -> Optional['ExportGraph']:
+        """
+        从依赖关系图构建中间图
+
+        Args:
+            graph: DependencyGraph 实例
+            root: 根对象名称
+            max_depth: 最大深度（根对象深度为 0，只保留深度小于 max_depth 的节点）
+
+        Returns:
+            ExportGraph 实例，根对象不存在时返回 None
+        """
+        nodes = []
+        edges = []
+        for event in walk_dependencies(graph, root, max_depth):
+            if event[0] == NODE:
+                nodes.append(event[1:])
+            else:
+                edges.append(event[1:])
+        if not nodes:
+            return None
+        return cls(root, max_depth, nodes, edges)
+
+    def events(self) -> Iterator[Tuple]:
+        """按 walk_dependencies 的顺序重新产出节点/边事件"""
+        adjacency = self.adjacency()
+        for name, obj_type, depth in self.nodes:
+            yield NODE, name, obj_type, depth
+            for dep in adjacency[name]:
+                yield EDGE, name, dep
+
+    def adjacency(self) -> Dict[str, List[str]]:
+        """{对象名: [直接依赖]}（按边的顺序）"""
+        adjacency: Dict[str, List[str]] = {name: [] for name, _, _ in self.nodes}
+        for src, dst in self.edges:
+            adjacency[src].append(dst)
+        return adjacency
+
+    def to_tree(self) -> Dict:
+        """
+        转换为嵌套依赖树（每个对象只出现一次，挂在首次发现它的依赖方下面）
+
+        Returns:
+            {'name', 'type', 'dependencies': [...]}
+        """
+        tree_nodes = {name: {'name': name, 'type': obj_type, 'dependencies': []}
+                      for name, obj_type, _ in self.nodes}
+        attached = {self.root}
+        for src, dst in self.edges:
+            if dst not in attached:
+                attached.add(dst)
+                tree_nodes[src]['dependencies'].append(tree_nodes[dst])
+        return tree_nodes[self.root]
+
+    def to_dict(self) -> Dict:
+        """节点/边列表形式"""
+        return {
+            'nodes': [{'name': name, 'type': obj_type, 'depth': depth}
+                      for name, obj_type, depth in self.nodes],
+            'edges': [{'source': src, 'target': dst} for src, dst in self.edges]
+        }
+
+
+def render_mermaid(export_graph: Optional[ExportGraph]) -> str:
+    """
+    渲染为 Mermaid 图表代码
+
+    Args:
+        export_graph: 中间图，None 表示对象不存在
+
+    Returns:
+        Mermaid 代码字符串
+    """
+    return ''.join(iter_mermaid(export_graph.events() if export_graph else ()))
+
+
+def render_dot(export_graph: Optional[ExportGraph], engine: str = 'dot') -> str:
+    """
+    渲染为 DOT 源码
+
+    Args:
+        export_graph: 中间图，None 表示对象不存在
+        engine: 渲染时使用的布局引擎
+
+    Returns:
+        DOT 源码字符串
+    """
+    return ''.join(iter_dot(export_graph.events() if export_graph else (), engine))
 
 
 class ExportManager:
@@ -22,48 +282,58 @@ class ExportManager:
         """
         self.analyzer = analyzer
 
-    def build_dependency_tree(self, root_object: str, max_depth: Optional[int] = None) -> Dict:
+    def _memoize(self, kind: str, root_object: str, max_depth: Optional[int],
+                 render: Callable[[], object]):
         """
-        构建依赖树
+        按 (配置, 数据库, 根对象, 最大深度, 依赖图版本, 导出类型) 缓存导出结果
 
         Args:
+            kind: 导出类型（graph / mermaid / dot / png / svg）
             root_object: 根对象名称
-            max_depth: 最大递归深度，None 表示无限制
+            max_depth: 最大递归深度
+            render: 缓存未命中时生成结果的函数
 
         Returns:
-            依赖树字典
+            导出结果（调用方不应修改）
         """
-        visited = set()
-
-        def traverse(obj_name: str, current_depth: int = 0) -> Dict:
-            if max_depth is not None and current_depth >= max_depth:
-                return None
-
-            if obj_name in visited:
-                return None
-
-            visited.add(obj_name)
+        analyzer = self.analyzer
+        key = make_cache_key('export', analyzer.config_id, analyzer.database,
+                             analyzer.graph.version, root_object, max_depth, kind)
+        cache = get_cache()
+        result = cache.get(key)
+        if result is None:
+            result = render()
+            if result is not None:
+                cache.set(key, result, EXPORT_CACHE_TTL, namespace=analyzer.config_id)
+        return result
+
+    def build_export_graph(self, root_object: str, max_depth: Optional[int] = None) -> Optional[ExportGraph]:
+        """
+        构建中间图（带缓存，同一次导出的各种格式共用，不应修改）
 
-            obj_type = self.analyzer.get_object_type(obj_name)
-            if not obj_type:
-                return None
+        Args:
+            root_object: 根对象名称
+            max_depth: 最大递归深度，None 表示无限制
 
-            node = {
-                'name': obj_name,
-                'type': obj_type,
-                'dependencies': []
-            }
+        Returns:
+            ExportGraph 实例，对象不存在时返回 None
+        """
+        return self._memoize('graph', root_object, max_depth,
+                             lambda: ExportGraph.build(self.analyzer.graph, root_object, max_depth))
 
-            if obj_type == 'view':
-                deps = self.analyzer.get_direct_dependencies(obj_name)
-                for dep in deps:
-                    child = traverse(dep['name'], current_depth + 1)
-                    if child:
-                        node['dependencies'].append(child)
+    def build_dependency_tree(self, root_object: str, max_depth: Optional[int] = None) -> Optional[Dict]:
+        """
+        构建依赖树
 
-            return node
+        Args:
+            root_object: 根对象名称
+            max_depth: 最大递归深度，None 表示无限制
 
-        return traverse(root_object)
+        Returns:
+            依赖树字典，对象不存在时返回 None
+        """
+        export_graph = self.build_export_graph(root_object, max_depth)
+        return export_graph.to_tree() if export_graph else None
 
     def export_mermaid(self, root_object: str, max_depth: Optional[int] = None) -> str:
         """
@@ -76,38 +346,8 @@ class ExportManager:
         Returns:
             Mermaid 代码字符串
         """
-        tree = self.build_dependency_tree(root_object, max_depth)
-        if not tree:
-            return "graph TD\n    Error[对象不存在]"
-
-        lines = ["graph TD"]
-        node_id_map = {}
-        node_counter = [0]
-
-        def get_node_id(name: str) -> str:
-            if name not in node_id_map:
-                node_counter[0] += 1
-                node_id_map[name] = f"N{node_counter[0]}"
-            return node_id_map[name]
-
-        def traverse(node: Dict):
-            node_id = get_node_id(node['name'])
-            node_type = node['type'].upper()
-
-            # 视图用方框，表用圆角矩形
-            if node['type'] == 'view':
-                lines.append(f"    {node_id}[\"{node['name']} - {node_type}\"]")
-            else:
-                lines.append(f"    {node_id}(\"{node['name']} - {node_type}\")")
-
-            for dep in node['dependencies']:
-                dep_id = get_node_id(dep['name'])
-                lines.append(f"    {node_id} --> {dep_id}")
-                traverse(dep)
-
-        traverse(tree)
-
-        return "\n".join(lines)
+        return self._memoize('mermaid', root_object, max_depth,
+                             lambda: render_mermaid(self.build_export_graph(root_object, max_depth)))
 
     def export_dot(self, root_object: str, max_depth: Optional[int] = None) -> str:
         """
@@ -120,37 +360,8 @@ class ExportManager:
         Returns:
             DOT 格式字符串
         """
-        tree = self.build_dependency_tree(root_object, max_depth)
-        if not tree:
-            return "digraph { Error [label=\"对象不存在\"]; }"
-
-        dot = Digraph(comment='Dependency Graph')
-        dot.attr(rankdir='TB')
-        dot.attr('node', shape='box', style='filled')
-
-        visited_edges = set()
-
-        def traverse(node: Dict):
-            node_name = node['name']
-
-            # 视图用蓝色方框，表用绿色椭圆
-            if node['type'] == 'view':
-                dot.node(node_name, f"{node_name}\n(VIEW)",
-                        fillcolor='lightblue', shape='box')
-            else:
-                dot.node(node_name, f"{node_name}\n(TABLE)",
-                        fillcolor='lightgreen', shape='ellipse')
-
-            for dep in node['dependencies']:
-                edge = (node_name, dep['name'])
-                if edge not in visited_edges:
-                    visited_edges.add(edge)
-                    dot.edge(node_name, dep['name'])
-                    traverse(dep)
-
-        traverse(tree)
-
-        return dot.source
+        return self._memoize('dot', root_object, max_depth,
+                             lambda: render_dot(self.build_export_graph(root_object, max_depth)))
 
     def export_image(self, root_object: str, format: str = 'png',
                     max_depth: Optional[int] = None) -> bytes:
@@ -165,40 +376,15 @@ class ExportManager:
         Returns:
             图片二进制数据
         """
-        tree = self.build_dependency_tree(root_object, max_depth)
-        if not tree:
-            # 返回错误图片
-            dot = Digraph()
-            dot.node('Error', '对象不存在')
-            return dot.pipe(format=format)
-
-        dot = Digraph(comment='Dependency Graph')
-        dot.attr(rankdir='TB')
-        dot.attr('node', shape='box', style='filled', fontname='Arial')
-
-        visited_edges = set()
-
-        def traverse(node: Dict):
-            node_name = node['name']
-
-            # 视图用蓝色方框，表用绿色椭圆
-            if node['type'] == 'view':
-                dot.node(node_name, f"{node_name}\\n(VIEW)",
-                        fillcolor='lightblue', shape='box')
-            else:
-                dot.node(node_name, f"{node_name}\\n(TABLE)",
-                        fillcolor='lightgreen', shape='ellipse')
-
-            for dep in node['dependencies']:
-                edge = (node_name, dep['name'])
-                if edge not in visited_edges:
-                    visited_edges.add(edge)
-                    dot.edge(node_name, dep['name'])
-                    traverse(dep)
+        # 渲染结果缓存后，重复导出不再调用 Graphviz
+        return self._memoize(format, root_object, max_depth,
+                             lambda: self._render_image(root_object, format, max_depth))
 
-        traverse(tree)
-
-        return dot.pipe(format=format)
+    def _render_image(self, root_object: str, format: str, max_depth: Optional[int]) -> bytes:
+        """在渲染池中调用 Graphviz（节点过多时改用 sfdp 布局）"""
+        export_graph = self.build_export_graph(root_object, max_depth)
+        engine = choose_engine(len(export_graph.nodes) if export_graph else 1)
+        return get_render_pool().render(render_dot(export_graph, engine), format, engine)
 
     def export_json(self, root_object: str, max_depth: Optional[int] = None) -> Dict:
         """
@@ -209,17 +395,88 @@ class ExportManager:
             max_depth: 最大递归深度
 
         Returns:
-            JSON 字典
+            JSON 字典（dependency_tree 为嵌套树，nodes / edges 为完整的节点和边列表）
         """
-        tree = self.build_dependency_tree(root_object, max_depth)
+        # 中间图取自缓存，导出时间每次重新生成
+        export_graph = self.build_export_graph(root_object, max_depth)
 
-        return {
+        result = {
             'export_metadata': {
                 'database': self.analyzer.database,
                 'root_object': root_object,
-                'export_date': __import__('datetime').datetime.now().isoformat(),
-                'format_version': '1.0',
+                'export_date': datetime.now().isoformat(),
+                'format_version': '1.1',
                 'max_depth': max_depth
             },
-            'dependency_tree': tree
+            'dependency_tree': export_graph.to_tree() if export_graph else None
         }
+        result.update(export_graph.to_dict() if export_graph else {'nodes': [], 'edges': []})
+        return result
+
+    def stream(self, root_object: str, format: str = 'mermaid',
+               max_depth: Optional[int] = None) -> Iterator[str]:
+        """
+        流式导出 Mermaid / DOT（遍历依赖图的同时生成文本，内存占用与边数无关）
+
+        Args:
+            root_object: 根对象名称
+            format: 'mermaid' 或 'dot'
+            max_depth: 最大递归深度
+
+        Returns:
+            文本块迭代器
+        """
+        if format not in STREAM_FORMATS:
+            raise ValueError(f"不支持的流式导出格式: {format}")
+        events = walk_dependencies(self.analyzer.graph, root_object, max_depth)
+        lines = iter_mermaid(events) if format == 'mermaid' else iter_dot(events)
+        return iter_chunks(lines)
+
+    def export_bundle(self, root_object: str, max_depth: Optional[int] = None,
+                      formats: Iterable[str] = tuple(BUNDLE_FORMATS)) -> bytes:
+        """
+        导出多种格式的压缩包（所有格式共用同一个中间图）
+
+        重复的格式只导出一次；节点数超过图片渲染上限时跳过 svg / png，
+        原因记录在压缩包内的 manifest.json 中，其余格式照常导出
+
+        Args:
+            root_object: 根对象名称
+            max_depth: 最大递归深度
+            formats: 包含的格式（mermaid / dot / svg / png / json）
+
+        Returns:
+            zip 文件二进制数据
+        """
+        formats = list(dict.fromkeys(formats))
+        unknown = [fmt for fmt in formats if fmt not in BUNDLE_FORMATS]
+        if unknown:
+            raise ValueError(f"不支持的导出格式: {', '.join(unknown)}")
+
+        skipped = {}
+        if any(fmt in IMAGE_FORMATS for fmt in formats):
+            export_graph = self.build_export_graph(root_object, max_depth)
+            node_count = len(export_graph.nodes) if export_graph else 0
+            if node_count > MAX_RENDER_NODES:
+                reason = f"节点数 {node_count} 超过图片渲染上限 {MAX_RENDER_NODES}，已跳过"
+                skipped = {fmt: reason for fmt in formats if fmt in IMAGE_FORMATS}
+
+        manifest = {'root_object': root_object, 'max_depth': max_depth, 'files': {}, 'skipped': skipped}
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as bundle:
+            for fmt in formats:
+                if fmt in skipped:
+                    continue
+                if fmt == 'mermaid':
+                    content = self.export_mermaid(root_object, max_depth)
+                elif fmt == 'dot':
+                    content = self.export_dot(root_object, max_depth)
+                elif fmt == 'json':
+                    content = json.dumps(self.export_json(root_object, max_depth), ensure_ascii=False, indent=2)
+                else:
+                    content = self.export_image(root_object, fmt, max_depth)
+                filename = f"{root_object}_dependencies.{BUNDLE_FORMATS[fmt]}"
+                bundle.writestr(filename, content)
+                manifest['files'][fmt] = filename
+            bundle.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+        return buffer.getvalue()
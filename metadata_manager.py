@@ -7,9 +7,17 @@
 
 import hashlib
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
-from typing import Dict, List, Set, Tuple
-import pymysql
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.connection_pool import get_pool
+
+# 每次从 information_schema.VIEWS 读取的最大行数
+VIEW_FETCH_CHUNK_SIZE = 1000
+
+# VIEW_DEFINITION 长度达到该值时视为被服务端截断，改用 SHOW CREATE VIEW
+VIEW_DEFINITION_TRUNCATE_LENGTH = 65535
 
 
 class MetadataManager:
@@ -26,30 +34,74 @@ class MetadataManager:
         self.database = config['database']
 
     def get_connection(self):
-        """获取数据库连接"""
-        return pymysql.connect(
-            host=self.config['host'],
-            port=self.config['port'],
-            user=self.config['user'],
-            password=self.config['password'],
-            database=self.config['database'],
-            charset='utf8mb4'
-        )
-
-    def get_metadata_snapshot(self) -> Dict:
+        """从连接池借出数据库连接（上下文管理器，退出时自动归还）"""
+        return get_pool(self.config).connection()
+
+    @staticmethod
+    def compute_checksum(object_names: Iterable[str]) -> str:
+        """
+        计算对象名称列表的校验和
+
+        Args:
+            object_names: 表和视图名称
+
+        Returns:
+            MD5 校验和
+        """
+        return hashlib.md5(json.dumps(sorted(object_names)).encode()).hexdigest()
+
+    @staticmethod
+    def fingerprint(*parts) -> str:
+        """
+        计算对象内容的指纹（截短的 MD5，足以区分同一对象的不同版本）
+
+        Args:
+            *parts: 参与计算的内容（需可 JSON 序列化，其他类型按字符串处理）
+
+        Returns:
+            16 位十六进制指纹
+        """
+        data = json.dumps(parts, ensure_ascii=False, default=str)
+        return hashlib.md5(data.encode('utf-8')).hexdigest()[:16]
+
+    def get_catalog_probe(self) -> str:
+        """
+        廉价探测对象目录是否可能发生变化：对 information_schema.TABLES 做一次聚合，只返回一行
+
+        对象数、名称总长度和最近创建时间覆盖新增、删除、重建和绝大多数重命名，
+        注释总长度和最近更新时间覆盖注释修改和数据变更；探测值变化时再整体加载目录
+
+        Returns:
+            探测值指纹
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            query = """
+                SELECT COUNT(*), SUM(LENGTH(TABLE_NAME)), SUM(LENGTH(TABLE_COMMENT)),
+                       MAX(CREATE_TIME), MAX(UPDATE_TIME)
+                FROM information_schema.TABLES
+                WHERE TABLE_SCHEMA = %s
+            """
+            cursor.execute(query, (self.database,))
+            row = cursor.fetchone()
+        return self.fingerprint(*(row or ()))
+
+    def get_metadata_snapshot(self, fingerprints: bool = True) -> Dict:
         """
         获取当前数据库的元数据快照
 
+        Args:
+            fingerprints: 是否计算每个对象的指纹（字段 + 视图定义，各一次整库批量查询）
+
         Returns:
-            元数据快照字典
+            元数据快照字典；checksum 只覆盖对象名称，fingerprint_checksum 覆盖所有对象指纹
         """
-        conn = self.get_connection()
-        try:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
 
             # 查询所有表和视图
             query = """
-                SELECT TABLE_NAME, TABLE_TYPE
+                SELECT TABLE_NAME, TABLE_TYPE, TABLE_COMMENT
                 FROM information_schema.TABLES
                 WHERE TABLE_SCHEMA = %s
                 ORDER BY TABLE_NAME
@@ -59,10 +111,12 @@ class MetadataManager:
 
             tables = []
             views = []
+            comments = {}
 
             for row in results:
                 table_name = row[0]
                 table_type = row[1]
+                comments[table_name] = row[2] or ''
 
                 if table_type == 'VIEW':
                     views.append(table_name)
@@ -71,9 +125,9 @@ class MetadataManager:
 
             # 生成校验和
             all_objects = sorted(tables + views)
-            checksum = hashlib.md5(json.dumps(all_objects).encode()).hexdigest()
+            checksum = self.compute_checksum(all_objects)
 
-            return {
+            snapshot = {
                 'database': self.database,
                 'timestamp': datetime.now().isoformat(),
                 'tables': tables,
@@ -81,14 +135,56 @@ class MetadataManager:
                 'checksum': checksum,
                 'total_count': len(all_objects)
             }
+            if fingerprints:
+                object_fingerprints = self._compute_fingerprints(cursor, comments)
+                snapshot['fingerprints'] = object_fingerprints
+                snapshot['fingerprint_checksum'] = self.fingerprint(sorted(object_fingerprints.items()))
+            return snapshot
 
-        finally:
-            conn.close()
+    def _compute_fingerprints(self, cursor, comments: Dict[str, str]) -> Dict[str, List[str]]:
+        """
+        批量计算对象指纹：一次扫描 information_schema.COLUMNS，一次（分页）扫描 information_schema.VIEWS
+
+        视图定义指纹直接取 VIEW_DEFINITION（不对截断的定义回退 SHOW CREATE VIEW，保证每次检测只有固定的几次查询）
+
+        Args:
+            cursor: 数据库游标
+            comments: {对象名: 表注释}
+
+        Returns:
+            {对象名: [结构指纹（表注释 + 字段）, 视图定义指纹（表为空字符串）]}
+        """
+        columns: Dict[str, List] = {}
+        query = """
+            SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, COLUMN_COMMENT
+            FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = %s
+            ORDER BY TABLE_NAME, ORDINAL_POSITION
+        """
+        cursor.execute(query, (self.database,))
+        while True:
+            rows = cursor.fetchmany(VIEW_FETCH_CHUNK_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                columns.setdefault(row[0], []).append(row[1:])
+
+        definitions = {
+            name: self.fingerprint(definition)
+            for name, definition in self._iter_view_definitions(cursor, VIEW_FETCH_CHUNK_SIZE)
+        }
+
+        return {
+            name: [self.fingerprint(comment, columns.get(name, [])), definitions.get(name, '')]
+            for name, comment in comments.items()
+        }
 
     def compare_snapshots(self, old_snapshot: Dict, new_snapshot: Dict) -> Dict:
         """
         比较两个快照，检测变化
 
+        两个快照都带有对象指纹时，同时报告字段、注释或视图定义发生变化的对象
+
         Args:
             old_snapshot: 旧快照
             new_snapshot: 新快照
@@ -103,6 +199,8 @@ class MetadataManager:
                 'removed_tables': [],
                 'added_views': new_snapshot['views'],
                 'removed_views': [],
+                'modified_tables': [],
+                'modified_views': [],
                 'timestamp': new_snapshot['timestamp']
             }
 
@@ -116,7 +214,17 @@ class MetadataManager:
         added_views = list(new_views - old_views)
         removed_views = list(old_views - new_views)
 
-        has_changes = bool(added_tables or removed_tables or added_views or removed_views)
+        old_fingerprints = old_snapshot.get('fingerprints') or {}
+        new_fingerprints = new_snapshot.get('fingerprints') or {}
+        modified = {
+            name for name, fingerprint in new_fingerprints.items()
+            if name in old_fingerprints and old_fingerprints[name] != fingerprint
+        }
+        modified_tables = modified & old_tables & new_tables
+        modified_views = modified & old_views & new_views
+
+        has_changes = bool(added_tables or removed_tables or added_views or removed_views
+                           or modified_tables or modified_views)
 
         return {
             'has_changes': has_changes,
@@ -124,9 +232,166 @@ class MetadataManager:
             'removed_tables': sorted(removed_tables),
             'added_views': sorted(added_views),
             'removed_views': sorted(removed_views),
+            'modified_tables': sorted(modified_tables),
+            'modified_views': sorted(modified_views),
             'timestamp': new_snapshot['timestamp']
         }
 
+    def _iter_view_definitions(self, cursor, chunk_size: int) -> Iterator[Tuple[str, str]]:
+        """按名称做键集分页读取整库的 (视图名, VIEW_DEFINITION)，避免大库一次返回过多数据"""
+        last_name = ''
+        while True:
+            query = """
+                SELECT TABLE_NAME, VIEW_DEFINITION
+                FROM information_schema.VIEWS
+                WHERE TABLE_SCHEMA = %s AND TABLE_NAME > %s
+                ORDER BY TABLE_NAME
+                LIMIT %s
+            """
+            cursor.execute(query, (self.database, last_name, chunk_size))
+            rows = cursor.fetchall()
+            for row in rows:
+                yield row[0], row[1] or ''
+            if len(rows) < chunk_size:
+                break
+            last_name = rows[-1][0]
+
+    def get_view_definitions(self, view_names: Optional[Iterable[str]] = None,
+                             chunk_size: int = VIEW_FETCH_CHUNK_SIZE) -> Dict[str, str]:
+        """
+        批量获取视图定义 SQL（读取 information_schema.VIEWS，按块分批）
+
+        information_schema 返回空定义或长度达到截断上限的视图，
+        会并行回退到 SHOW CREATE VIEW 获取完整定义。
+
+        Args:
+            view_names: 需要的视图名，None 表示整个数据库的所有视图
+            chunk_size: 每次查询的最大行数
+
+        Returns:
+            {视图名: 视图定义}
+        """
+        definitions: Dict[str, str] = {}
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            if view_names is None:
+                definitions.update(self._iter_view_definitions(cursor, chunk_size))
+            else:
+                names = sorted(set(view_names))
+                for start in range(0, len(names), chunk_size):
+                    chunk = names[start:start + chunk_size]
+                    placeholders = ', '.join(['%s'] * len(chunk))
+                    query = f"""
+                        SELECT TABLE_NAME, VIEW_DEFINITION
+                        FROM information_schema.VIEWS
+                        WHERE TABLE_SCHEMA = %s AND TABLE_NAME IN ({placeholders})
+                    """
+                    cursor.execute(query, (self.database, *chunk))
+                    for row in cursor.fetchall():
+                        definitions[row[0]] = row[1] or ''
+
+        truncated = [
+            name for name, definition in definitions.items()
+            if not definition or len(definition) >= VIEW_DEFINITION_TRUNCATE_LENGTH
+        ]
+        if truncated:
+            definitions.update(self._show_create_views(truncated))
+
+        return definitions
+
+    def get_view_definition(self, view_name: str) -> str:
+        """
+        获取单个视图的完整定义 SQL（SHOW CREATE VIEW）
+
+        Args:
+            view_name: 视图名
+
+        Returns:
+            视图定义，获取失败时返回空字符串
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SHOW CREATE VIEW `{view_name}`")
+            result = cursor.fetchone()
+            return result[1] if result and len(result) >= 2 else ""
+
+    def _show_create_views(self, view_names: List[str]) -> Dict[str, str]:
+        """并行执行 SHOW CREATE VIEW，并发数不超过连接池上限"""
+        definitions = {}
+        max_workers = min(len(view_names), get_pool(self.config).max_size)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(self.get_view_definition, name): name for name in view_names}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    definitions[name] = future.result()
+                except Exception as e:
+                    print(f"错误: 无法获取视图 {name} 的定义 - {e}")
+        return definitions
+
+    def get_table_structures(self, table_names: Optional[Iterable[str]] = None,
+                             chunk_size: int = VIEW_FETCH_CHUNK_SIZE) -> Dict[str, Dict]:
+        """
+        批量获取表和视图的结构（一次 TABLES 查询 + 一次 COLUMNS 查询，在内存中按表分组）
+
+        Args:
+            table_names: 需要的对象名，None 表示整个数据库（指定名称时按块分批查询）
+            chunk_size: 指定名称时每次查询的最大对象数
+
+        Returns:
+            {对象名: {'table_type', 'db_comment', 'columns': [(字段名, 数据类型, 字段类型, 可空, 默认值, 注释)]}}，
+            不存在的对象不出现在结果中
+        """
+        if table_names is None:
+            chunks = [None]
+        else:
+            names = sorted(set(table_names))
+            chunks = [names[start:start + chunk_size] for start in range(0, len(names), chunk_size)]
+
+        structures: Dict[str, Dict] = {}
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            for chunk in chunks:
+                if chunk is None:
+                    condition, params = '', (self.database,)
+                else:
+                    condition = f" AND TABLE_NAME IN ({', '.join(['%s'] * len(chunk))})"
+                    params = (self.database, *chunk)
+
+                query = f"""
+                    SELECT TABLE_NAME, TABLE_TYPE, TABLE_COMMENT
+                    FROM information_schema.TABLES
+                    WHERE TABLE_SCHEMA = %s{condition}
+                """
+                cursor.execute(query, params)
+                for row in cursor.fetchall():
+                    structures[row[0]] = {
+                        'table_type': 'view' if row[1] == 'VIEW' else 'table',
+                        'db_comment': row[2] or '',
+                        'columns': []
+                    }
+
+                query = f"""
+                    SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, COLUMN_DEFAULT, COLUMN_COMMENT
+                    FROM information_schema.COLUMNS
+                    WHERE TABLE_SCHEMA = %s{condition}
+                    ORDER BY TABLE_NAME, ORDINAL_POSITION
+                """
+                cursor.execute(query, params)
+                while True:
+                    rows = cursor.fetchmany(VIEW_FETCH_CHUNK_SIZE)
+                    if not rows:
+                        break
+                    for row in rows:
+                        structure = structures.get(row[0])
+                        if structure is not None:
+                            structure['columns'].append(tuple(row[1:]))
+
+        return structures
+
     def get_all_objects(self) -> List[Dict]:
         """
         获取所有表和视图的列表
@@ -134,8 +399,7 @@ class MetadataManager:
         Returns:
             对象列表
         """
-        conn = self.get_connection()
-        try:
+        with self.get_connection() as conn:
             cursor = conn.cursor()
 
             query = """
@@ -156,6 +420,3 @@ class MetadataManager:
                 })
 
             return objects
-
-        finally:
-            conn.close()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+元数据变化监视模块
+每个有浏览器订阅的配置只运行一个后台线程，按固定间隔检测元数据快照，
+检测到新快照时唤醒所有订阅者（SSE 连接），由各连接按自己最后看到的快照ID读取增量
+"""
+
+import queue
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from config_manager import add_invalidation_listener
+from snapshot_store import SnapshotStore, add_change_listener, get_snapshot_store
+
+# 检测间隔（秒）
+WATCH_INTERVAL = 30
+
+
+class MetadataWatcher:
+    """单个数据库的元数据变化监视器"""
+
+    def __init__(self, store: SnapshotStore, interval: float = WATCH_INTERVAL):
+        """
+        初始化监视器（有订阅者时才启动后台线程，订阅者全部断开后线程退出）
+
+        Args:
+            store: 快照存储
+            interval: 检测间隔（秒）
+        """
+        self.store = store
+        self.interval = interval
+
+        self._subscribers: List[queue.Queue] = []
+        self._thread: Optional[threading.Thread] = None
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._last_id: Optional[int] = None
+        self._lock = threading.Lock()
+
+        # 统计信息
+        self._checks = 0
+        self._notifications = 0
+        self._failures = 0
+
+    @property
+    def stopped(self) -> bool:
+        """监视器是否已停止（配置被修改或删除）"""
+        return self._stopped
+
+    def subscribe(self) -> queue.Queue:
+        """
+        订阅变化通知，必要时启动后台线程
+
+        Returns:
+            通知队列：有新快照时放入快照ID（队列长度为 1，未取走的通知会合并）
+        """
+        subscriber = queue.Queue(maxsize=1)
+        with self._lock:
+            self._subscribers.append(subscriber)
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"metadata-watcher-{self.store.database}", daemon=True)
+                self._thread.start()
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        """
+        取消订阅
+
+        Args:
+            subscriber: subscribe() 返回的队列
+        """
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def notify(self, snapshot_id: int):
+        """
+        唤醒所有订阅者
+
+        Args:
+            snapshot_id: 最新快照ID
+        """
+        with self._lock:
+            self._last_id = snapshot_id
+            subscribers = list(self._subscribers)
+            self._notifications += 1
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(snapshot_id)
+            except queue.Full:
+                pass
+
+    def stop(self):
+        """停止后台线程并唤醒所有订阅者（订阅者发现 stopped 后自行断开）"""
+        with self._lock:
+            self._stopped = True
+            subscribers = list(self._subscribers)
+        self._wakeup.set()
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def _run(self):
+        """后台线程：按间隔检测快照，快照ID变化（包括其他进程或手动刷新记录的变化）时通知订阅者"""
+        while True:
+            with self._lock:
+                if self._stopped or not self._subscribers:
+                    self._thread = None
+                    return
+            try:
+                snapshot_id, _ = self.store.check()
+                with self._lock:
+                    self._checks += 1
+                    changed = self._last_id is not None and snapshot_id != self._last_id
+                    if self._last_id is None:
+                        self._last_id = snapshot_id
+                if changed:
+                    self.notify(snapshot_id)
+            except Exception as e:
+                with self._lock:
+                    self._failures += 1
+                print(f"检测元数据变化失败: {e}")
+            self._wakeup.wait(self.interval)
+
+    def stats(self) -> Dict:
+        """
+        获取监视器统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                'database': self.store.database,
+                'running': self._thread is not None,
+                'subscribers': len(self._subscribers),
+                'interval': self.interval,
+                'last_snapshot_id': self._last_id,
+                'checks': self._checks,
+                'notifications': self._notifications,
+                'failures': self._failures
+            }
+
+
+# 全局监视器注册表
+_watchers: Dict[Tuple[str, str], MetadataWatcher] = {}
+_watchers_lock = threading.Lock()
+
+
+def get_metadata_watcher(config: Dict) -> MetadataWatcher:
+    """
+    获取配置对应的元数据监视器（按 配置ID + 数据库 共享）
+
+    Args:
+        config: 数据库配置（含明文密码）
+
+    Returns:
+        MetadataWatcher 实例
+    """
+    key = (config.get('id') or config['host'], config['database'])
+    with _watchers_lock:
+        watcher = _watchers.get(key)
+        if watcher is None:
+            watcher = MetadataWatcher(get_snapshot_store(config))
+            _watchers[key] = watcher
+        return watcher
+
+
+def list_metadata_watchers() -> List[MetadataWatcher]:
+    """获取所有监视器"""
+    with _watchers_lock:
+        return list(_watchers.values())
+
+
+def invalidate_metadata_watcher(config_id: str):
+    """
+    停止并移除指定配置的元数据监视器
+
+    Args:
+        config_id: 配置ID
+    """
+    with _watchers_lock:
+        keys = [key for key in _watchers if key[0] == config_id]
+        watchers = [_watchers.pop(key) for key in keys]
+    for watcher in watchers:
+        watcher.stop()
+
+
+def _notify_watcher(config: Dict, changes: Dict):
+    """本进程记录了新快照（轮询、手动刷新或监视器自身）时立即通知订阅者，不必等到下一次检测"""
+    key = (config.get('id') or config['host'], config['database'])
+    watcher = _watchers.get(key)
+    if watcher is not None:
+        snapshot_id, _ = watcher.store.current()
+        watcher.notify(snapshot_id)
+
+
+add_change_listener(_notify_watcher)
+
+
+add_invalidation_listener(invalidate_metadata_watcher)
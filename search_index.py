@@ -0,0 +1,604 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表/视图搜索索引模块
+由对象目录一次性构建：名称前缀查找 + 名称/注释/注释拼音的 n-gram 倒排索引 + 名称分词的
+拼写纠错索引，自定义注释变化时增量更新，搜索不再访问数据库
+"""
+
+import heapq
+import re
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from catalog_manager import get_catalog
+from comment_store import CommentStore, get_comment_store
+from config_manager import add_invalidation_listener
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:  # 未安装 pypinyin 时不支持拼音搜索
+    lazy_pinyin = None
+
+# 匹配得分：名称前缀 > 名称分词前缀 > 名称包含 > 拼写纠错 > 注释（含拼音）前缀 > 注释包含
+SCORE_NAME_PREFIX = 100
+SCORE_NAME_TOKEN = 80
+SCORE_NAME_CONTAINS = 60
+SCORE_FUZZY = 40          # 实际得分为 SCORE_FUZZY - 编辑距离
+SCORE_COMMENT_PREFIX = 30
+SCORE_COMMENT_CONTAINS = 10
+
+# 倒排索引的最大 gram 长度（查询串更长时取其中最稀有的 gram 作为候选集）
+MAX_GRAM = 3
+
+# 参与拼写纠错的最短分词长度，以及允许编辑距离为 2 的最短长度
+FUZZY_MIN_LENGTH = 4
+FUZZY_TWO_EDITS_LENGTH = 8
+
+_TOKEN_RE = re.compile(r'[a-z]+|[0-9]+')
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')
+
+# 大于所有字符的哨兵，用于求前缀区间的上界
+_MAX_CHAR = '\U0010ffff'
+
+
+def _tokenize(text: str) -> List[str]:
+    """将小写名称按下划线、数字与字母边界切分为分词"""
+    return _TOKEN_RE.findall(text)
+
+
+def _max_distance(token: str) -> int:
+    """分词允许的最大编辑距离"""
+    if len(token) < FUZZY_MIN_LENGTH:
+        return 0
+    return 2 if len(token) >= FUZZY_TWO_EDITS_LENGTH else 1
+
+
+def _deletes(token: str, distance: int) -> Set[str]:
+    """删除至多 distance 个字符得到的所有变体（含自身），用于拼写纠错的候选召回"""
+    variants = {token}
+    frontier = {token}
+    for _ in range(distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """
+    计算编辑距离（插入/删除/替换/相邻交换各计 1），超过 max_distance 时提前返回 max_distance + 1
+
+    Args:
+        a: 字符串 a
+        b: 字符串 b
+        max_distance: 关心的最大距离
+
+    Returns:
+        编辑距离
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[len(b)], max_distance + 1)
+
+
+def _pinyin(comment: str) -> Tuple[str, str]:
+    """注释的 (全拼, 首字母)，未安装 pypinyin 或不含中文时返回空串"""
+    if lazy_pinyin is None or not _CJK_RE.search(comment):
+        return '', ''
+    syllables = [syllable.lower() for syllable in lazy_pinyin(comment) if syllable.strip()]
+    return ''.join(syllables), ''.join(syllable[0] for syllable in syllables)
+
+
+def _pinyin_text(pinyin: Tuple[str, str]) -> str:
+    """建立拼音倒排表用的文本：全拼与首字母以 NUL 字符相连（查询不含 NUL，不会跨界匹配）"""
+    return '\0'.join(pinyin) if pinyin[0] else ''
+
+
+def _grams(text: str) -> Set[str]:
+    """文本中长度为 1..MAX_GRAM 的所有子串"""
+    length = len(text)
+    return {
+        text[i:i + n]
+        for n in range(1, MAX_GRAM + 1)
+        for i in range(length - n + 1)
+    }
+
+
+class SearchIndex:
+    """
+    单个数据库的表/视图搜索索引
+
+    对象按小写名称排序后编号，因此：
+    - 名称前缀匹配是有序数组上的一段连续区间（二分查找，作用等同于前缀树但更省内存）
+    - 倒排表中的编号天然有序，同档结果按名称排列，取够一页即可提前结束
+    """
+
+    def __init__(self, objects: Dict[str, Tuple[str, str]], database: str,
+                 catalog_checksum: Optional[str] = None):
+        """
+        构建搜索索引
+
+        Args:
+            objects: {对象名: (类型, 数据库注释)}
+            database: 数据库名（用于匹配 db.table 形式的自定义注释）
+            catalog_checksum: 构建时对象目录的校验和
+        """
+        self.database = database
+        self.catalog_checksum = catalog_checksum
+
+        self.names: List[str] = sorted(objects, key=lambda name: (name.lower(), name))
+        self.lower_names: List[str] = [name.lower() for name in self.names]
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(self.names)}
+        self.types: List[str] = [objects[name][0] for name in self.names]
+        self.db_comments: List[str] = [objects[name][1] or '' for name in self.names]
+        self.comments: List[str] = list(self.db_comments)
+        self.lower_comments: List[str] = [comment.lower() for comment in self.comments]
+
+        # 当前生效的自定义注释 {对象名: 注释} 与已同步的注释存储版本
+        self._custom: Dict[str, str] = {}
+        self._comment_version: Optional[int] = None
+        self._lock = threading.RLock()
+
+        started = time.perf_counter()
+        self._name_postings = self._build_postings(self.lower_names)
+        self._comment_postings = self._build_postings(self.lower_comments)
+        # 按注释排序的 (小写注释, 编号)，注释前缀匹配同样是一段连续区间
+        self._comment_order: List[Tuple[str, int]] = sorted(
+            (comment, i) for i, comment in enumerate(self.lower_comments) if comment)
+
+        # 注释拼音（全拼 + 首字母）
+        self.pinyin_enabled = lazy_pinyin is not None
+        pinyin_cache: Dict[str, Tuple[str, str]] = {}
+        self._pinyin: List[Tuple[str, str]] = []
+        for comment in self.comments:
+            # 相同注释只转换一次（拼音转换是构建中最慢的一步）
+            if comment not in pinyin_cache:
+                pinyin_cache[comment] = _pinyin(comment)
+            self._pinyin.append(pinyin_cache[comment])
+        self._pinyin_postings = self._build_postings([_pinyin_text(p) for p in self._pinyin])
+
+        # 名称分词：分词 -> 对象编号，排序后的分词表用于分词前缀查找，删除变体表用于拼写纠错
+        token_ids: Dict[str, List[int]] = {}
+        for i, name in enumerate(self.lower_names):
+            for token in set(_tokenize(name)):
+                token_ids.setdefault(token, []).append(i)
+        self._token_postings: Dict[str, array] = {token: array('I', ids) for token, ids in token_ids.items()}
+        self._tokens: List[str] = sorted(token_ids)
+        self._name_tokens: List[Tuple[str, ...]] = [tuple(_tokenize(name)) for name in self.lower_names]
+        self._token_deletes: Dict[str, List[str]] = {}
+        for token in self._tokens:
+            for variant in _deletes(token, _max_distance(token)):
+                self._token_deletes.setdefault(variant, []).append(token)
+        self.build_seconds = time.perf_counter() - started
+
+    @staticmethod
+    def _build_postings(texts: List[str]) -> Dict[str, array]:
+        """构建 gram -> 有序编号数组 的倒排表"""
+        postings: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            for gram in _grams(text):
+                postings.setdefault(gram, []).append(i)
+        return {gram: array('I', ids) for gram, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    # ==================== 自定义注释 ====================
+
+    def set_comment(self, name: str, custom_comment: Optional[str]):
+        """
+        设置对象的自定义表注释并增量更新倒排索引
+
+        Args:
+            name: 对象名
+            custom_comment: 自定义注释，空值表示使用数据库注释
+        """
+        i = self.index.get(name)
+        if i is None:
+            return
+        with self._lock:
+            if custom_comment:
+                self._custom[name] = custom_comment
+                self._apply_comment(i, custom_comment)
+            else:
+                self._custom.pop(name, None)
+                self._apply_comment(i, self.db_comments[i])
+
+    def update_object(self, name: str, obj_type: str, db_comment: str):
+        """
+        数据库中的对象类型或注释变化后增量更新（有自定义注释时仍以自定义注释为准）
+
+        Args:
+            name: 对象名
+            obj_type: 'table' | 'view'
+            db_comment: 数据库注释
+        """
+        i = self.index.get(name)
+        if i is None:
+            return
+        with self._lock:
+            self.types[i] = obj_type
+            self.db_comments[i] = db_comment or ''
+            if name not in self._custom:
+                self._apply_comment(i, self.db_comments[i])
+
+    def _apply_comment(self, i: int, comment: str):
+        """替换对象 i 当前生效的注释并更新注释、拼音倒排表（调用方需持有锁）"""
+        if comment == self.comments[i]:
+            return
+
+        old = self.lower_comments[i]
+        new = comment.lower()
+        self.comments[i] = comment
+        self.lower_comments[i] = new
+
+        self._reindex(self._comment_postings, i, old, new)
+
+        old_pinyin = self._pinyin[i]
+        new_pinyin = _pinyin(comment)
+        self._pinyin[i] = new_pinyin
+        self._reindex(self._pinyin_postings, i, _pinyin_text(old_pinyin), _pinyin_text(new_pinyin))
+
+        if old:
+            pos = bisect_left(self._comment_order, (old, i))
+            if pos < len(self._comment_order) and self._comment_order[pos] == (old, i):
+                self._comment_order.pop(pos)
+        if new:
+            insort(self._comment_order, (new, i))
+
+    @staticmethod
+    def _reindex(postings: Dict[str, array], i: int, old_text: str, new_text: str):
+        """文本变化后更新对象 i 在倒排表中的位置（保持编号有序）"""
+        old_grams, new_grams = _grams(old_text), _grams(new_text)
+        for gram in old_grams - new_grams:
+            ids = postings[gram]
+            pos = bisect_left(ids, i)
+            if pos < len(ids) and ids[pos] == i:
+                ids.pop(pos)
+            if not ids:
+                del postings[gram]
+        for gram in new_grams - old_grams:
+            ids = postings.setdefault(gram, array('I'))
+            ids.insert(bisect_left(ids, i), i)
+
+    def sync_comments(self, store: CommentStore):
+        """
+        与注释存储同步：先让存储读取其他进程的修改，版本未变化时直接返回，否则只更新发生变化的对象
+
+        Args:
+            store: 注释存储
+        """
+        store.sync()
+        if store.version == self._comment_version and self._comment_version is not None:
+            return
+        with self._lock:
+            version = store.version
+            prefix = f"{self.database}."
+            custom = {
+                key[len(prefix):]: entry.get('table_comment') or ''
+                for key, entry in store.items() if key.startswith(prefix)
+            }
+            for name in set(custom) | set(self._custom):
+                if custom.get(name, '') != self._custom.get(name, ''):
+                    self.set_comment(name, custom.get(name))
+            self._comment_version = version
+
+    # ==================== 搜索 ====================
+
+    @staticmethod
+    def _candidates(postings: Dict[str, array], query: str) -> Iterable[int]:
+        """可能包含 query 的对象编号（按编号即名称排序）：取 query 中最稀有 gram 的倒排表"""
+        if len(query) <= MAX_GRAM:
+            return postings.get(query, ())
+        smallest = None
+        for i in range(len(query) - MAX_GRAM + 1):
+            ids = postings.get(query[i:i + MAX_GRAM])
+            if ids is None:
+                return ()
+            if smallest is None or len(ids) < len(smallest):
+                smallest = ids
+        return smallest
+
+    def _token_distances(self, query_token: str, fuzzy: bool) -> Dict[str, int]:
+        """
+        与查询词匹配的名称分词
+
+        Args:
+            query_token: 查询词
+            fuzzy: 是否包含编辑距离内的分词
+
+        Returns:
+            {分词: 距离}，以查询词为前缀的分词距离为 0
+        """
+        tokens = self._tokens
+        lo = bisect_left(tokens, query_token)
+        hi = bisect_right(tokens, query_token + _MAX_CHAR, lo)
+        distances = {tokens[k]: 0 for k in range(lo, hi)}
+
+        max_distance = _max_distance(query_token) if fuzzy else 0
+        if max_distance == 0:
+            return distances
+        for variant in _deletes(query_token, max_distance):
+            for token in self._token_deletes.get(variant, ()):
+                if token not in distances:
+                    distance = edit_distance(query_token, token, max_distance)
+                    if distance <= max_distance:
+                        distances[token] = distance
+        return distances
+
+    def _token_matches(self, query_tokens: List[str], token_maps: List[Dict[str, int]],
+                       fuzzy: bool) -> Iterable[Tuple[int, int]]:
+        """
+        每个查询词都命中某个名称分词的对象，按编号（名称）顺序惰性产出 (距离之和, 编号)
+
+        以候选最少的查询词（纠错时为近似分词）的倒排表为驱动，用对象的分词列表校验每个查询词
+
+        Args:
+            query_tokens: 查询词
+            token_maps: 每个查询词对应的 _token_distances 结果
+            fuzzy: 是否为纠错匹配
+        """
+        if not all(token_maps):
+            return
+        if fuzzy:
+            # 纠错结果至少有一个词是近似命中，只需遍历近似分词的倒排表（通常很少）
+            driver_tokens = {t for m in token_maps for t, d in m.items() if d > 0}
+        else:
+            driver_tokens = min(token_maps, key=lambda m: sum(len(self._token_postings[t]) for t in m))
+        name_tokens = self._name_tokens
+        lower_names = self.lower_names
+
+        postings = [self._token_postings[t] for t in driver_tokens]
+        last = -1
+        for i in (postings[0] if len(postings) == 1 else heapq.merge(*postings)):
+            if i == last:
+                continue
+            last = i
+            # 精确匹配时先用子串检查快速排除（分词前缀必然是名称的子串）
+            if not fuzzy and not all(query_token in lower_names[i] for query_token in query_tokens):
+                continue
+            tokens = name_tokens[i]
+            total = 0
+            for token_map in token_maps:
+                best = min((token_map[t] for t in tokens if t in token_map), default=None)
+                if best is None:
+                    break
+                total += best
+            else:
+                yield total, i
+
+    def _fuzzy_matches(self, query_tokens: List[str], limit: int, exclude: Set[int]) -> List[Tuple[int, int]]:
+        """
+        拼写纠错匹配，返回编辑距离最小的前 limit 个 (距离之和, 编号)
+
+        候选按编号顺序产出，一旦凑够 limit 个达到距离下界的结果即可停止，其后的候选不可能排在前面
+        """
+        token_maps = [self._token_distances(query_token, fuzzy=True) for query_token in query_tokens]
+        if not all(token_maps):
+            return []
+        lower_bound = max(1, sum(min(m.values()) for m in token_maps))
+
+        matches: List[Tuple[int, int]] = []
+        best = 0
+        for distance, i in self._token_matches(query_tokens, token_maps, fuzzy=True):
+            if distance == 0 or i in exclude:
+                continue
+            matches.append((distance, i))
+            if distance == lower_bound:
+                best += 1
+                if best >= limit:
+                    break
+        return heapq.nsmallest(limit, matches)
+
+    def _item(self, i: int, score: Optional[int] = None) -> Dict:
+        name = self.names[i]
+        item = {
+            'name': name,
+            'type': self.types[i],
+            'comment': self.comments[i],
+            'comment_source': 'custom' if name in self._custom else 'db'
+        }
+        if score is not None:
+            item['match_score'] = score
+        return item
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Dict], bool]:
+        """
+        搜索表和视图
+
+        排序：名称前缀 > 名称分词前缀 > 名称包含 > 拼写纠错（按编辑距离）> 注释/拼音前缀 > 注释/拼音包含。
+        除拼写纠错外每一档的候选都已有序，逐档取结果，凑够 offset + limit 条即停止
+
+        Args:
+            query: 关键词（不区分大小写），为空时按名称返回全部
+            limit: 返回数量
+            offset: 跳过的结果数（分页）
+
+        Returns:
+            (结果列表, 是否还有更多结果)
+        """
+        limit = max(0, limit)
+        offset = max(0, offset)
+        need = offset + limit + 1  # 多取一个用于判断 has_more
+        q = query.strip().lower()
+
+        with self._lock:
+            if not q:
+                end = min(len(self.names), offset + limit)
+                return [self._item(i) for i in range(offset, end)], len(self.names) > offset + limit
+
+            ranked: List[Tuple[int, int]] = []
+            seen: Set[int] = set()
+
+            def take(score: int, ids: Iterable[int]):
+                for i in ids:
+                    if len(ranked) >= need:
+                        return
+                    if i not in seen:
+                        seen.add(i)
+                        ranked.append((score, i))
+
+            lower_names = self.lower_names
+            lower_comments = self.lower_comments
+
+            # 名称前缀：有序数组上的连续区间
+            lo = bisect_left(lower_names, q)
+            hi = bisect_right(lower_names, q + _MAX_CHAR, lo)
+            take(SCORE_NAME_PREFIX, range(lo, hi))
+
+            # 名称分词前缀：如 order 命中 dwd_order_detail，多个词需全部命中
+            query_tokens = _tokenize(q)
+            if len(ranked) < need and query_tokens:
+                token_maps = [self._token_distances(query_token, fuzzy=False) for query_token in query_tokens]
+                take(SCORE_NAME_TOKEN, (i for _, i in self._token_matches(query_tokens, token_maps, fuzzy=False)))
+
+            # 名称包含：名称倒排表 + 子串校验
+            if len(ranked) < need:
+                take(SCORE_NAME_CONTAINS, (
+                    i for i in self._candidates(self._name_postings, q) if q in lower_names[i]))
+
+            # 拼写纠错：按编辑距离从小到大取前 k 个
+            remaining = need - len(ranked)
+            if remaining > 0 and query_tokens:
+                for distance, i in self._fuzzy_matches(query_tokens, remaining, seen):
+                    seen.add(i)
+                    ranked.append((SCORE_FUZZY - distance, i))
+
+            use_pinyin = self.pinyin_enabled and q.isascii() and q.isalpha()
+            pinyin = self._pinyin
+
+            # 注释前缀：按注释排序的连续区间，以及拼音全拼/首字母前缀
+            if len(ranked) < need:
+                comment_order = self._comment_order
+                clo = bisect_left(comment_order, (q,))
+                chi = bisect_left(comment_order, (q + _MAX_CHAR,), clo)
+                take(SCORE_COMMENT_PREFIX, (comment_order[k][1] for k in range(clo, chi)))
+            if len(ranked) < need and use_pinyin:
+                take(SCORE_COMMENT_PREFIX, (
+                    i for i in self._candidates(self._pinyin_postings, q)
+                    if pinyin[i][0].startswith(q) or pinyin[i][1].startswith(q)))
+
+            # 注释包含：注释倒排表 + 子串校验，以及拼音包含
+            if len(ranked) < need:
+                take(SCORE_COMMENT_CONTAINS, (
+                    i for i in self._candidates(self._comment_postings, q) if q in lower_comments[i]))
+            if len(ranked) < need and use_pinyin:
+                take(SCORE_COMMENT_CONTAINS, (
+                    i for i in self._candidates(self._pinyin_postings, q)
+                    if q in pinyin[i][0] or q in pinyin[i][1]))
+
+            page = ranked[offset:offset + limit]
+            return [self._item(i, score) for score, i in page], len(ranked) > offset + limit
+
+    def stats(self) -> Dict:
+        """
+        获取索引统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return {
+            'objects': len(self.names),
+            'grams': len(self._name_postings) + len(self._comment_postings) + len(self._pinyin_postings),
+            'postings': sum(len(ids) for postings in (self._name_postings, self._comment_postings,
+                                                      self._pinyin_postings)
+                            for ids in postings.values()),
+            'tokens': len(self._tokens),
+            'pinyin_enabled': self.pinyin_enabled,
+            'custom_comments': len(self._custom),
+            'build_seconds': round(self.build_seconds, 3)
+        }
+
+
+# 全局搜索索引注册表
+_indexes: Dict[Tuple[str, str], SearchIndex] = {}
+_build_locks: Dict[Tuple[str, str], threading.Lock] = {}
+# 类型或注释发生变化、等待增量更新的对象
+_stale_objects: Dict[Tuple[str, str], Set[str]] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(config: Dict) -> SearchIndex:
+    """
+    获取配置对应的搜索索引，不存在或对象名称已变化时重新构建，只有部分对象内容变化时增量更新，并同步自定义注释
+
+    Args:
+        config: 数据库配置（含明文密码）
+
+    Returns:
+        SearchIndex 实例
+    """
+    key = (config.get('id') or config['host'], config['database'])
+    catalog = get_catalog(config)
+    objects = catalog.get_objects()
+
+    index = _indexes.get(key)
+    if index is None or index.catalog_checksum != catalog.checksum:
+        with _indexes_lock:
+            build_lock = _build_locks.setdefault(key, threading.Lock())
+
+        # 同一配置同时只构建一次
+        with build_lock:
+            index = _indexes.get(key)
+            if index is None or index.catalog_checksum != catalog.checksum:
+                index = SearchIndex(objects, config['database'], catalog_checksum=catalog.checksum)
+                _indexes[key] = index
+
+    if _stale_objects.get(key):
+        with _indexes_lock:
+            stale = _stale_objects.pop(key, set())
+        for name in stale:
+            entry = objects.get(name)
+            if entry is not None:
+                index.update_object(name, entry[0], entry[1])
+
+    index.sync_comments(get_comment_store())
+    return index
+
+
+def invalidate_search_objects(config: Dict, names: Iterable[str]):
+    """
+    标记类型或注释可能发生变化的对象，下次获取搜索索引时只更新这些对象
+
+    Args:
+        config: 数据库配置
+        names: 对象名
+    """
+    key = (config.get('id') or config['host'], config['database'])
+    with _indexes_lock:
+        _stale_objects.setdefault(key, set()).update(names)
+
+
+def invalidate_search_index(config_id: str):
+    """
+    移除指定配置的所有搜索索引
+
+    Args:
+        config_id: 配置ID
+    """
+    with _indexes_lock:
+        for key in [key for key in _indexes if key[0] == config_id]:
+            del _indexes[key]
+        for key in [key for key in _stale_objects if key[0] == config_id]:
+            del _stale_objects[key]
+
+
+add_invalidation_listener(invalidate_search_index)
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+元数据快照存储模块
+每个配置/数据库在磁盘上保存最新的元数据快照和最近若干次变化记录（带递增的快照ID），
+客户端携带上次看到的快照ID轮询时，只需比较校验和并返回这之后的增量变化；
+轮询时先做一次单行的对象目录探测（MetadataManager.get_catalog_probe），探测值变化才读取整库快照
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from catalog_manager import add_probe_listener, get_catalog
+from config_manager import add_invalidation_listener
+from dependency_graph import invalidate_dependency_graph, invalidate_graph_objects
+from metadata_manager import MetadataManager
+from search_index import invalidate_search_index, invalidate_search_objects
+from structure_cache import invalidate_structure_cache, invalidate_structure_objects
+
+# 默认快照目录
+SNAPSHOT_DIR = 'metadata_snapshots'
+
+# 保留的变化记录条数，客户端的快照ID早于该范围时返回完整列表
+HISTORY_LIMIT = 200
+
+# 两次查询数据库的最小间隔（秒），间隔内的轮询直接使用最近一次结果
+MIN_CHECK_INTERVAL = 10
+
+# 变化记录中的字段
+CHANGE_FIELDS = ('added_tables', 'removed_tables', 'added_views', 'removed_views',
+                 'modified_tables', 'modified_views')
+
+# 检测到元数据变化时回调的函数列表（参数为数据库配置和变化详情）
+_change_listeners: List[Callable[[Dict, Dict], None]] = []
+
+
+def add_change_listener(listener: Callable[[Dict, Dict], None]):
+    """
+    注册元数据变化监听器（如按对象失效各类缓存）
+
+    Args:
+        listener: 回调函数，参数为 (数据库配置, compare_snapshots 的结果)
+    """
+    _change_listeners.append(listener)
+
+
+def merge_changes(changes: List[Dict]) -> Dict[str, List[str]]:
+    """
+    按时间顺序合并多次变化
+
+    先加后删的对象视为未变化，先删后加的对象视为被修改，新增后又修改的对象仍视为新增
+
+    Args:
+        changes: 变化记录列表（从旧到新）
+
+    Returns:
+        {'added_tables', 'removed_tables', 'added_views', 'removed_views', 'modified_tables', 'modified_views'}
+    """
+    merged = {}
+    for kind in ('tables', 'views'):
+        added, removed, modified = set(), set(), set()
+        for change in changes:
+            for name in change.get(f'added_{kind}', ()):
+                if name in removed:
+                    removed.discard(name)
+                    modified.add(name)
+                else:
+                    added.add(name)
+            for name in change.get(f'removed_{kind}', ()):
+                modified.discard(name)
+                if name in added:
+                    added.discard(name)
+                else:
+                    removed.add(name)
+            for name in change.get(f'modified_{kind}', ()):
+                if name not in added:
+                    modified.add(name)
+        merged[f'added_{kind}'] = sorted(added)
+        merged[f'removed_{kind}'] = sorted(removed)
+        merged[f'modified_{kind}'] = sorted(modified)
+    return merged
+
+
+class SnapshotStore:
+    """单个数据库的元数据快照存储"""
+
+    def __init__(self, config: Dict, directory: str = SNAPSHOT_DIR, history_limit: int = HISTORY_LIMIT,
+                 min_check_interval: float = MIN_CHECK_INTERVAL):
+        """
+        初始化快照存储
+
+        Args:
+            config: 数据库配置（含明文密码）
+            directory: 快照目录
+            history_limit: 保留的变化记录条数
+            min_check_interval: 两次查询数据库的最小间隔（秒）
+        """
+        self.config = config
+        self.database = config['database']
+        self.history_limit = history_limit
+        self.min_check_interval = min_check_interval
+        self.metadata_manager = MetadataManager(config)
+
+        config_id = config.get('id') or config['host']
+        safe_name = re.sub(r'[^\w.-]', '_', f"{config_id}_{self.database}")
+        self.path = os.path.join(directory, f"{safe_name}.json")
+        self.lock_path = self.path + '.lock'
+
+        self._state: Optional[Dict] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        # 本进程已分发给下游缓存的快照ID（首次读取快照文件时取文件中的快照ID）
+        self._applied_id: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+        # 后台检测线程，以及运行期间是否又收到了检测请求
+        self._background: Optional[threading.Thread] = None
+        self._background_pending = False
+
+    @contextmanager
+    def _file_lock(self):
+        """跨进程文件锁（不支持 fcntl 的平台上仅使用进程内锁）"""
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.lock_path, 'a') as lock_fd:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _stat_signature(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _load(self) -> Dict:
+        """读取快照文件（文件未变化时使用内存中的副本）"""
+        signature = self._stat_signature(self.path)
+        if self._state is not None and signature == self._signature:
+            return self._state
+
+        state = {'snapshot_id': 0, 'snapshot': None, 'history': []}
+        if signature is not None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+            except Exception as e:
+                print(f"加载元数据快照失败: {e}")
+        self._state = state
+        self._signature = signature
+        if self._applied_id is None:
+            # 本进程的各类缓存在此之后才加载，已经反映了文件中的快照
+            self._applied_id = state['snapshot_id']
+        return state
+
+    def _sync(self) -> Dict:
+        """
+        读取快照文件；其他进程（或本进程的其他实例）记录了本进程尚未分发的快照时，
+        把这之间的合并变化分发给下游缓存，超出保留的变化记录时整体失效派生缓存
+
+        Returns:
+            快照文件内容
+        """
+        with self._lock:
+            state = self._load()
+            applied = self._applied_id
+            if applied is None or state['snapshot_id'] <= applied:
+                return state
+            self._applied_id = state['snapshot_id']
+
+        changes = self._delta(state, applied)
+        if changes['reset']:
+            # 无法按对象失效，丢弃该配置的依赖图、搜索索引和表结构缓存
+            config_id = self.config.get('id') or self.config['host']
+            invalidate_dependency_graph(config_id)
+            invalidate_search_index(config_id)
+            invalidate_structure_cache(config_id)
+        self._apply_changes(state['snapshot'], changes)
+        return state
+
+    def _save(self, state: Dict):
+        """原子写入快照文件（临时文件 + fsync + rename）"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.snapshot.', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except Exception:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._state = state
+        self._signature = self._stat_signature(self.path)
+
+    def current(self) -> Tuple[int, Optional[Dict]]:
+        """
+        获取最新的快照
+
+        Returns:
+            (快照ID, 快照)，尚未记录过快照时为 (0, None)
+        """
+        state = self._sync()
+        return state['snapshot_id'], state['snapshot']
+
+    def record(self, snapshot: Dict, probe: Optional[str] = None) -> Tuple[int, Optional[Dict]]:
+        """
+        记录新快照：名称和指纹校验和都与最新快照一致时不生成新的快照ID，否则生成新的快照ID并追加变化记录
+
+        Args:
+            snapshot: MetadataManager.get_metadata_snapshot() 的结果
+            probe: 读取快照前的对象目录探测值，与快照一起保存（各进程据此跳过未变化的检测）
+
+        Returns:
+            (快照ID, 变化详情)，没有变化时变化详情为 None
+        """
+        with self._file_lock():
+            state = self._load()
+            previous = state['snapshot']
+            if (previous is not None and previous['checksum'] == snapshot['checksum']
+                    and previous.get('fingerprint_checksum') == snapshot.get('fingerprint_checksum')):
+                if probe is not None and probe != state.get('probe'):
+                    # 探测值变化但快照未变（如只有数据更新），只更新探测值，避免每次轮询都读取整库快照
+                    self._save({**state, 'probe': probe})
+                return state['snapshot_id'], None
+
+            changes = self.metadata_manager.compare_snapshots(previous, snapshot)
+            snapshot_id = state['snapshot_id'] + 1
+            history = state['history'] + [{
+                'id': snapshot_id,
+                'timestamp': snapshot['timestamp'],
+                **{field: changes[field] for field in CHANGE_FIELDS}
+            }]
+            self._save({
+                'snapshot_id': snapshot_id,
+                'snapshot': snapshot,
+                'probe': probe,
+                'history': history[-self.history_limit:]
+            })
+            return snapshot_id, changes
+
+    def check(self, force: bool = False) -> Tuple[int, bool]:
+        """
+        检测元数据变化：距上次检测不足 min_check_interval 时直接返回最近结果；否则先做一次单行探测，
+        探测值与最新快照记录的一致时不再查询，变化时才读取整库快照并记录。
+        查询数据库时不持有锁，只在记录结果时加锁，读取快照的请求不会等待整库查询；
+        无论是否查询，本进程尚未分发的快照（本次记录的或其他进程记录的）都会分发给下游缓存
+
+        Args:
+            force: 忽略最小间隔和探测值，立即读取整库快照
+
+        Returns:
+            (快照ID, 本次是否检测到变化)
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = force or now - self._checked_at >= self.min_check_interval
+            if due:
+                # 间隔内的其他轮询不再重复查询
+                self._checked_at = now
+
+        changes = None
+        if due:
+            probe = self.metadata_manager.get_catalog_probe()
+            with self._lock:
+                unchanged = not force and probe == self._load().get('probe')
+            if not unchanged:
+                snapshot = self.metadata_manager.get_metadata_snapshot()
+                _, changes = self.record(snapshot, probe)
+
+        return self._sync()['snapshot_id'], changes is not None
+
+    def check_in_background(self) -> bool:
+        """
+        在后台线程中立即检测一次（不阻塞调用方）；已有后台检测在运行时，结束后再检测一次
+
+        Returns:
+            是否启动了新的后台线程
+        """
+        with self._lock:
+            self._background_pending = True
+            if self._background is not None:
+                return False
+            self._background = threading.Thread(
+                target=self._run_background, name=f'snapshot-check-{self.database}', daemon=True)
+            thread = self._background
+        thread.start()
+        return True
+
+    def _run_background(self):
+        """后台线程：处理完所有检测请求后退出"""
+        while True:
+            with self._lock:
+                if not self._background_pending:
+                    self._background = None
+                    return
+                self._background_pending = False
+            try:
+                self.check(force=True)
+            except Exception as e:
+                print(f"后台检测元数据变化失败: {e}")
+
+    def _apply_changes(self, snapshot: Dict, changes: Dict):
+        """
+        把变化分发给下游：对象名称变化时对象目录随校验和整体刷新（依赖图、搜索索引随之重建），
+        只有对象内容变化时依赖图和搜索索引只更新被修改的对象，表结构缓存只重新读取变化的对象，
+        其余缓存由监听器按对象失效
+        """
+        get_catalog(self.config).refresh(snapshot)
+        modified = changes.get('modified_tables', []) + changes.get('modified_views', [])
+        if modified:
+            invalidate_graph_objects(self.config, modified)
+            invalidate_search_objects(self.config, modified)
+        # 表结构缓存按对象刷新，新增和删除的对象同样只重新读取这些对象
+        invalidate_structure_objects(self.config, modified + [
+            name for field in ('added_tables', 'removed_tables', 'added_views', 'removed_views')
+            for name in changes.get(field, ())
+        ])
+        for listener in list(_change_listeners):
+            try:
+                listener(self.config, changes)
+            except Exception as e:
+                print(f"元数据变化回调失败: {e}")
+
+    def changes_since(self, since_id: Optional[int]) -> Dict:
+        """
+        获取自客户端快照ID之后的增量变化
+
+        Args:
+            since_id: 客户端上次看到的快照ID，None 或超出保留范围时返回完整列表（reset=True）
+
+        Returns:
+            {'snapshot_id', 'since', 'has_changes', 'reset', 'added_tables', 'removed_tables',
+             'added_views', 'removed_views', 'timestamp'}
+        """
+        return self._delta(self._sync(), since_id)
+
+    @staticmethod
+    def _delta(state: Dict, since_id: Optional[int]) -> Dict:
+        """计算快照文件内容中自 since_id 之后的增量变化（changes_since 的返回格式）"""
+        snapshot_id = state['snapshot_id']
+        snapshot = state['snapshot'] or {'tables': [], 'views': [], 'timestamp': None}
+        history = state['history']
+
+        result = {'snapshot_id': snapshot_id, 'since': since_id, 'timestamp': snapshot['timestamp']}
+        if since_id == snapshot_id:
+            result.update({'has_changes': False, 'reset': False}, **{field: [] for field in CHANGE_FIELDS})
+            return result
+
+        oldest_base = history[0]['id'] - 1 if history else snapshot_id
+        if since_id is None or since_id > snapshot_id or since_id < oldest_base:
+            # 无法给出增量，返回完整列表
+            result.update({field: [] for field in CHANGE_FIELDS})
+            result.update({
+                'has_changes': True,
+                'reset': True,
+                'added_tables': snapshot['tables'],
+                'added_views': snapshot['views']
+            })
+            return result
+
+        merged = merge_changes([entry for entry in history if entry['id'] > since_id])
+        result.update(merged)
+        result['has_changes'] = any(merged[field] for field in CHANGE_FIELDS)
+        result['reset'] = False
+        return result
+
+
+# 全局快照存储注册表
+_stores: Dict[Tuple[str, str], SnapshotStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_snapshot_store(config: Dict) -> SnapshotStore:
+    """
+    获取配置对应的快照存储（按 配置ID + 数据库 共享）
+
+    Args:
+        config: 数据库配置（含明文密码）
+
+    Returns:
+        SnapshotStore 实例
+    """
+    key = (config.get('id') or config['host'], config['database'])
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = SnapshotStore(config)
+            _stores[key] = store
+        return store
+
+
+def invalidate_snapshot_store(config_id: str):
+    """
+    移除指定配置的快照存储实例（磁盘上的快照保留）
+
+    Args:
+        config_id: 配置ID
+    """
+    with _stores_lock:
+        for key in [key for key in _stores if key[0] == config_id]:
+            del _stores[key]
+
+
+def _check_on_probe_change(config: Dict):
+    """对象目录探测值变化时在后台检测快照，按对象的变化经 _apply_changes 分发给依赖图、搜索索引和表结构缓存"""
+    get_snapshot_store(config).check_in_background()
+
+
+add_probe_listener(_check_on_probe_change)
+add_invalidation_listener(invalidate_snapshot_store)
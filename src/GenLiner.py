@@ -1,9 +1,23 @@
-import re
+import os
+import queue
+import sys
 from collections import defaultdict
-from typing import Dict, List, Set, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Set, Optional
 import pymysql
 from abc import ABC, abstractmethod
 
+# 复用项目根目录 utils 包中只依赖标准库的模块（依赖关系图、SQL 解析）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.graph import DependencyGraph  # noqa: E402
+from utils.sql_parser import extract_local_dependencies  # noqa: E402
+
+# VIEW_DEFINITION 长度达到该值时视为被服务端截断，改用 SHOW CREATE VIEW
+VIEW_DEFINITION_TRUNCATE_LENGTH = 65535
+
+# 构建进度回调：(阶段, 已完成数, 总数)
+ProgressCallback = Callable[[str, int, int], None]
+
 
 class DatabaseConnection(ABC):
     """数据库连接抽象基类"""
@@ -24,15 +38,31 @@ class DatabaseConnection(ABC):
         pass
 
     @abstractmethod
-    def close(self):
+    def get_all_objects(self) -> Dict[str, str]:
+        """获取所有表和视图：{名称: 'table' | 'view'}"""
+        pass
+
+    @abstractmethod
+    def get_all_view_definitions(self) -> Dict[str, str]:
+        """一次获取所有视图定义：{视图名: 定义SQL}"""
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
         """关闭连接"""
         pass
 
+    def clone(self) -> Optional['DatabaseConnection']:
+        """打开一个连接到同一数据库的新连接（用于并行读取），不支持时返回 None"""
+        return None
+
 
 class StarRocksConnection(DatabaseConnection):
     """StarRocks数据库连接实现"""
 
     def __init__(self, host: str, port: int, user: str, password: str, database: str):
+        self.database = database
+        self._params = (host, port, user, password, database)
         self.connection = pymysql.connect(
             host=host,
             port=port,
@@ -74,7 +104,26 @@ class StarRocksConnection(DatabaseConnection):
         cursor.close()
         return tables
 
-    def close(self):
+    def get_all_objects(self) -> Dict[str, str]:
+        cursor = self.connection.cursor()
+        cursor.execute("SHOW FULL TABLES")
+        objects = {row[0]: 'view' if row[1] == 'VIEW' else 'table' for row in cursor.fetchall()}
+        cursor.close()
+        return objects
+
+    def get_all_view_definitions(self) -> Dict[str, str]:
+        cursor = self.connection.cursor()
+        cursor.execute(
+            "SELECT TABLE_NAME, VIEW_DEFINITION FROM information_schema.VIEWS WHERE TABLE_SCHEMA = DATABASE()"
+        )
+        definitions = {row[0]: row[1] or "" for row in cursor.fetchall()}
+        cursor.close()
+        return definitions
+
+    def clone(self) -> 'StarRocksConnection':
+        return StarRocksConnection(*self._params)
+
+    def close(self) -> None:
         self.connection.close()
 
 
@@ -85,80 +134,19 @@ class TableDependencyAnalyzer:
         self.db = db_connection
         self.dependency_map: Dict[str, Set[str]] = defaultdict(set)
         self.reverse_dependency: Dict[str, Set[str]] = defaultdict(set)
+        self.graph: Optional[DependencyGraph] = None
+        # 数据库中的全部表和视图（每次构建只读取一次）
+        self._objects: Optional[Dict[str, str]] = None
 
     def extract_dependencies_from_sql(self, sql_text: str) -> Set[str]:
-        """从SQL文本中提取表依赖关系"""
-        # 更精确的正则表达式，匹配数据库名.表名或表名
-        patterns = [
-            # 匹配 FROM/JOIN 后面的表名（可能包含数据库名）
-            r'(?:FROM|JOIN|INNER\s+JOIN|LEFT\s+JOIN|RIGHT\s+JOIN|LEFT\s+OUTER\s+JOIN|RIGHT\s+OUTER\s+JOIN|FULL\s+OUTER\s+JOIN|CROSS\s+JOIN)\s+`?[\w_]*`?\.?`?([a-zA-Z_][a-zA-Z0-9_]*)`?(?=\s|$|\s+ON|\s+AS|\s+WHERE|\s+GROUP|\s+ORDER)',
-            # 匹配在括号内的子查询中的表名
-            r'\(`?[\w_]*`?\.?`?([a-zA-Z_][a-zA-Z0-9_]*)`?(?=\s+\w+|\))',
-        ]
-
-        tables = set()
-        for pattern in patterns:
-            matches = re.findall(pattern, sql_text, re.IGNORECASE)
-            for match in matches:
-                # 过滤掉常见的SQL关键字
-                if match.upper() not in [
-                    'ON', 'AS', 'AND', 'OR', 'WHERE', 'ORDER', 'GROUP', 'HAVING', 'LIMIT', 'BY',
-                    'USING', 'SELECT', 'DISTINCT', 'ALL', 'ANY', 'SOME', 'EXISTS', 'NOT', 'IN',
-                    'BETWEEN', 'LIKE', 'IS', 'NULL', 'TRUE', 'FALSE', 'CASE', 'WHEN', 'THEN',
-                    'ELSE', 'END', 'UNION', 'INTERSECT', 'EXCEPT', 'MINUS', 'HAVING', 'COMPUTE',
-                    'INTO', 'FOR', 'CURSOR', 'WITH', 'RECURSIVE', 'TEMPORARY', 'TEMP', 'UNLOGGED',
-                    'IF', 'ENDIF', 'LOOP', 'LEAVE', 'ITERATE', 'REPEAT', 'UNTIL', 'WHILE',
-                    'RETURN', 'CALL', 'DO', 'EXECUTE', 'PREPARE', 'DEALLOCATE', 'BEGIN',
-                    'TABLE', 'VIEW', 'INDEX', 'COLUMN', 'CONSTRAINT', 'PRIMARY', 'FOREIGN',
-                    'KEY', 'UNIQUE', 'CHECK', 'DEFAULT', 'REFERENCES', 'CASCADE', 'RESTRICT',
-                    'SET', 'NO', 'ACTION', 'MATCH', 'SIMPLE', 'FULL', 'PARTIAL', 'SOURCE',
-                    'TARGET', 'ROLE', 'USER', 'GRANT', 'REVOKE', 'PRIVILEGES', 'ADMIN', 'OPTION',
-                    'TRIGGER', 'PROCEDURE', 'FUNCTION', 'ROUTINE', 'PACKAGE', 'TYPE', 'DOMAIN',
-                    'SCHEMA', 'CATALOG', 'DATABASE', 'SERVER', 'LINK', 'CONNECTION', 'SESSION',
-                    'TRANSACTION', 'ISOLATION', 'LEVEL', 'READ', 'WRITE', 'COMMIT', 'ROLLBACK',
-                    'SAVEPOINT', 'LOCK', 'SHARED', 'EXCLUSIVE', 'ROW', 'PAGE', 'TABLESPACE',
-                    'EXTENT', 'SEGMENT', 'CLUSTER', 'SNAPSHOT', 'CONSISTENT', 'AUTOCOMMIT',
-                    'IMPLICIT', 'EXPLICIT', 'TEMP', 'VOLATILE', 'STABLE', 'IMMUTABLE', 'CALLED',
-                    'ON', 'NULL', 'INPUT', 'RETURNS', 'LANGUAGE', 'EXTERNAL', 'NAME', 'PARAMETER',
-                    'MODE', 'IN', 'OUT', 'INOUT', 'VARIADIC', 'SETOF', 'TABLE', 'OF', 'UNDER',
-                    'SCOPE', 'SPECIFIC', 'RESULT', 'DYNAMIC', 'FUNCTION', 'METHOD', 'MAP', 'ORDER',
-                    'INSTANCE', 'STATIC', 'FINAL', 'OVERRIDING', 'MEMBER', 'CONSTRUCTOR', 'SELF',
-                    'NEW', 'OLD', 'ROW_COUNT', 'FOUND', 'NOT_FOUND', 'SQLSTATE', 'SQLEXCEPTION',
-                    'SQLWARNING', 'CONTINUE', 'EXIT', 'UNDO', 'SIGNAL', 'RESIGNAL', 'GET',
-                    'DIAGNOSTICS', 'CONDITION', 'NUMBER', 'MESSAGE_TEXT', 'CLASS_ORIGIN',
-                    'SUBCLASS_ORIGIN', 'CONSTRAINT_CATALOG', 'CONSTRAINT_SCHEMA', 'CONSTRAINT_NAME',
-                    'CATALOG_NAME', 'SCHEMA_NAME', 'TABLE_NAME', 'COLUMN_NAME', 'CURSOR_NAME',
-                    'CONNECTION_NAME', 'SERVER_NAME', 'DBINFO', 'SYSTEM_USER', 'USER', 'CURRENT_USER',
-                    'CURRENT_DATE', 'CURRENT_TIME', 'CURRENT_TIMESTAMP', 'LOCALTIME', 'LOCALTIMESTAMP',
-                    'CURRENT_ROLE', 'SESSION_USER', 'CURRENT_PATH', 'CURRENT_TRANSFORM_GROUP_ID',
-                    'TRUNCATE', 'DROP', 'CREATE', 'ALTER', 'ADD', 'MODIFY', 'CHANGE', 'RENAME',
-                    'DELETE', 'INSERT', 'UPDATE', 'UPSERT', 'REPLACE', 'MERGE', 'ANALYZE', 'EXPLAIN',
-                    'DESCRIBE', 'DESC', 'SHOW', 'USE', 'SET', 'RESET', 'KILL', 'PURGE', 'FLUSH',
-                    'CACHE', 'UNCACHE', 'REFRESH', 'LOAD', 'UNLOAD', 'EXPORT', 'IMPORT', 'COPY',
-                    'MOVE', 'LINK', 'SYMLINK', 'MKDIR', 'RM', 'LS', 'CAT', 'HEAD', 'TAIL', 'STAT',
-                    'CHMOD', 'CHOWN', 'CHGRP', 'MV', 'CP', 'LN', 'RM', 'RMDIR', 'MKDIRS', 'SYNC',
-                    'DISTCP', 'HAR', 'ARCHIVE', 'UNARCHIVE', 'COMPACT', 'CLEANUP', 'OPTIMIZE',
-                    'MAINTAIN', 'MAINTENANCE', 'REPAIR', 'RECOVER', 'RESTORE', 'BACKUP', 'SNAPSHOT',
-                    'CLONE', 'FORK', 'BRANCH', 'TAG', 'CHECKOUT', 'MERGE', 'REBASE', 'CHERRY_PICK',
-                    'RESET', 'REVERT', 'AMEND', 'STASH', 'POP', 'APPLY', 'DIFF', 'LOG', 'STATUS',
-                    'ADD', 'REMOVE', 'COMMIT', 'PUSH', 'PULL', 'FETCH', 'CLONE', 'INIT', 'CONFIG',
-                    'REMOTE', 'BRANCH', 'TAG', 'WORKTREE', 'SUBMODULE', 'SUBTREE', 'FILTER_BRANCH',
-                    'FILTER_REFS', 'FILTER_OBJECTS', 'FILTER_COMMIT', 'FILTER_TREE', 'FILTER_BLOB',
-                    'FILTER_TAG', 'FILTER_MERGE', 'FILTER_REBASE', 'FILTER_CHERRY_PICK', 'FILTER_RESET',
-                    'FILTER_REVERT', 'FILTER_AMEND', 'FILTER_STASH', 'FILTER_POP', 'FILTER_APPLY',
-                    'FILTER_DIFF', 'FILTER_LOG', 'FILTER_STATUS', 'FILTER_ADD', 'FILTER_REMOVE',
-                    'FILTER_COMMIT', 'FILTER_PUSH', 'FILTER_PULL', 'FILTER_FETCH', 'FILTER_CLONE',
-                    'FILTER_INIT', 'FILTER_CONFIG', 'FILTER_REMOTE', 'FILTER_WORKTREE', 'FILTER_SUBMODULE',
-                    'FILTER_SUBTREE', 'FILTER_FILTER_BRANCH', 'FILTER_FILTER_REFS', 'FILTER_FILTER_OBJECTS',
-                    'FILTER_FILTER_COMMIT', 'FILTER_FILTER_TREE', 'FILTER_FILTER_BLOB', 'FILTER_FILTER_TAG',
-                    'FILTER_FILTER_MERGE', 'FILTER_FILTER_REBASE', 'FILTER_FILTER_CHERRY_PICK',
-                    'FILTER_FILTER_RESET', 'FILTER_FILTER_REVERT', 'FILTER_FILTER_AMEND', 'FILTER_FILTER_STASH',
-                    'FILTER_FILTER_POP', 'FILTER_FILTER_APPLY', 'FILTER_FILTER_DIFF', 'FILTER_FILTER_LOG',
-                    'FILTER_FILTER_STATUS', 'FILTER_FILTER_ADD', 'FILTER_FILTER_REMOVE'
-                ]:
-                    tables.add(match)
+        """从SQL文本中提取表依赖关系（仅当前数据库内的对象）"""
+        return extract_local_dependencies(sql_text, self.db.database)
 
-        return tables
+    def get_objects(self) -> Dict[str, str]:
+        """获取全部表和视图 {名称: 'table' | 'view'}（首次调用时读取，之后复用）"""
+        if self._objects is None:
+            self._objects = self.db.get_all_objects()
+        return self._objects
 
     def analyze_view_dependencies(self, table_name: str) -> Set[str]:
         """分析单个表或视图的依赖关系"""
@@ -166,8 +154,7 @@ class TableDependencyAnalyzer:
         dependencies = self.extract_dependencies_from_sql(table_def)
 
         # 只保留实际存在的表或视图
-        all_tables = set(self.db.get_all_tables())
-        valid_deps = dependencies.intersection(all_tables)
+        valid_deps = {dep for dep in dependencies if dep in self.get_objects()}
 
         self.dependency_map[table_name] = valid_deps
 
@@ -177,17 +164,96 @@ class TableDependencyAnalyzer:
 
         return valid_deps
 
-    def build_full_dependency_graph(self):
-        """构建完整的依赖关系图"""
-        all_tables = self.db.get_all_tables()
+    def _fetch_view_definitions(self, view_names: List[str], workers: int,
+                                progress: Optional[ProgressCallback]) -> Dict[str, str]:
+        """
+        逐个读取视图定义（SHOW CREATE VIEW），多个连接并行执行
+
+        Args:
+            view_names: 视图名列表
+            workers: 并行连接数（连接不支持 clone 时只使用当前连接）
+            progress: 进度回调
+
+        Returns:
+            {视图名: 定义SQL}
+        """
+        connections: 'queue.Queue[DatabaseConnection]' = queue.Queue()
+        connections.put(self.db)
+        opened: List[DatabaseConnection] = []
+        try:
+            for _ in range(min(workers, len(view_names)) - 1):
+                conn = self.db.clone()
+                if conn is None:
+                    break
+                opened.append(conn)
+                connections.put(conn)
+
+            def fetch(name: str) -> str:
+                conn = connections.get()
+                try:
+                    return conn.get_view_definition(name)
+                finally:
+                    connections.put(conn)
+
+            definitions = {}
+            with ThreadPoolExecutor(max_workers=len(opened) + 1) as executor:
+                futures = {executor.submit(fetch, name): name for name in view_names}
+                for done, future in enumerate(as_completed(futures), 1):
+                    name = futures[future]
+                    try:
+                        definitions[name] = future.result()
+                    except Exception as e:
+                        print(f"错误: 无法获取视图 {name} 的定义 - {e}")
+                    if progress:
+                        progress('definitions', done, len(view_names))
+            return definitions
+        finally:
+            for extra in opened:
+                extra.close()
+
+    def build_full_dependency_graph(self, workers: int = 4, progress: Optional[ProgressCallback] = None) -> None:
+        """
+        构建完整的依赖关系图
+
+        对象列表和视图定义各批量读取一次；information_schema 中缺失或被截断的视图定义
+        用 workers 个连接并行 SHOW CREATE VIEW 补齐，之后在内存中解析建图
+
+        Args:
+            workers: 补读视图定义时的并行连接数
+            progress: 进度回调 (阶段, 已完成数, 总数)，阶段为 objects / definitions / parse
+        """
+        self._objects = None
+        objects = self.get_objects()
+        if progress:
+            progress('objects', len(objects), len(objects))
+
+        views = [name for name, obj_type in objects.items() if obj_type == 'view']
+        definitions = self.db.get_all_view_definitions()
+        incomplete = [
+            name for name in views
+            if not definitions.get(name) or len(definitions[name]) >= VIEW_DEFINITION_TRUNCATE_LENGTH
+        ]
+        if incomplete:
+            definitions.update(self._fetch_view_definitions(incomplete, workers, progress))
+
+        parsed = [0]
+        view_count = sum(1 for name in views if definitions.get(name))
 
-        for table in all_tables:
-            try:
-                # 尝试获取视图定义
-                self.analyze_view_dependencies(table)
-            except Exception:
-                # 普通表没有复杂定义，跳过
-                continue
+        def extract(sql_text: str) -> Set[str]:
+            parsed[0] += 1
+            if progress:
+                progress('parse', parsed[0], view_count)
+            return self.extract_dependencies_from_sql(sql_text)
+
+        self.graph = DependencyGraph.build(objects, definitions, extract)
+
+        self.dependency_map.clear()
+        self.reverse_dependency.clear()
+        for name in self.graph.names:
+            deps = self.graph.get_dependencies(name)
+            self.dependency_map[name] = set(deps)
+            for dep in deps:
+                self.reverse_dependency[dep].add(name)
 
     def get_dependencies_for_table(self, table_name: str) -> Set[str]:
         """获取指定表的所有依赖项"""
@@ -201,32 +267,101 @@ class TableDependencyAnalyzer:
             # 对于普通表，返回空集
             return set()
 
+    def get_transitive_dependents(self, table_name: str, max_depth: Optional[int] = None) -> Dict[str, int]:
+        """
+        获取直接或间接依赖该对象的所有对象（基于依赖关系图的反向邻接表广度优先遍历）
+
+        需先调用 build_full_dependency_graph 构建依赖关系图
+
+        Args:
+            table_name: 对象名
+            max_depth: 最大遍历深度，None 表示无限制
+
+        Returns:
+            {对象名: 距离}，直接依赖方距离为 1；尚未构建依赖关系图时返回空字典
+        """
+        if self.graph is None:
+            return {}
+        return self.graph.get_transitive_dependents(table_name, max_depth)
+
     def get_full_dependencies_recursive(self, table_name: str, visited: Optional[Set[str]] = None) -> Dict[
         str, Set[str]]:
-        """递归获取完整的依赖关系树"""
-        if visited is None:
-            visited = set()
+        """
+        获取完整的依赖关系（所有可达对象的直接依赖）
+
+        迭代遍历，所有分支共用一个 visited 集合，每个对象只分析一次；
+        菱形依赖不会按路径重复展开，环也不会导致死循环
 
+        Args:
+            table_name: 根对象名
+            visited: 已处理过的对象（这些对象不会再展开）
+
+        Returns:
+            {对象名: 直接依赖集合}
+        """
+        visited = set(visited) if visited else set()
         if table_name in visited:
             return {}
 
+        result: Dict[str, Set[str]] = {}
         visited.add(table_name)
-        dependencies = self.get_dependencies_for_table(table_name)
-
-        result = {table_name: dependencies}
-
-        for dep in dependencies:
-            sub_deps = self.get_full_dependencies_recursive(dep, visited.copy())
-            result.update(sub_deps)
-
+        stack = [table_name]
+        while stack:
+            current = stack.pop()
+            dependencies = self.get_dependencies_for_table(current)
+            result[current] = dependencies
+            for dep in dependencies:
+                if dep not in visited:
+                    visited.add(dep)
+                    stack.append(dep)
         return result
 
+    @staticmethod
+    def find_cycles(deps_dict: Dict[str, Set[str]], root_table: str) -> List[List[str]]:
+        """
+        查找从根对象可达的循环依赖（迭代深度优先，每条回边报告一次）
+
+        Args:
+            deps_dict: {对象名: 直接依赖集合}
+            root_table: 根对象名
+
+        Returns:
+            环列表，每个环形如 [a, b, ..., a]
+        """
+        cycles = []
+        finished: Set[str] = set()
+        path = [root_table]
+        on_path = {root_table}
+        stack = [iter(sorted(deps_dict.get(root_table, ())))]
+        while stack:
+            dep = next(stack[-1], None)
+            if dep is None:
+                stack.pop()
+                finished.add(path[-1])
+                on_path.discard(path.pop())
+                continue
+            if dep in on_path:
+                cycles.append(path[path.index(dep):] + [dep])
+            elif dep not in finished:
+                path.append(dep)
+                on_path.add(dep)
+                stack.append(iter(sorted(deps_dict.get(dep, ()))))
+        return cycles
+
     def format_dependency_tree(self, root_table: str, full_analysis: bool = True) -> str:
         """格式化输出依赖关系树"""
         if full_analysis:
             # 进行完整的依赖分析
             all_deps = self.get_full_dependencies_recursive(root_table)
-            return self._format_full_dependency_tree(all_deps, root_table)
+            result = self._format_full_dependency_tree(all_deps, root_table)
+
+            # 循环依赖单独列出
+            cycles = self.find_cycles(all_deps, root_table)
+            if cycles:
+                result += "\nCircular references:\n"
+                for cycle in cycles:
+                    result += f"  {' -> '.join(cycle)}\n"
+            return result
         else:
             # 只显示直接依赖
             dependencies = self.get_dependencies_for_table(root_table)
@@ -236,29 +371,48 @@ class TableDependencyAnalyzer:
             return result
 
     def _format_full_dependency_tree(self, deps_dict: Dict[str, Set[str]], root_table: str) -> str:
-        """格式化完整的依赖关系树"""
-
-        def _build_tree(current_table: str, depth: int = 0, visited: Set[str] = None) -> str:
-            if visited is None:
-                visited = set()
-
-            if current_table in visited:
-                return f"{'  ' * depth}{current_table} (circular reference)\n"
+        """
+        格式化完整的依赖关系树（迭代实现）
+
+        每个有依赖的对象只在第一次出现时展开，之后出现时标记 (see above) 引用前文；
+        指向当前路径上祖先的依赖标记 (circular reference)。输出大小与边数成正比
+        """
+        lines = [f"{root_table}\n"]
+        expanded = {root_table}
+        on_path = {root_table}
+        # (对象名, 缩进层级, 剩余依赖迭代器)
+        stack = [(root_table, 0, iter(sorted(deps_dict.get(root_table, ()))))]
+        while stack:
+            current_table, depth, children = stack[-1]
+            dep = next(children, None)
+            if dep is None:
+                stack.pop()
+                on_path.discard(current_table)
+                continue
 
-            visited.add(current_table)
-            result = f"{'  ' * depth}{current_table}\n"
+            indent = '  ' * (depth + 1)
+            if dep in on_path:
+                lines.append(f"{indent}-> {dep} (circular reference)\n")
+            elif not deps_dict.get(dep):
+                lines.append(f"{indent}-> {dep}\n")
+            elif dep in expanded:
+                lines.append(f"{indent}-> {dep} (see above)\n")
+            else:
+                # 显示下一层依赖
+                lines.append(f"{indent}-> {dep}\n")
+                lines.append(f"{'  ' * (depth + 2)}{dep}\n")
+                expanded.add(dep)
+                on_path.add(dep)
+                stack.append((dep, depth + 2, iter(sorted(deps_dict[dep]))))
 
-            if current_table in deps_dict:
-                for dep in sorted(deps_dict[current_table]):
-                    result += f"{'  ' * (depth + 1)}-> {dep}\n"
-                    # 递归显示下一层依赖
-                    if dep in deps_dict and len(deps_dict[dep]) > 0:
-                        result += _build_tree(dep, depth + 2, visited.copy())
+        return ''.join(lines)
 
-            visited.remove(current_table)
-            return result
 
-        return _build_tree(root_table)
+def print_progress(stage: str, done: int, total: int) -> None:
+    """在标准错误输出上显示构建进度"""
+    labels = {'objects': '读取对象列表', 'definitions': '读取视图定义', 'parse': '解析视图依赖'}
+    end = '\n' if done >= total else ''
+    print(f"\r{labels.get(stage, stage)}: {done}/{total}", end=end, file=sys.stderr, flush=True)
 
 
 def analyze_table_dependencies(
@@ -291,7 +445,7 @@ def analyze_table_dependencies(
         analyzer = TableDependencyAnalyzer(db_conn)
 
         # 构建完整依赖图
-        analyzer.build_full_dependency_graph()
+        analyzer.build_full_dependency_graph(progress=print_progress)
 
         # 获取并格式化目标表的完整依赖关系
         dependency_tree = analyzer.format_dependency_tree(target_table, full_analysis=True)
@@ -1,6 +1,13 @@
+import os
+import sys
+from typing import Dict, Optional, Tuple
+
 import mysql.connector
 from graphviz import Digraph
-import re
+
+# 复用项目根目录下的 SQL 依赖解析模块
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.sql_parser import extract_local_dependencies  # noqa: E402
 
 # ========================
 # StarRocks 连接配置（请按你的环境修改）
@@ -15,11 +22,59 @@ STARROCKS_CONFIG = {
 }
 
 
+# information_schema.VIEWS 中定义长度达到该值时视为被截断，回退到 SHOW CREATE VIEW
+VIEW_DEFINITION_TRUNCATE_LENGTH = 65535
+
+# 整库对象类型与视图定义缓存（首次使用时一次性加载）
+_object_types: Optional[Dict[str, str]] = None
+_view_definitions: Dict[str, str] = {}
+
+
 def get_db_connection():
     """建立 StarRocks 连接"""
     return mysql.connector.connect(**STARROCKS_CONFIG)
 
 
+def load_catalog() -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    一次性加载整库的对象类型和视图定义
+    返回: ({对象名: 'VIEW' | 'TABLE'}, {视图名: 定义})
+    """
+    global _object_types, _view_definitions
+    if _object_types is not None:
+        return _object_types, _view_definitions
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT TABLE_NAME, TABLE_TYPE FROM information_schema.TABLES WHERE TABLE_SCHEMA = %s",
+            (STARROCKS_CONFIG['database'],)
+        )
+        object_types = {row[0]: 'VIEW' if row[1] == 'VIEW' else 'TABLE' for row in cursor.fetchall()}
+
+        cursor.execute(
+            "SELECT TABLE_NAME, VIEW_DEFINITION FROM information_schema.VIEWS WHERE TABLE_SCHEMA = %s",
+            (STARROCKS_CONFIG['database'],)
+        )
+        view_definitions = {row[0]: row[1] or '' for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+    _object_types, _view_definitions = object_types, view_definitions
+    return _object_types, _view_definitions
+
+
+def get_view_sql(view_name: str) -> Optional[str]:
+    """获取视图定义：优先使用批量加载的结果，被截断时才单独 SHOW CREATE VIEW"""
+    _, view_definitions = load_catalog()
+    definition = view_definitions.get(view_name)
+    if definition and len(definition) < VIEW_DEFINITION_TRUNCATE_LENGTH:
+        return definition
+    return get_create_statement(view_name, 'VIEW')
+
+
 def get_create_statement(obj_name, obj_type='VIEW'):
     """
     获取视图或表的创建语句
@@ -44,30 +99,11 @@ def get_create_statement(obj_name, obj_type='VIEW'):
 
 def extract_table_names(sql_text):
     """
-    从 SQL 文本中提取所有表/视图名（简化版，适用于 StarRocks）
-    注意：这是一个启发式解析，复杂嵌套需更强大 parser（如 sqlglot）
+    从 SQL 文本中提取当前库内的所有表/视图名（基于 utils.sql_parser 的词法解析）
     """
     if not sql_text:
         return set()
-
-    # 移除注释和换行
-    sql = re.sub(r'--.* $ ', '', sql_text, flags=re.MULTILINE)
-    sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
-    sql = ' '.join(sql.split())
-
-    # 匹配 FROM / JOIN 后的表名（支持 `db`.`table` 或 `table`）
-    pattern = r'(?:FROM|JOIN)\s+(`(?:[^`]+`.`[^`]+|[^`]+)`)'
-    matches = re.findall(pattern, sql, re.IGNORECASE)
-
-    tables = set()
-    for match in matches:
-        # 去掉反引号
-        name = match.strip('`')
-        # 如果包含库名（如 donggua.anchor_daily），只取表名（可选）
-        if '.' in name:
-            name = name.split('.')[-1]
-        tables.add(name)
-    return tables
+    return extract_local_dependencies(sql_text, str(STARROCKS_CONFIG['database']))
 
 
 def build_lineage(view_name, visited=None, graph=None, parent=None):
@@ -92,13 +128,18 @@ def build_lineage(view_name, visited=None, graph=None, parent=None):
     # 添加当前节点
     graph.node(view_name, shape='box', style='filled', fillcolor='#d0e1ff')
 
+    # 对象类型来自批量加载的目录，不再逐个尝试 SHOW CREATE VIEW / TABLE
+    object_types, _ = load_catalog()
+    obj_type = object_types.get(view_name)
+    if obj_type != 'VIEW':
+        if obj_type == 'TABLE':
+            # 基础表
+            graph.node(view_name, shape='ellipse', style='filled', fillcolor='#c8e6c9')
+        return visited, graph
+
     # 获取定义
-    create_sql = get_create_statement(view_name, 'VIEW')
+    create_sql = get_view_sql(view_name)
     if not create_sql:
-        # 可能是基础表
-        create_sql = get_create_statement(view_name, 'TABLE')
-        if create_sql:
-            graph.node(view_name, shape='ellipse', style='filled', fillcolor='#c8e6c9')
         return visited, graph
 
     # 提取依赖
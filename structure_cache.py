@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+表结构缓存模块
+按配置/数据库在内存中缓存所有表和视图的字段结构：首次访问时一次批量查询整库的
+information_schema.COLUMNS 并按表分组，之后只重新读取元数据指纹发生变化的对象
+（变化由快照存储按对象比较指纹得出，经 invalidate_structure_objects 标记，本模块不单独扫描）
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from catalog_manager import get_catalog
+from config_manager import add_invalidation_listener
+from metadata_manager import MetadataManager
+
+
+class StructureCache:
+    """单个数据库的表结构缓存"""
+
+    def __init__(self, config: Dict):
+        """
+        初始化表结构缓存（首次访问时才加载）
+
+        Args:
+            config: 数据库配置（含明文密码）
+        """
+        self.config = config
+        self.database = config['database']
+        self.metadata_manager = MetadataManager(config)
+
+        # 对象名 -> {'table_type', 'db_comment', 'columns': [(字段名, 数据类型, 字段类型, 可空, 默认值, 注释)]}
+        self._structures: Optional[Dict[str, Dict]] = None
+        # 指纹发生变化、下次访问时需要重新读取的对象
+        self._stale: Set[str] = set()
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        # 整库加载同时只进行一次
+        self._load_lock = threading.Lock()
+
+        # 统计信息
+        self._full_loads = 0
+        self._partial_loads = 0
+        self._reloaded_objects = 0
+
+    def load(self) -> int:
+        """
+        一次批量查询加载整个数据库的表结构
+
+        Returns:
+            加载的对象数
+        """
+        with self._load_lock:
+            return self._load()
+
+    def _load(self) -> int:
+        """整库加载（调用方需持有 _load_lock）"""
+        structures = self.metadata_manager.get_table_structures()
+        with self._lock:
+            self._structures = structures
+            self._stale.clear()
+            self._loaded_at = time.time()
+            self._full_loads += 1
+        return len(structures)
+
+    def invalidate_objects(self, names: Iterable[str]):
+        """
+        标记字段或注释发生变化（或新增、删除）的对象，下次访问时只重新读取这些对象
+
+        Args:
+            names: 对象名
+        """
+        with self._lock:
+            if self._structures is not None:
+                self._stale.update(names)
+
+    def invalidate(self):
+        """清空缓存，下次访问时重新加载整库"""
+        with self._lock:
+            self._structures = None
+            self._stale.clear()
+
+    def get_many(self, names: Iterable[str]) -> Dict[str, Optional[Dict]]:
+        """
+        获取多个对象的结构；过期的对象以及对象目录中存在但缓存中没有的对象合并为一次查询
+
+        Args:
+            names: 对象名
+
+        Returns:
+            {对象名: 结构}，对象不存在时为 None（返回的结构只读，调用方不应修改）
+        """
+        names = list(dict.fromkeys(names))
+        if self._structures is None:
+            with self._load_lock:
+                if self._structures is None:
+                    self._load()
+
+        catalog = get_catalog(self.config)
+        with self._lock:
+            # 加载后立即被清空时按空缓存处理，所需对象会在下面单独读取
+            structures = self._structures if self._structures is not None else {}
+            reload = [
+                name for name in names
+                if name in self._stale or (name not in structures and catalog.object_exists(name))
+            ]
+        if reload:
+            fresh = self.metadata_manager.get_table_structures(reload)
+            with self._lock:
+                for name in reload:
+                    if name in fresh:
+                        structures[name] = fresh[name]
+                    else:
+                        structures.pop(name, None)
+                self._stale.difference_update(reload)
+                self._partial_loads += 1
+                self._reloaded_objects += len(reload)
+
+        return {name: structures.get(name) for name in names}
+
+    def get(self, name: str) -> Optional[Dict]:
+        """
+        获取单个对象的结构
+
+        Args:
+            name: 对象名
+
+        Returns:
+            结构字典，对象不存在时返回 None
+        """
+        return self.get_many([name])[name]
+
+    def stats(self) -> Dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            structures = self._structures
+            return {
+                'database': self.database,
+                'objects': len(structures) if structures is not None else None,
+                'columns': sum(len(s['columns']) for s in structures.values()) if structures is not None else None,
+                'stale': len(self._stale),
+                'loaded_at': self._loaded_at,
+                'full_loads': self._full_loads,
+                'partial_loads': self._partial_loads,
+                'reloaded_objects': self._reloaded_objects
+            }
+
+
+# 全局表结构缓存注册表
+_caches: Dict[Tuple[str, str], StructureCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_structure_cache(config: Dict) -> StructureCache:
+    """
+    获取配置对应的表结构缓存（按 配置ID + 数据库 共享）
+
+    Args:
+        config: 数据库配置（含明文密码）
+
+    Returns:
+        StructureCache 实例
+    """
+    key = (config.get('id') or config['host'], config['database'])
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = StructureCache(config)
+            _caches[key] = cache
+        return cache
+
+
+def list_structure_caches() -> List[StructureCache]:
+    """获取所有表结构缓存"""
+    with _caches_lock:
+        return list(_caches.values())
+
+
+def invalidate_structure_objects(config: Dict, names: Iterable[str]):
+    """
+    标记配置中结构发生变化的对象（由快照存储根据元数据指纹的变化调用）
+
+    Args:
+        config: 数据库配置
+        names: 对象名
+    """
+    key = (config.get('id') or config['host'], config['database'])
+    cache = _caches.get(key)
+    if cache is not None:
+        cache.invalidate_objects(names)
+
+
+def invalidate_structure_cache(config_id: str):
+    """
+    移除指定配置的所有表结构缓存
+
+    Args:
+        config_id: 配置ID
+    """
+    with _caches_lock:
+        for key in [key for key in _caches if key[0] == config_id]:
+            del _caches[key]
+
+
+add_invalidation_listener(invalidate_structure_cache)
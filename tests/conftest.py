@@ -1,6 +1,22 @@
+import os
+import tempfile
+
 import pytest
 
+# 在测试模块导入 web_view_analyzer 之前设置，Flask-Session 不在仓库根目录写 flask_session/
+os.environ.setdefault("SESSION_FILE_DIR", tempfile.mkdtemp(prefix="flask_session_"))
+
 
 @pytest.fixture(scope="session")
 def anyio_backend():
     return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def parse_cache(tmp_path, monkeypatch):
+    """全局解析缓存改用临时文件，测试不在仓库根目录写 parse_cache.db"""
+    from utils import parse_cache as parse_cache_module
+
+    cache = parse_cache_module.ParseCache(str(tmp_path / "parse_cache.db"))
+    monkeypatch.setattr(parse_cache_module, "_parse_cache", cache)
+    return cache
@@ -0,0 +1,76 @@
+import time
+
+from utils.cache import LRUCache, cached
+
+
+def test_lru_eviction_and_ttl(monkeypatch) -> None:
+    cache = LRUCache(max_entries=2, segments=1, cleanup_interval=0)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    cache.set("short", "x", ttl=1)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 2)
+    assert cache.get("short", "missing") == "missing"
+
+    stats = cache.stats()
+    assert stats["evictions"] >= 1
+    assert stats["expirations"] == 1
+
+
+def test_memory_bound_is_shared_across_segments() -> None:
+    cache = LRUCache(max_bytes=64 * 1024, segments=16, cleanup_interval=0)
+    # 远大于 1/16 容量的条目也能缓存
+    cache.set("big", "x" * 30000)
+    assert cache.get("big") == "x" * 30000
+
+    cache.set("bigger", "y" * 40000)
+    assert cache.get("bigger") == "y" * 40000
+    assert cache.get("big") is None
+    assert cache.stats()["bytes"] <= 64 * 1024
+
+    # 超过总容量的条目不缓存，并计入统计
+    cache.set("huge", "z" * 100000)
+    assert cache.get("huge") is None
+    assert cache.stats()["oversize"] == 1
+
+
+def test_namespace_invalidation() -> None:
+    cache = LRUCache(cleanup_interval=0)
+    cache.set("k1", 1, namespace="cfg1")
+    cache.set("k2", 2, namespace="cfg2")
+    assert cache.invalidate_namespace("cfg1") == 1
+    assert cache.get("k1") is None and cache.get("k2") == 2
+
+
+def test_cached_decorator_uses_stable_keys() -> None:
+    cache = LRUCache(cleanup_interval=0)
+    calls = []
+
+    class Analyzer:
+        def __init__(self, config_id):
+            self.config_id = config_id
+
+        def __cache_key__(self):
+            return self.config_id
+
+        @cached(ttl=60, key_prefix="test", namespace=lambda self, *a, **k: self.config_id, cache=cache)
+        def lookup(self, name, options=None):
+            calls.append(name)
+            return {"name": name}
+
+    assert Analyzer("c1").lookup("t", options={"b": 1, "a": 2}) == {"name": "t"}
+    assert Analyzer("c1").lookup("t", options={"a": 2, "b": 1}) == {"name": "t"}
+    assert calls == ["t"]
+
+    cache.invalidate_namespace("c1")
+    Analyzer("c1").lookup("t", options={"a": 2, "b": 1})
+    assert calls == ["t", "t"]
+
+    Analyzer.lookup.invalidate(Analyzer("c1"), "t", options={"a": 2, "b": 1})
+    Analyzer("c1").lookup("t", options={"a": 2, "b": 1})
+    assert calls == ["t", "t", "t"]
@@ -0,0 +1,27 @@
+import catalog_manager
+from catalog_manager import CatalogManager
+
+CONFIG = {"id": "cfg", "host": "localhost", "database": "db"}
+
+
+def test_refresh_reloads_only_when_probe_changes(monkeypatch) -> None:
+    catalog = CatalogManager(CONFIG, refresh_interval=0)
+    probes = iter(["p1", "p1", "p2"])
+    loads = []
+
+    def fake_objects():
+        loads.append(1)
+        return [{"name": "a", "type": "table", "comment": ""}]
+
+    notified = []
+    monkeypatch.setattr(catalog.metadata_manager, "get_catalog_probe", lambda: next(probes))
+    monkeypatch.setattr(catalog.metadata_manager, "get_all_objects", fake_objects)
+    monkeypatch.setattr(catalog_manager, "_probe_listeners", [notified.append])
+
+    assert catalog.get_object_type("a") == "table"
+    # 探测值不变时不重新加载，也不做整库快照
+    assert catalog.refresh() is False
+    assert catalog.refresh() is True
+    assert len(loads) == 2
+    # 首次加载不通知，探测值变化时通知一次
+    assert notified == [CONFIG]
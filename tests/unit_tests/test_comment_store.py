@@ -0,0 +1,32 @@
+import json
+
+from comment_store import CommentStore
+
+
+def test_edits_are_journaled_and_seen_by_other_instances(tmp_path) -> None:
+    path = tmp_path / "table_comments.json"
+    path.write_text(json.dumps({"db.a": {"table_comment": "A", "column_comments": {}}}))
+    writer = CommentStore(str(path))
+    reader = CommentStore(str(path))
+
+    assert reader.get("db.a")["table_comment"] == "A"
+    writer.set("db.b", "B", {"id": "主键"})
+    assert json.loads(path.read_text()) == {"db.a": {"table_comment": "A", "column_comments": {}}}
+    assert reader.get("db.b")["column_comments"] == {"id": "主键"}
+    assert len(reader) == 2
+
+
+def test_compaction_rewrites_snapshot_and_truncates_journal(tmp_path) -> None:
+    path = tmp_path / "table_comments.json"
+    store = CommentStore(str(path), compact_threshold=3)
+    reader = CommentStore(str(path))
+    assert reader.get("db.t0") == {}
+
+    for i in range(3):
+        store.set(f"db.t{i}", f"T{i}", {})
+    assert set(json.loads(path.read_text())) == {"db.t0", "db.t1", "db.t2"}
+    assert (tmp_path / "table_comments.json.journal").read_text() == ""
+
+    store.set("db.t0", "changed", {})
+    assert reader.get("db.t0")["table_comment"] == "changed"
+    assert CommentStore(str(path)).get("db.t2")["table_comment"] == "T2"
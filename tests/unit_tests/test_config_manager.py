@@ -0,0 +1,39 @@
+import json
+
+import config_manager
+from config_manager import ConfigManager
+
+
+def _create(manager: ConfigManager) -> str:
+    return manager.create_config("local", "starrocks", "127.0.0.1", 9030, "db", "root", "secret")["id"]
+
+
+def test_last_used_is_buffered_and_flushed(tmp_path, monkeypatch) -> None:
+    path = tmp_path / "db_configs.json"
+    manager = ConfigManager(str(path))
+    config_id = _create(manager)
+    monkeypatch.setattr(config_manager, "LAST_USED_FLUSH_INTERVAL", 3600)
+
+    before = path.read_text()
+    manager.update_last_used(config_id)
+    assert path.read_text() == before
+    assert manager.get_config(config_id)["last_used"] is not None
+
+    manager.flush()
+    saved = json.loads(path.read_text())["configs"][0]
+    assert saved["last_used"] == manager.get_config(config_id)["last_used"]
+
+
+def test_changes_from_other_workers_are_reloaded(tmp_path) -> None:
+    path = str(tmp_path / "db_configs.json")
+    worker_a = ConfigManager(path)
+    worker_b = ConfigManager(path)
+    config_id = _create(worker_a)
+
+    assert worker_b.get_config(config_id)["name"] == "local"
+    worker_b.update_config(config_id, name="renamed")
+    assert worker_a.get_config(config_id)["name"] == "renamed"
+
+    other_id = _create(worker_a)
+    assert {c["id"] for c in worker_b.list_configs()} == {config_id, other_id}
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from utils import connection_pool
+from utils.connection_pool import ConnectionPool, PoolManager, PoolTimeoutError
+
+CONFIG = {"id": "cfg", "host": "localhost", "port": 9030, "user": "u", "password": "p", "database": "db"}
+
+
+class FakeConnection:
+    def __init__(self, healthy=True):
+        self.open = True
+        self.healthy = healthy
+        self.pings = 0
+
+    def ping(self, reconnect=False):
+        self.pings += 1
+        if not self.healthy:
+            raise ConnectionError("gone")
+
+    def close(self):
+        self.open = False
+
+
+class FakePool(ConnectionPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created = []
+        self.connect_timeouts = []
+
+    def _create_connection(self, connect_timeout=None):
+        self.connect_timeouts.append(connect_timeout)
+        conn = FakeConnection()
+        self.created.append(conn)
+        return conn
+
+
+def test_released_connection_is_reused() -> None:
+    pool = FakePool(CONFIG)
+    with pool.connection() as first:
+        pass
+    with pool.connection(connect_timeout=5) as second:
+        pass
+    assert first is second and len(pool.created) == 1
+    assert pool.connect_timeouts == [None]
+
+    stats = pool.stats()
+    assert (stats["borrowed"], stats["idle"], stats["borrow_count"]) == (0, 1, 2)
+
+    # 出错后丢弃连接，不放回池中
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError("boom")
+    assert pool.stats()["idle"] == 1
+    conn = pool.acquire()
+    pool.release(conn, discard=True)
+    assert not conn.open and pool.stats()["idle"] == 0
+
+
+def test_failed_health_check_discards_connection() -> None:
+    pool = FakePool(CONFIG, health_check_interval=0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.healthy = False
+
+    replacement = pool.acquire(connect_timeout=3)
+    assert replacement is not conn and not conn.open
+    assert pool.connect_timeouts == [None, 3]
+    assert pool.stats()["discarded"] == 1 and pool.stats()["borrowed"] == 1
+
+
+def test_exhausted_pool_blocks_until_release_or_timeout() -> None:
+    pool = FakePool(CONFIG, max_size=1)
+    held = pool.acquire()
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire(timeout=0.05)
+    assert pool.stats()["timeouts"] == 1
+
+    threading.Timer(0.05, pool.release, args=(held,)).start()
+    assert pool.acquire(timeout=2) is held
+
+
+def test_idle_connections_are_evicted_down_to_min_size() -> None:
+    pool = FakePool(CONFIG, min_size=1, idle_timeout=0)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+    time.sleep(0.01)
+    pool.evict_idle()
+    assert pool.stats()["idle"] == 1
+    assert sum(not conn.open for conn in conns) == 2
+
+
+def test_manager_evictor_and_close_all() -> None:
+    manager = PoolManager(min_size=0, idle_timeout=0)
+    pool = manager.get_pool(CONFIG)
+    pool._create_connection = lambda connect_timeout=None: FakeConnection()
+    conn = pool.acquire()
+    pool.release(conn)
+
+    manager.start_evictor(interval=0.01)
+    deadline = time.monotonic() + 2
+    while conn.open and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not conn.open
+
+    manager.close_all()
+    assert manager.stats() == {}
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_connections_use_autocommit(monkeypatch) -> None:
+    calls = []
+    monkeypatch.setattr(connection_pool.pymysql, "connect", lambda **kwargs: calls.append(kwargs) or FakeConnection())
+    ConnectionPool(CONFIG)._create_connection()
+    # 不保留事务快照，下一个借用方总能读到最新的元数据
+    assert calls[0]["autocommit"] is True
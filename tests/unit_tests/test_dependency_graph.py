@@ -0,0 +1,84 @@
+import dependency_graph
+from dependency_graph import DependencyGraph
+from metadata_manager import MetadataManager
+
+OBJECTS = {
+    "ods_a": "table", "ods_b": "table", "dim": "table",
+    "dwd_a": "view", "dwd_b": "view", "dws": "view", "ads": "view",
+}
+DEFINITIONS = {
+    "dwd_a": "ods_a dim",
+    "dwd_b": "ods_b dim",
+    "dws": "dwd_a dwd_b",
+    "ads": "dws",
+}
+
+
+def test_transitive_dependents_with_depth() -> None:
+    graph = DependencyGraph.build(OBJECTS, DEFINITIONS, str.split)
+    assert graph.get_transitive_dependents("dim") == {"dwd_a": 1, "dwd_b": 1, "dws": 2, "ads": 3}
+    assert graph.get_transitive_dependents("dim", max_depth=1) == {"dwd_a": 1, "dwd_b": 1}
+
+
+def test_closure_union_is_deduplicated_in_one_pass() -> None:
+    graph = DependencyGraph.build(OBJECTS, DEFINITIONS, str.split)
+
+    downstream = list(graph.iter_closure(["ods_a", "ods_b", "missing"], downstream=True))
+    assert [name for name, _, _ in downstream] == ["dwd_a", "dwd_b", "dws", "ads"]
+    assert downstream[0] == ("dwd_a", 1, "ods_a") and downstream[2] == ("dws", 2, "ods_a")
+
+    upstream = dict((name, depth) for name, depth, _ in graph.iter_closure(["dws", "dwd_a"]))
+    # 起点本身（dwd_a）不重复产出，共享的 dim 只出现一次且取最近距离
+    assert upstream == {"ods_a": 1, "dim": 1, "dwd_b": 1, "ods_b": 2}
+    assert list(graph.iter_closure(["ads"], max_depth=1)) == [("dws", 1, "ads")]
+
+
+def test_patch_reparses_only_changed_views() -> None:
+    graph = DependencyGraph.build(OBJECTS, DEFINITIONS, str.split)
+    parsed = []
+
+    def extract(sql):
+        parsed.append(sql)
+        return sql.split()
+
+    patched = graph.patch({"dws": "view"}, {"dws": "dwd_a"}, extract)
+    assert parsed == ["dwd_a"]
+    assert patched.get_dependencies("dws") == ["dwd_a"]
+    assert patched.get_transitive_dependents("ods_b") == {"dwd_b": 1}
+    assert patched.get_dependencies("ads") == ["dws"]
+    assert patched.version != graph.version
+    # 原实例不受影响
+    assert graph.get_dependencies("dws") == ["dwd_a", "dwd_b"]
+
+
+def test_stale_objects_survive_a_failed_patch(monkeypatch) -> None:
+    class FakeCatalog:
+        checksum = "c1"
+
+        def get_objects(self):
+            return {name: (obj_type, "") for name, obj_type in OBJECTS.items()}
+
+    monkeypatch.setattr(dependency_graph, "get_catalog", lambda config: FakeCatalog())
+    monkeypatch.setattr(MetadataManager, "get_view_definitions",
+                        lambda self, names=None: {n: DEFINITIONS[n] for n in (names or DEFINITIONS)})
+    config = {"id": "stale-cfg", "host": "localhost", "database": "db"}
+    dependency_graph.invalidate_dependency_graph("stale-cfg")
+    dependency_graph.get_dependency_graph(config, str.split)
+
+    dependency_graph.invalidate_graph_objects(config, ["ads"])
+
+    def broken(self, names=None):
+        raise ConnectionError("db down")
+
+    monkeypatch.setattr(MetadataManager, "get_view_definitions", broken)
+    try:
+        dependency_graph.get_dependency_graph(config, str.split)
+    except ConnectionError:
+        pass
+    # 读取失败后对象仍待更新，不会返回过期的依赖图
+    assert dependency_graph.peek_dependency_graph(config) is None
+
+    monkeypatch.setattr(MetadataManager, "get_view_definitions", lambda self, names=None: {"ads": "dwd_a"})
+    assert dependency_graph.get_dependency_graph(config, str.split).get_dependencies("ads") == ["dwd_a"]
+    assert dependency_graph.peek_dependency_graph(config) is not None
+    dependency_graph.invalidate_dependency_graph("stale-cfg")
@@ -0,0 +1,144 @@
+import io
+import json
+import zipfile
+
+import pytest
+from flask.sessions import SecureCookieSessionInterface
+
+import export_manager
+import web_view_analyzer
+from dependency_graph import DependencyGraph
+from export_manager import ExportGraph, ExportManager, render_mermaid
+from utils.cache import LRUCache
+
+OBJECTS = {"v_report": "view", "v_orders": "view", "v_users": "view", "orders": "table", "users": "table"}
+# v_report -> v_orders -> orders, v_report -> v_users -> users, v_orders -> users（菱形）
+DEFINITIONS = {"v_report": "v_orders v_users", "v_orders": "orders users", "v_users": "users"}
+
+
+class FakeAnalyzer:
+    def __init__(self, definitions):
+        self.config_id = "cfg"
+        self.database = "db"
+        self.graph = DependencyGraph.build(OBJECTS, definitions, str.split, catalog_checksum="c1")
+
+
+def _manager(monkeypatch):
+    cache = LRUCache(cleanup_interval=0)
+    monkeypatch.setattr(export_manager, "get_cache", lambda: cache)
+    calls = []
+    original = ExportGraph.build
+
+    def counting(graph, root, max_depth=None):
+        calls.append((root, max_depth))
+        return original(graph, root, max_depth)
+
+    monkeypatch.setattr(ExportGraph, "build", staticmethod(counting))
+    return ExportManager(FakeAnalyzer(DEFINITIONS)), cache, calls
+
+
+def test_export_graph_keeps_all_edges_and_depth_limit() -> None:
+    graph = DependencyGraph.build(OBJECTS, DEFINITIONS, str.split)
+    export_graph = ExportGraph.build(graph, "v_report")
+    assert [n[0] for n in export_graph.nodes] == ["v_report", "v_orders", "v_users", "orders", "users"]
+    assert ("v_orders", "users") in export_graph.edges and len(export_graph.edges) == 5
+
+    tree = export_graph.to_tree()
+    assert [d["name"] for d in tree["dependencies"]] == ["v_orders", "v_users"]
+    assert [d["name"] for d in tree["dependencies"][1]["dependencies"]] == []
+
+    shallow = ExportGraph.build(graph, "v_report", 2)
+    assert [n[0] for n in shallow.nodes] == ["v_report", "v_orders", "v_users"]
+    assert ExportGraph.build(graph, "missing") is None
+
+
+def test_exports_share_one_graph_per_version(monkeypatch) -> None:
+    manager, cache, calls = _manager(monkeypatch)
+
+    code = manager.export_mermaid("v_report")
+    assert code.splitlines()[:3] == ["graph TD", '    N1["v_report - VIEW"]', "    N1 --> N2"]
+    assert manager.export_mermaid("v_report") is code
+    assert '"v_orders" -> "users"' in manager.export_dot("v_report")
+    assert manager.export_json("v_report")["dependency_tree"]["name"] == "v_report"
+    assert calls == [("v_report", None)]
+
+    manager.export_json("v_report", 1)
+    assert len(calls) == 2
+
+    # 视图定义变化后依赖图版本变化，重新构建
+    manager.analyzer.graph = DependencyGraph.build(OBJECTS, {"v_report": "users"}, str.split, catalog_checksum="c1")
+    assert "v_orders" not in manager.export_mermaid("v_report")
+    assert len(calls) == 3
+
+    cache.invalidate_namespace("cfg")
+    assert cache.stats()["entries"] == 0
+
+
+def test_bundle_renders_formats_from_one_graph(monkeypatch) -> None:
+    manager, _, calls = _manager(monkeypatch)
+    data = manager.export_bundle("v_report", formats=["mermaid", "dot", "json", "dot"])
+    with zipfile.ZipFile(io.BytesIO(data)) as bundle:
+        assert sorted(bundle.namelist()) == [
+            "manifest.json", "v_report_dependencies.dot", "v_report_dependencies.json", "v_report_dependencies.mmd"]
+        exported = json.loads(bundle.read("v_report_dependencies.json"))
+        manifest = json.loads(bundle.read("manifest.json"))
+    assert len(exported["edges"]) == 5
+    assert list(manifest["files"]) == ["mermaid", "dot", "json"] and manifest["skipped"] == {}
+    assert calls == [("v_report", None)]
+
+
+def test_bundle_skips_images_above_render_limit(monkeypatch) -> None:
+    manager, _, _ = _manager(monkeypatch)
+    monkeypatch.setattr(export_manager, "MAX_RENDER_NODES", 3)
+    monkeypatch.setattr(manager, "export_image", lambda *args: pytest.fail("不应渲染图片"))
+    data = manager.export_bundle("v_report", formats=["png", "mermaid", "svg"])
+    with zipfile.ZipFile(io.BytesIO(data)) as bundle:
+        assert sorted(bundle.namelist()) == ["manifest.json", "v_report_dependencies.mmd"]
+        manifest = json.loads(bundle.read("manifest.json"))
+    assert list(manifest["skipped"]) == ["png", "svg"] and "5" in manifest["skipped"]["png"]
+
+
+def test_bundle_route_rejects_malformed_formats(monkeypatch) -> None:
+    manager, _, _ = _manager(monkeypatch)
+    analyzer = manager.analyzer
+    analyzer.get_object_type = analyzer.graph.get_object_type
+    monkeypatch.setattr(web_view_analyzer, "get_analyzer", lambda: analyzer)
+    monkeypatch.setattr(web_view_analyzer.app, "session_interface", SecureCookieSessionInterface())
+    client = web_view_analyzer.app.test_client()
+
+    for formats in ["mermaid", ["mermaid", {"x": 1}], {"mermaid": True}, ["gif"]]:
+        response = client.post("/api/export/bundle", json={"root_object": "v_report", "formats": formats})
+        assert response.status_code == 400
+    response = client.post("/api/export/bundle", json={"root_object": "v_report", "formats": ["dot", "dot"]})
+    assert response.status_code == 200
+
+
+class CountingGraph:
+    """按需展开的链式依赖图：c0 -> c1 -> ... ，记录被展开的节点数"""
+
+    def __init__(self, length):
+        self.length = length
+        self.expanded = 0
+
+    def get_object_type(self, name):
+        return "view" if int(name[1:]) < self.length - 1 else "table"
+
+    def get_dependencies(self, name):
+        self.expanded += 1
+        i = int(name[1:])
+        return [f"c{i + 1}"] if i + 1 < self.length else []
+
+
+def test_stream_is_lazy_and_matches_cached_render(monkeypatch) -> None:
+    manager, _, _ = _manager(monkeypatch)
+    streamed = "".join(manager.stream("v_report", "mermaid"))
+    assert streamed == render_mermaid(ExportGraph.build(manager.analyzer.graph, "v_report"))
+    assert "".join(manager.stream("v_report", "dot")) == manager.export_dot("v_report")
+
+    # 链长 50000 的依赖图：发出第一块时只展开了一小部分节点，且不会递归溢出
+    chain = CountingGraph(50000)
+    manager.analyzer.graph = chain
+    chunks = manager.stream("c0", "dot")
+    first = next(chunks)
+    assert first.startswith("// Dependency Graph") and chain.expanded < 5000
+    assert sum(len(chunk) for chunk in chunks) > 0 and chain.expanded == 50000
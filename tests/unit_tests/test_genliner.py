@@ -0,0 +1,147 @@
+import threading
+
+from src.GenLiner import DatabaseConnection, TableDependencyAnalyzer
+
+
+class FakeConnection(DatabaseConnection):
+    """内存中的数据库：information_schema 中缺少 v_big 的定义，需要逐个补读"""
+
+    OBJECTS = {"base": "table", "dim": "table", "v_a": "view", "v_b": "view", "v_big": "view"}
+    DEFINITIONS = {"v_a": "SELECT * FROM base JOIN dim", "v_b": "SELECT * FROM v_a", "v_big": ""}
+
+    def __init__(self, calls):
+        self.database = "db"
+        self.calls = calls
+
+    def _record(self, name):
+        with self.calls["lock"]:
+            self.calls[name] = self.calls.get(name, 0) + 1
+
+    def get_view_definition(self, view_name):
+        self._record("show_create")
+        return {**self.DEFINITIONS, "v_big": "SELECT * FROM v_b"}.get(view_name, "")
+
+    def get_table_columns(self, table_name):
+        return []
+
+    def get_all_tables(self):
+        self._record("get_all_tables")
+        return [name for name, kind in self.OBJECTS.items() if kind == "table"]
+
+    def get_all_objects(self):
+        self._record("get_all_objects")
+        return dict(self.OBJECTS)
+
+    def get_all_view_definitions(self):
+        return dict(self.DEFINITIONS)
+
+    def clone(self):
+        self._record("clone")
+        return FakeConnection(self.calls)
+
+    def close(self):
+        self._record("close")
+
+
+def _analyzer(edges):
+    analyzer = TableDependencyAnalyzer(db_connection=None)
+    for name, deps in edges.items():
+        analyzer.dependency_map[name] = set(deps)
+    return analyzer
+
+
+def test_diamond_layers_are_walked_once() -> None:
+    # 40 层菱形：每层 2 个视图都依赖下一层的 2 个视图，路径数为 2^40
+    edges = {}
+    for layer in range(40):
+        for i in range(2):
+            edges[f"v{layer}_{i}"] = [f"v{layer + 1}_0", f"v{layer + 1}_1"]
+    edges["v40_0"] = edges["v40_1"] = []
+    edges["root"] = ["v0_0", "v0_1"]
+    analyzer = _analyzer(edges)
+
+    deps = analyzer.get_full_dependencies_recursive("root")
+    assert len(deps) == 83
+    tree = analyzer.format_dependency_tree("root")
+    # 第 1~39 层的视图各被引用两次，第二次只输出引用
+    assert tree.count("(see above)") == 39 * 2
+    assert "Circular references" not in tree
+
+
+def test_shared_subtrees_and_cycles_are_reported() -> None:
+    analyzer = _analyzer({
+        "report": ["orders_v", "users_v"],
+        "orders_v": ["base", "users_v"],
+        "users_v": ["base"],
+        "base": [],
+        "loop_a": ["loop_b"],
+        "loop_b": ["loop_a", "base"],
+    })
+    assert analyzer.format_dependency_tree("report") == (
+        "report\n"
+        "  -> orders_v\n"
+        "    orders_v\n"
+        "      -> base\n"
+        "      -> users_v\n"
+        "        users_v\n"
+        "          -> base\n"
+        "  -> users_v (see above)\n"
+    )
+
+    tree = analyzer.format_dependency_tree("loop_a")
+    assert "-> loop_a (circular reference)" in tree
+    assert tree.endswith("Circular references:\n  loop_a -> loop_b -> loop_a\n")
+
+
+def test_object_list_is_read_once_and_views_are_kept() -> None:
+    calls = {"lock": threading.Lock()}
+    analyzer = TableDependencyAnalyzer(FakeConnection(calls))
+    assert analyzer.get_dependencies_for_table("v_a") == {"base", "dim"}
+    assert analyzer.get_dependencies_for_table("v_b") == {"v_a"}
+    assert calls["get_all_objects"] == 1 and "get_all_tables" not in calls
+
+
+def test_full_build_fills_missing_definitions_in_parallel() -> None:
+    calls = {"lock": threading.Lock()}
+    events = []
+    analyzer = TableDependencyAnalyzer(FakeConnection(calls))
+    analyzer.build_full_dependency_graph(workers=3, progress=lambda *e: events.append(e))
+
+    assert analyzer.dependency_map["v_big"] == {"v_b"}
+    assert analyzer.reverse_dependency["v_a"] == {"v_b"}
+    assert calls["show_create"] == 1
+    # 只有一个视图需要补读，不会多开连接
+    assert "clone" not in calls
+    assert events[0] == ("objects", 5, 5)
+    assert ("definitions", 1, 1) in events and events[-1] == ("parse", 3, 3)
+
+
+def test_definition_fetch_uses_a_pool_of_connections() -> None:
+    calls = {"lock": threading.Lock()}
+    analyzer = TableDependencyAnalyzer(FakeConnection(calls))
+    definitions = analyzer._fetch_view_definitions(["v_a", "v_big", "v_b", "v_a2"], workers=3, progress=None)
+    assert definitions["v_big"] == "SELECT * FROM v_b" and len(definitions) == 4
+    assert calls["clone"] == 2 and calls["close"] == 2 and calls["show_create"] == 4
+
+
+def test_definition_fetch_without_clone_uses_one_connection() -> None:
+    class SingleConnection(FakeConnection):
+        def clone(self):
+            self._record("clone")
+            return None
+
+    calls = {"lock": threading.Lock()}
+    analyzer = TableDependencyAnalyzer(SingleConnection(calls))
+    definitions = analyzer._fetch_view_definitions(["v_a", "v_big", "v_b"], workers=3, progress=None)
+    assert len(definitions) == 3
+    assert calls["clone"] == 1 and "close" not in calls and calls["show_create"] == 3
+
+
+def test_transitive_dependents_use_reverse_index() -> None:
+    calls = {"lock": threading.Lock()}
+    analyzer = TableDependencyAnalyzer(FakeConnection(calls))
+    analyzer.build_full_dependency_graph()
+    assert analyzer.get_transitive_dependents("base") == {"v_a": 1, "v_b": 2, "v_big": 3}
+    assert analyzer.get_transitive_dependents("base", max_depth=2) == {"v_a": 1, "v_b": 2}
+    assert analyzer.get_transitive_dependents("base", max_depth=0) == {}
+    assert analyzer.get_transitive_dependents("v_big") == {}
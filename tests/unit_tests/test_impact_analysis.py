@@ -0,0 +1,60 @@
+import json
+
+import pytest
+from flask.sessions import SecureCookieSessionInterface
+
+import web_view_analyzer
+from dependency_graph import DependencyGraph
+
+OBJECTS = {"ods": "table", "dwd": "view", "dws": "view", "ads": "view"}
+DEFINITIONS = {"dwd": "ods", "dws": "dwd", "ads": "dws"}
+
+
+class FakeAnalyzer:
+    graph = DependencyGraph.build(OBJECTS, DEFINITIONS, str.split)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(web_view_analyzer, "get_analyzer", lambda: FakeAnalyzer())
+    # 不写 flask_session/ 目录
+    monkeypatch.setattr(web_view_analyzer.app, "session_interface", SecureCookieSessionInterface())
+    return web_view_analyzer.app.test_client()
+
+
+def test_max_depth_zero_is_not_unlimited(client) -> None:
+    response = client.post("/api/impact_analysis", json={"objects": ["dwd"], "max_depth": 0})
+    assert response.status_code == 200
+    assert response.get_json()["totals"] == {"upstream": 0, "downstream": 0}
+
+    response = client.post("/api/impact_analysis", json={"objects": ["dwd"], "max_depth": 1})
+    assert response.get_json()["totals"] == {"upstream": 1, "downstream": 1}
+
+    response = client.post("/api/impact_analysis", json={"objects": ["dwd"]})
+    assert [r["name"] for r in response.get_json()["downstream"]] == ["dws", "ads"]
+
+    assert client.post("/api/impact_analysis", json={"objects": ["dwd"], "max_depth": -1}).status_code == 400
+    assert client.post("/api/impact_analysis", json={"objects": ["dwd"], "max_depth": "x"}).status_code == 400
+
+
+def test_reverse_dependencies_max_depth_zero(client) -> None:
+    response = client.post("/api/reverse_dependencies", json={"object_name": "dwd", "max_depth": 0})
+    assert response.status_code == 200 and response.get_json()["total"] == 0
+
+    response = client.post("/api/reverse_dependencies", json={"object_name": "dwd"})
+    assert [(d["name"], d["depth"]) for d in response.get_json()["dependents"]] == [("dws", 1), ("ads", 2)]
+    assert client.post("/api/reverse_dependencies", json={"object_name": "dwd", "max_depth": -1}).status_code == 400
+
+
+def test_ndjson_stream_framing(client) -> None:
+    response = client.post("/api/impact_analysis", json={"objects": ["dws", "missing"], "direction": "upstream"},
+                           headers={"Accept": "application/x-ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+    body = response.get_data(as_text=True)
+    assert body.endswith("\n")
+    records = [json.loads(line) for line in body.splitlines()]
+
+    assert records[0] == {"kind": "meta", "objects": ["dws"], "missing": ["missing"]}
+    assert [(r["name"], r["depth"], r["via"]) for r in records[1:-1]] == [("dwd", 1, "dws"), ("ods", 2, "dws")]
+    assert all(r["kind"] == "node" and r["direction"] == "upstream" for r in records[1:-1])
+    assert records[-1] == {"kind": "summary", "upstream": 2}
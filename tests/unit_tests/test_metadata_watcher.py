@@ -0,0 +1,52 @@
+import queue
+import threading
+
+from metadata_watcher import MetadataWatcher
+
+
+class FakeStore:
+    database = "db"
+
+    def __init__(self):
+        self.snapshot_id = 1
+        self.checks = 0
+        self.checked = threading.Event()
+
+    def check(self, force=False):
+        self.checks += 1
+        self.checked.set()
+        return self.snapshot_id, False
+
+    def current(self):
+        return self.snapshot_id, {}
+
+
+def test_one_check_per_interval_fans_out_to_all_subscribers() -> None:
+    store = FakeStore()
+    watcher = MetadataWatcher(store, interval=3600)
+    subscribers = [watcher.subscribe() for _ in range(5)]
+    assert store.checked.wait(2)
+    # 五个订阅者共用一个后台线程，只检测了一次
+    assert store.checks == 1 and watcher.stats()["running"]
+
+    watcher.notify(2)
+    watcher.notify(3)
+    # 未取走的通知合并为一条
+    assert [s.get(timeout=1) for s in subscribers] == [2] * 5
+    assert all(s.empty() for s in subscribers)
+
+    for subscriber in subscribers:
+        watcher.unsubscribe(subscriber)
+    assert watcher.stats()["subscribers"] == 0
+
+
+def test_stop_wakes_subscribers() -> None:
+    watcher = MetadataWatcher(FakeStore(), interval=3600)
+    subscriber = watcher.subscribe()
+    watcher.stop()
+    assert watcher.stopped
+    try:
+        item = subscriber.get(timeout=1)
+    except queue.Empty:
+        item = "timeout"
+    assert item is None
@@ -0,0 +1,51 @@
+import sqlite3
+
+from utils.parse_cache import ParseCache
+
+
+def test_results_survive_restart_and_ignore_whitespace(tmp_path) -> None:
+    path = str(tmp_path / "parse_cache.db")
+    cache = ParseCache(path)
+    sql = "SELECT * FROM a JOIN db.b ON a.id = b.id JOIN other.c ON c.id = a.id"
+    assert cache.extract_local_dependencies(sql, "db") == {"a", "b"}
+    cache.flush()
+
+    restarted = ParseCache(path)
+    reformatted = sql.replace(" JOIN", "\n    JOIN")
+    assert restarted.get_dependencies(reformatted, "db") == {
+        "default_catalog.db.a",
+        "default_catalog.db.b",
+        "default_catalog.other.c",
+    }
+    assert restarted.stats()["hits"] == 1
+    assert restarted.stats()["misses"] == 0
+
+
+def test_changed_definition_is_reparsed(tmp_path) -> None:
+    cache = ParseCache(str(tmp_path / "parse_cache.db"))
+    assert cache.extract_local_dependencies("SELECT * FROM a", "db") == {"a"}
+    assert cache.extract_local_dependencies("SELECT * FROM b", "db") == {"b"}
+    assert cache.extract_local_dependencies("SELECT * FROM a", "other") == {"a"}
+    assert cache.stats()["misses"] == 3
+
+
+def test_hits_refresh_last_used_and_memory_is_bounded(tmp_path) -> None:
+    path = str(tmp_path / "parse_cache.db")
+    cache = ParseCache(path, max_entries=2)
+    cache.extract_local_dependencies("SELECT * FROM a", "db")
+    cache.flush()
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE parse_cache SET last_used = 0")
+
+    # 命中后随下一次写盘更新 last_used，重启时不会被当作长期未使用清理
+    cache.extract_local_dependencies("SELECT * FROM a", "db")
+    cache.flush()
+    assert ParseCache(path).stats()["entries"] == 1
+
+    cache.extract_local_dependencies("SELECT * FROM b", "db")
+    cache.extract_local_dependencies("SELECT * FROM c", "db")
+    assert cache.stats()["entries"] == 2
+    cache.flush()
+    # 磁盘保留全部记录，重启后只载入最近使用的 max_entries 条
+    assert ParseCache(path, max_entries=2).stats()["entries"] == 2
+    assert ParseCache(path).stats()["entries"] == 3
@@ -0,0 +1,66 @@
+import os
+import stat
+from concurrent.futures import Future
+
+import pytest
+
+from utils.render_pool import RenderError, RenderPool, RenderTimeoutError, choose_engine
+
+
+def _fake_engine(tmp_path, name, body):
+    path = tmp_path / name
+    path.write_text(f"#!/bin/sh\n{body}\n")
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def test_render_uses_content_addressed_disk_cache(tmp_path) -> None:
+    counter = tmp_path / "calls"
+    engine = _fake_engine(tmp_path, "fake_dot", f'echo x >> {counter}; cat')
+    cache_dir = str(tmp_path / "cache")
+
+    pool = RenderPool(cache_dir=cache_dir)
+    assert pool.render("digraph { a -> b }", "svg", engine) == b"digraph { a -> b }"
+    assert pool.render("digraph { a -> b }", "svg", engine) == b"digraph { a -> b }"
+    # 新实例（如重启后）直接读取磁盘缓存
+    assert RenderPool(cache_dir=cache_dir).render("digraph { a -> b }", "svg", engine) == b"digraph { a -> b }"
+    assert counter.read_text().count("x") == 1
+
+    key = RenderPool.content_key("digraph { a -> b }", "svg", engine)
+    assert os.path.exists(os.path.join(cache_dir, key[:2], f"{key}.svg"))
+    assert pool.stats()["rendered"] == 1 and pool.stats()["cache_hits"] == 1
+
+    pool.render("digraph { c }", "svg", engine)
+    small = RenderPool(cache_dir=cache_dir, cache_max_bytes=20)
+    assert small.prune() == 1
+
+
+def test_timeout_failure_and_engine_choice(tmp_path) -> None:
+    pool = RenderPool(timeout=0.2, cache_dir=None)
+    with pytest.raises(RenderTimeoutError):
+        pool.render("digraph {}", "png", _fake_engine(tmp_path, "slow_dot", "sleep 5"))
+    with pytest.raises(RenderError):
+        pool.render("digraph {}", "png", _fake_engine(tmp_path, "bad_dot", "echo boom >&2; exit 1"))
+    with pytest.raises(RenderError):
+        pool.render("digraph {}", "png", str(tmp_path / "missing"))
+    assert pool.stats()["timeouts"] == 1 and pool.stats()["inflight"] == 0
+
+    assert choose_engine(10) == "dot"
+    assert choose_engine(1000) == "sfdp"
+    with pytest.raises(RenderError):
+        choose_engine(10 ** 6)
+
+
+def test_submit_after_shutdown_releases_slot_and_render_wait_is_bounded(tmp_path, monkeypatch) -> None:
+    pool = RenderPool(max_workers=1, max_pending=0, timeout=0.05, cache_dir=None)
+    pool.shutdown()
+    for _ in range(3):
+        # 名额被归还，每次都是 RenderError 而不是 RenderQueueFullError
+        with pytest.raises(RenderError, match="不可用"):
+            pool.submit("digraph {}", "png", "dot")
+    assert pool.stats()["rejected"] == 0
+
+    # 任务一直没有结果时 render 在有限时间内超时
+    monkeypatch.setattr(pool, "submit", lambda *args: Future())
+    with pytest.raises(RenderTimeoutError):
+        pool.render("digraph {}", "png", "dot")
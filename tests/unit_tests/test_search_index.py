@@ -0,0 +1,93 @@
+import search_index
+from comment_store import CommentStore
+from search_index import SearchIndex, edit_distance
+
+OBJECTS = {
+    "dwd_order_detail": ("table", "订单明细"),
+    "ods_order": ("table", ""),
+    "orders_v": ("view", "订单视图"),
+    "user_info": ("table", "用户信息"),
+    "live_room": ("table", "直播间订单"),
+}
+
+
+def test_ranking_tiers_and_pagination() -> None:
+    index = SearchIndex(OBJECTS, "db")
+    results, has_more = index.search("order", limit=10)
+    assert [r["name"] for r in results] == ["orders_v", "dwd_order_detail", "ods_order"]
+    assert [r["match_score"] for r in results] == [100, 80, 80]
+    assert not has_more
+
+    results, _ = index.search("订单", limit=10)
+    assert [r["name"] for r in results] == ["dwd_order_detail", "orders_v", "live_room"]
+    assert [r["match_score"] for r in results] == [30, 30, 10]
+
+    page, has_more = index.search("order", limit=1, offset=1)
+    assert [r["name"] for r in page] == ["dwd_order_detail"] and has_more
+
+
+def test_custom_comments_update_index_incrementally(tmp_path) -> None:
+    store = CommentStore(str(tmp_path / "table_comments.json"))
+    index = SearchIndex(OBJECTS, "db")
+    index.sync_comments(store)
+    assert index.search("主播")[0] == []
+
+    store.set("db.user_info", "主播信息", {})
+    store.set("other.ods_order", "主播", {})
+    index.sync_comments(store)
+    results, _ = index.search("主播")
+    assert [(r["name"], r["comment_source"]) for r in results] == [("user_info", "custom")]
+    assert index.search("用户")[0] == []
+
+
+def test_fuzzy_matching_ranks_by_edit_distance() -> None:
+    assert edit_distance("odrer", "order", 2) == 1
+    assert edit_distance("ordr", "orders", 1) == 2
+
+    index = SearchIndex(OBJECTS, "db")
+    results, _ = index.search("odrer detial")
+    assert [(r["name"], r["match_score"]) for r in results] == [("dwd_order_detail", 38)]
+    assert index.search("usr_info")[0] == []
+    assert [r["name"] for r in index.search("user_infp")[0]] == ["user_info"]
+
+
+def test_pinyin_and_initials_match_comments(monkeypatch) -> None:
+    syllables = {"订": "ding", "单": "dan", "明": "ming", "细": "xi", "视": "shi", "图": "tu",
+                 "用": "yong", "户": "hu", "信": "xin", "息": "xi", "直": "zhi", "播": "bo", "间": "jian"}
+    monkeypatch.setattr(search_index, "lazy_pinyin", lambda text: [syllables.get(c, c) for c in text])
+    index = SearchIndex(OBJECTS, "db")
+
+    results, _ = index.search("ddmx")
+    assert [(r["name"], r["match_score"]) for r in results] == [("dwd_order_detail", 30)]
+    results, _ = index.search("dingdan")
+    assert [r["name"] for r in results] == ["dwd_order_detail", "orders_v", "live_room"]
+
+
+def test_update_object_reindexes_db_comment() -> None:
+    index = SearchIndex(OBJECTS, "db")
+    index.update_object("ods_order", "table", "原始订单")
+    assert [r["name"] for r in index.search("原始")[0]] == ["ods_order"]
+
+    index.update_object("user_info", "view", "会员")
+    assert index.search("用户")[0] == []
+    assert index.search("会员")[0][0]["type"] == "view"
+
+    # 自定义注释优先于数据库注释
+    index.set_comment("ods_order", "自定义")
+    index.update_object("ods_order", "table", "另一个注释")
+    assert index.search("另一个")[0] == []
+    index.set_comment("ods_order", None)
+    assert [r["name"] for r in index.search("另一个")[0]] == ["ods_order"]
+
+
+def test_comments_saved_by_another_process_reach_the_index(tmp_path) -> None:
+    path = str(tmp_path / "table_comments.json")
+    reader, writer = CommentStore(path), CommentStore(path)
+    index = SearchIndex(OBJECTS, "db")
+    index.sync_comments(reader)
+    index.sync_comments(reader)
+    assert index.search("主播")[0] == []
+
+    writer.set("db.ods_order", "主播订单", {})
+    index.sync_comments(reader)
+    assert [r["name"] for r in index.search("主播")[0]] == ["ods_order"]
@@ -0,0 +1,206 @@
+import threading
+import time
+
+import pytest
+
+import snapshot_store
+from metadata_manager import MetadataManager
+from snapshot_store import SnapshotStore
+
+CONFIG = {"id": "cfg", "host": "localhost", "database": "db"}
+
+
+class FakeCatalog:
+    def __init__(self):
+        self.refreshed = []
+
+    def refresh(self, snapshot=None):
+        self.refreshed.append(snapshot["tables"])
+
+
+@pytest.fixture(autouse=True)
+def catalog(monkeypatch):
+    catalog = FakeCatalog()
+    monkeypatch.setattr(snapshot_store, "get_catalog", lambda config: catalog)
+    return catalog
+
+
+def make_snapshot(tables, views, fingerprints=None):
+    snapshot = {
+        "database": "db",
+        "timestamp": f"t{len(tables)}{len(views)}",
+        "tables": sorted(tables),
+        "views": sorted(views),
+        "checksum": MetadataManager.compute_checksum(list(tables) + list(views)),
+        "total_count": len(tables) + len(views),
+    }
+    if fingerprints is not None:
+        snapshot["fingerprints"] = fingerprints
+        snapshot["fingerprint_checksum"] = MetadataManager.fingerprint(sorted(fingerprints.items()))
+    return snapshot
+
+
+def test_changes_since_returns_only_the_delta(tmp_path) -> None:
+    store = SnapshotStore(CONFIG, directory=str(tmp_path))
+    assert store.record(make_snapshot(["a", "b"], ["v1"]))[0] == 1
+    # 校验和不变时不生成新的快照ID
+    assert store.record(make_snapshot(["b", "a"], ["v1"])) == (1, None)
+    assert store.record(make_snapshot(["a", "b", "c"], ["v1"]))[0] == 2
+    assert store.record(make_snapshot(["a", "c"], ["v1", "v2"]))[0] == 3
+
+    assert store.changes_since(3)["has_changes"] is False
+    delta = store.changes_since(1)
+    assert delta["snapshot_id"] == 3 and not delta["reset"]
+    assert (delta["added_tables"], delta["removed_tables"]) == (["c"], ["b"])
+    assert (delta["added_views"], delta["removed_views"]) == (["v2"], [])
+
+    # 新实例从磁盘读取同一份快照
+    reloaded = SnapshotStore(CONFIG, directory=str(tmp_path))
+    assert reloaded.changes_since(2)["added_views"] == ["v2"]
+
+    full = reloaded.changes_since(None)
+    assert full["reset"] and full["added_tables"] == ["a", "c"]
+
+
+def test_merge_cancels_add_then_remove(tmp_path) -> None:
+    store = SnapshotStore(CONFIG, directory=str(tmp_path))
+    store.record(make_snapshot(["a"], []))
+    store.record(make_snapshot(["a", "tmp"], []))
+    store.record(make_snapshot(["a"], []))
+    delta = store.changes_since(1)
+    assert delta["snapshot_id"] == 3 and not delta["has_changes"]
+
+
+def test_fingerprint_changes_are_reported_as_modified(tmp_path) -> None:
+    store = SnapshotStore(CONFIG, directory=str(tmp_path))
+    changed = {"a": ["c9", ""], "b": ["c1", ""], "v": ["c2", "d2"]}
+    store.record(make_snapshot(["a", "b"], ["v"], {"a": ["c1", ""], "b": ["c1", ""], "v": ["c2", "d1"]}))
+    _, changes = store.record(make_snapshot(["a", "b"], ["v"], changed))
+    assert changes["modified_tables"] == ["a"] and changes["modified_views"] == ["v"]
+    # 名称校验和相同、指纹也相同时不生成新快照
+    assert store.record(make_snapshot(["a", "b"], ["v"], dict(changed)))[1] is None
+
+    # 删除后重新创建视为修改
+    store.record(make_snapshot(["a"], ["v"], {"a": ["c9", ""], "v": ["c2", "d2"]}))
+    store.record(make_snapshot(["a", "b"], ["v"], {"a": ["c9", ""], "b": ["c3", ""], "v": ["c2", "d2"]}))
+    delta = store.changes_since(2)
+    assert delta["modified_tables"] == ["b"] and delta["added_tables"] == delta["removed_tables"] == []
+    assert store.changes_since(1)["modified_tables"] == ["a", "b"]
+
+
+def test_since_older_than_history_resets(tmp_path) -> None:
+    store = SnapshotStore(CONFIG, directory=str(tmp_path), history_limit=2)
+    for i in range(1, 5):
+        store.record(make_snapshot([f"t{j}" for j in range(i)], []))
+    assert store.changes_since(2)["added_tables"] == ["t2", "t3"]
+    assert store.changes_since(1)["reset"]
+
+
+def test_check_skips_database_within_interval(tmp_path, monkeypatch, catalog) -> None:
+    store = SnapshotStore(CONFIG, directory=str(tmp_path), min_check_interval=60)
+    calls = []
+
+    def fake_snapshot():
+        calls.append(1)
+        return make_snapshot(["a"], [])
+
+    monkeypatch.setattr(store.metadata_manager, "get_metadata_snapshot", fake_snapshot)
+    monkeypatch.setattr(store.metadata_manager, "get_catalog_probe", lambda: "p1")
+
+    assert store.check() == (1, True)
+    assert store.check() == (1, False)
+    assert store.check(force=True) == (1, False)
+    assert len(calls) == 2 and len(catalog.refreshed) == 1
+
+
+def test_check_reads_snapshot_only_when_probe_changes(tmp_path, monkeypatch) -> None:
+    store = SnapshotStore(CONFIG, directory=str(tmp_path), min_check_interval=0)
+    probes = iter(["p1", "p1", "p2", "p2"])
+    snapshots = []
+
+    def fake_snapshot():
+        snapshots.append(1)
+        return make_snapshot(["a"], [])
+
+    monkeypatch.setattr(store.metadata_manager, "get_metadata_snapshot", fake_snapshot)
+    monkeypatch.setattr(store.metadata_manager, "get_catalog_probe", lambda: next(probes))
+
+    assert store.check() == (1, True)
+    # 探测值不变：不读取整库快照
+    assert store.check() == (1, False) and len(snapshots) == 1
+    # 探测值变化但快照未变：只记录新的探测值，快照ID不变
+    assert store.check() == (1, False) and len(snapshots) == 2
+    # 其他进程读取到同一探测值时同样跳过
+    other = SnapshotStore(CONFIG, directory=str(tmp_path), min_check_interval=0)
+    monkeypatch.setattr(other.metadata_manager, "get_catalog_probe", lambda: next(probes))
+    monkeypatch.setattr(other.metadata_manager, "get_metadata_snapshot", fake_snapshot)
+    assert other.check() == (1, False) and len(snapshots) == 2
+
+
+def test_snapshots_written_by_another_process_are_applied(tmp_path, monkeypatch, catalog) -> None:
+    writer = SnapshotStore(CONFIG, directory=str(tmp_path), history_limit=2)
+    reader = SnapshotStore(CONFIG, directory=str(tmp_path))
+    writer.record(make_snapshot(["a"], [], {"a": ["c1", ""]}))
+    assert reader.current()[0] == 1 and catalog.refreshed == []
+
+    stale = []
+    monkeypatch.setattr(snapshot_store, "invalidate_graph_objects", lambda config, names: stale.extend(names))
+    writer.record(make_snapshot(["a", "b"], [], {"a": ["c2", ""], "b": ["c1", ""]}))
+    # 另一个实例记录的快照在读取时分发给本进程的缓存，且只分发一次
+    assert reader.current()[0] == 2 and reader.current()[0] == 2
+    assert catalog.refreshed == [["a", "b"]] and stale == ["a"]
+
+    reset = []
+    monkeypatch.setattr(snapshot_store, "invalidate_dependency_graph", reset.append)
+    for i in range(3, 6):
+        writer.record(make_snapshot(["a", "b", f"t{i}"], []))
+    # 落后的快照已超出保留的变化记录时整体失效
+    assert reader.changes_since(2)["snapshot_id"] == 5
+    assert reset == ["cfg"] and catalog.refreshed[-1] == ["a", "b", "t5"]
+
+
+def test_readers_do_not_wait_for_the_snapshot_query(tmp_path, monkeypatch) -> None:
+    store = SnapshotStore(CONFIG, directory=str(tmp_path))
+    store.record(make_snapshot(["a"], []))
+    started, release = threading.Event(), threading.Event()
+
+    def slow_snapshot():
+        started.set()
+        release.wait(2)
+        return make_snapshot(["a", "b"], [])
+
+    monkeypatch.setattr(store.metadata_manager, "get_catalog_probe", lambda: "p2")
+    monkeypatch.setattr(store.metadata_manager, "get_metadata_snapshot", slow_snapshot)
+    checker = threading.Thread(target=store.check)
+    checker.start()
+    assert started.wait(2)
+    # 整库查询进行中，读取快照不被阻塞
+    assert store.current()[0] == 1
+    release.set()
+    checker.join(2)
+    assert store.current()[0] == 2
+
+
+def test_background_checks_are_coalesced(tmp_path, monkeypatch) -> None:
+    store = SnapshotStore(CONFIG, directory=str(tmp_path))
+    started, release = threading.Event(), threading.Event()
+    checks = []
+
+    def slow_check(force=False):
+        checks.append(force)
+        started.set()
+        release.wait(2)
+        return 0, False
+
+    monkeypatch.setattr(store, "check", slow_check)
+    assert store.check_in_background() is True
+    assert started.wait(2)
+    # 运行期间的多次请求合并为结束后的一次检测
+    assert store.check_in_background() is False
+    assert store.check_in_background() is False
+    release.set()
+    for _ in range(200):
+        if store._background is None:
+            break
+        time.sleep(0.01)
+    assert checks == [True, True] and store._background is None
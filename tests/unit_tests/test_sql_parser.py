@@ -0,0 +1,73 @@
+from utils.sql_parser import (
+    extract_dependencies,
+    extract_local_dependencies,
+    tokenize,
+)
+
+
+def test_qualified_and_unqualified_references() -> None:
+    sql = (
+        "SELECT * FROM `donggua`.`live_base` AS `t1` "
+        "LEFT OUTER JOIN jl_user t2 ON t1.anchor_id = t2.anchor_id "
+        "JOIN other_db.orders o ON o.id = t1.id "
+        "JOIN hive.ods.events e ON e.id = t1.id"
+    )
+    assert extract_dependencies(sql, "donggua") == {
+        "default_catalog.donggua.live_base",
+        "default_catalog.donggua.jl_user",
+        "default_catalog.other_db.orders",
+        "hive.ods.events",
+    }
+    assert extract_local_dependencies(sql, "donggua") == {"live_base", "jl_user"}
+
+
+def test_cte_names_are_excluded() -> None:
+    sql = (
+        "WITH RECURSIVE a AS (SELECT * FROM base), b (x) AS (SELECT x FROM a) "
+        "SELECT * FROM a JOIN b ON a.x = b.x"
+    )
+    assert extract_local_dependencies(sql, "db") == {"base"}
+
+
+def test_cte_names_are_scoped_to_their_query_block() -> None:
+    # 子查询中的 CTE orders 不影响并列子查询里的真实表 orders
+    sql = (
+        "SELECT * FROM (WITH orders AS (SELECT * FROM raw_orders) SELECT * FROM orders) a "
+        "JOIN (SELECT * FROM orders) b ON a.id = b.id"
+    )
+    assert extract_local_dependencies(sql, "db") == {"raw_orders", "orders"}
+
+    # 外层 CTE 在内层子查询和后续 CTE 中可见
+    sql = "WITH a AS (SELECT * FROM base), b AS (SELECT * FROM a) SELECT * FROM (SELECT * FROM b) x"
+    assert extract_local_dependencies(sql, "db") == {"base"}
+
+
+def test_cross_database_references_are_not_local() -> None:
+    sql = "SELECT * FROM other_db.orders JOIN orders ON 1 = 1 JOIN db.users ON 1 = 1"
+    assert extract_local_dependencies(sql, "db") == {"orders", "users"}
+    assert extract_local_dependencies("SELECT * FROM other_db.orders", "db") == set()
+    assert extract_dependencies("SELECT * FROM other_db.orders", "db") == {"default_catalog.other_db.orders"}
+
+
+def test_comma_joins_lateral_and_subqueries_without_alias() -> None:
+    sql = (
+        "SELECT * FROM t1, t2 AS x, LATERAL (SELECT * FROM t3) y, "
+        "(SELECT * FROM (t4 JOIN t5 ON t4.id = t5.id)) "
+        "CROSS JOIN LATERAL unnest(x.arr) u(v)"
+    )
+    assert extract_local_dependencies(sql, "db") == {"t1", "t2", "t3", "t4", "t5"}
+
+
+def test_from_inside_functions_strings_and_comments_is_ignored() -> None:
+    sql = (
+        "SELECT EXTRACT(YEAR FROM dt), TRIM(BOTH ' ' FROM name), 'from fake' "
+        "-- FROM commented\n/* JOIN hidden */ FROM real_table "
+        "WHERE id IN (SELECT id FROM sub_table) GROUP BY 1 WITH ROLLUP"
+    )
+    assert extract_local_dependencies(sql, "db") == {"real_table", "sub_table"}
+
+
+def test_tokenize_handles_escaped_identifiers_and_strings() -> None:
+    tokens = tokenize("SELECT `a``b`, 'it''s' FROM t;")
+    assert [t.kind for t in tokens] == ["word", "quoted", "punct", "string", "word", "word", "punct"]
+    assert tokens[1].value == "a`b"
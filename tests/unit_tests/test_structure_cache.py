@@ -0,0 +1,85 @@
+import snapshot_store
+import structure_cache
+from structure_cache import StructureCache
+
+CONFIG = {"id": "cfg", "host": "localhost", "database": "db"}
+
+
+class FakeMetadata:
+    def __init__(self, tables):
+        self.tables = tables
+        self.calls = []
+
+    def get_table_structures(self, table_names=None):
+        self.calls.append(None if table_names is None else sorted(table_names))
+        names = self.tables if table_names is None else [n for n in table_names if n in self.tables]
+        return {
+            name: {"table_type": "table", "db_comment": "", "columns": [(col, "int", "int", "YES", None, "")
+                                                                      for col in self.tables[name]]}
+            for name in names
+        }
+
+
+class FakeCatalog:
+    def __init__(self, metadata):
+        self.metadata = metadata
+
+    def object_exists(self, name):
+        return name in self.metadata.tables
+
+
+def make_cache(monkeypatch, tables):
+    metadata = FakeMetadata(tables)
+    monkeypatch.setattr(structure_cache, "get_catalog", lambda config: FakeCatalog(metadata))
+    cache = StructureCache(CONFIG)
+    cache.metadata_manager = metadata
+    return cache, metadata
+
+
+def test_bulk_load_once_then_serve_from_memory(monkeypatch) -> None:
+    cache, metadata = make_cache(monkeypatch, {"a": ["id"], "b": ["id", "x"]})
+    result = cache.get_many(["a", "b", "missing"])
+    assert [c[0] for c in result["b"]["columns"]] == ["id", "x"]
+    assert result["missing"] is None
+    cache.get("a")
+    assert metadata.calls == [None]
+
+
+def test_only_stale_and_new_objects_are_reloaded(monkeypatch) -> None:
+    cache, metadata = make_cache(monkeypatch, {"a": ["id"], "b": ["id"]})
+    cache.load()
+
+    metadata.tables["a"] = ["id", "added"]
+    metadata.tables["c"] = ["id"]
+    del metadata.tables["b"]
+    cache.invalidate_objects(["a", "b"])
+
+    # 过期对象和目录中新出现的对象合并为一次查询
+    result = cache.get_many(["a", "b", "c"])
+    assert metadata.calls == [None, ["a", "b", "c"]]
+    assert [c[0] for c in result["a"]["columns"]] == ["id", "added"]
+    assert result["b"] is None and result["c"] is not None
+
+    cache.get_many(["a", "c"])
+    assert len(metadata.calls) == 2
+    assert cache.stats()["reloaded_objects"] == 3
+
+
+def test_snapshot_diff_marks_changed_structures(tmp_path, monkeypatch) -> None:
+    cache, metadata = make_cache(monkeypatch, {"a": ["id"], "b": ["id"]})
+    monkeypatch.setitem(structure_cache._caches, ("cfg", "db"), cache)
+    monkeypatch.setattr(snapshot_store, "get_catalog", lambda config: type("Catalog", (), {"refresh": lambda *a: 0})())
+
+    store = snapshot_store.SnapshotStore(CONFIG, directory=str(tmp_path))
+    base = {"database": "db", "timestamp": "t", "tables": ["a", "b"], "views": [], "checksum": "c"}
+    store.record({**base, "fingerprints": {"a": ["f1", ""], "b": ["f1", ""]}, "fingerprint_checksum": "x1"})
+    store.current()
+    cache.load()
+
+    # ALTER TABLE：快照按对象比较指纹，只有 a 被标记
+    metadata.tables["a"] = ["id", "added"]
+    store.record({**base, "fingerprints": {"a": ["f2", ""], "b": ["f1", ""]}, "fingerprint_checksum": "x2"})
+    store.current()
+    assert [c[0] for c in cache.get("a")["columns"]] == ["id", "added"]
+    cache.get("b")
+    assert metadata.calls == [None, ["a"]]
@@ -0,0 +1,35 @@
+import threading
+
+import warmup_manager
+from warmup_manager import WarmupJob, start_warmup
+
+
+def test_stages_run_in_order_with_progress() -> None:
+    order = []
+    job = WarmupJob("cfg", [("a", lambda: order.append("a") or 3), ("b", lambda: order.append("b"))])
+    job.run()
+    progress = job.progress()
+    assert order == ["a", "b"]
+    assert progress["status"] == "done" and progress["completed"] == progress["total"] == 2
+    assert [(s["name"], s["items"]) for s in progress["stages"]] == [("a", 3), ("b", None)]
+
+
+def test_failed_stage_stops_the_job() -> None:
+    def broken():
+        raise RuntimeError("boom")
+
+    job = WarmupJob("cfg", [("a", broken), ("b", lambda: 1)])
+    job.run()
+    progress = job.progress()
+    assert progress["status"] == "failed" and progress["error"] == "a: boom"
+    assert [s["status"] for s in progress["stages"]] == ["failed", "pending"]
+
+
+def test_running_job_is_shared(monkeypatch) -> None:
+    monkeypatch.setattr(warmup_manager, "_jobs", {})
+    release = threading.Event()
+    first = start_warmup("cfg", [("wait", release.wait)])
+    assert start_warmup("cfg", [("other", lambda: 0)]) is first
+    release.set()
+    assert first.wait(2) and first.status == "done"
+    assert start_warmup("cfg", [("other", lambda: 0)]) is not first
@@ -1,53 +1,227 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-简单的内存缓存实现
+线程安全的内存缓存实现
+按条目数和估算内存双重限制的 LRU 缓存，支持条目级 TTL、分段锁、后台过期清理、
+命中/未命中/淘汰统计以及按命名空间（配置ID）失效
 """
 
+import hashlib
+import sys
+import threading
 import time
-from typing import Any, Optional, Dict, Callable
+from collections import OrderedDict
 from functools import wraps
+from typing import Any, Callable, Dict, Optional, Set, Tuple
 
+# 缓存未命中时的哨兵值
+_MISSING = object()
 
-class SimpleCache:
-    """简单的内存缓存类"""
+
+def _estimate_size(value: Any, max_items: int = 10000) -> int:
+    """
+    估算对象占用的内存（字节），递归统计容器内元素，最多统计 max_items 个对象
+
+    Args:
+        value: 待估算的对象
+        max_items: 最多统计的对象数量（避免超大对象估算过慢）
+
+    Returns:
+        估算字节数
+    """
+    size = 0
+    seen: Set[int] = set()
+    stack = [value]
+    while stack and len(seen) < max_items:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return size
+
+
+class _Segment:
+    """缓存分段：独立的锁与 LRU 顺序"""
+
+    __slots__ = ('lock', 'entries', 'namespaces', 'bytes', 'hits', 'misses', 'evictions', 'expirations',
+                 'oversize')
 
     def __init__(self):
-        self._cache: Dict[str, tuple[Any, float]] = {}  # key -> (value, expire_time)
+        self.lock = threading.Lock()
+        # key -> (value, expire_time, size, namespace)
+        self.entries: 'OrderedDict[str, Tuple[Any, float, int, Optional[str]]]' = OrderedDict()
+        self.namespaces: Dict[str, Set[str]] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.oversize = 0
 
-    def get(self, key: str) -> Optional[Any]:
+    def remove(self, key: str) -> bool:
+        """移除条目（调用方需持有锁）"""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.bytes -= entry[2]
+        namespace = entry[3]
+        if namespace is not None:
+            keys = self.namespaces.get(namespace)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.namespaces[namespace]
+        return True
+
+
+class LRUCache:
+    """线程安全的 LRU/TTL 缓存"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 default_ttl: int = 300, segments: int = 16, cleanup_interval: int = 60):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最大条目数（平均分配到各分段）
+            max_bytes: 最大估算内存（字节，所有分段共享，单个条目最多可占用全部容量）
+            default_ttl: 默认过期时间（秒），0 表示永不过期
+            segments: 分段数量（每段一把锁，降低并发争用）
+            cleanup_interval: 后台清理过期条目的间隔（秒），0 表示不启动后台清理
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.cleanup_interval = cleanup_interval
+
+        self._segments = [_Segment() for _ in range(max(1, segments))]
+        # 条目数平均分配到各分段，内存按总量限制
+        self._segment_max_entries = max(1, max_entries // len(self._segments))
+
+        self._cleanup_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._start_lock = threading.Lock()
+
+    def _segment(self, key: str) -> _Segment:
+        return self._segments[hash(key) % len(self._segments)]
+
+    def _total_bytes(self) -> int:
+        """所有分段的估算内存之和（不加锁读取，只用于判断是否需要淘汰）"""
+        return sum(segment.bytes for segment in self._segments)
+
+    def _evict_bytes(self, keep: str):
+        """
+        总估算内存超过 max_bytes 时，从写入的分段开始轮流淘汰各分段最久未使用的条目
+
+        每次只持有一个分段的锁；刚写入的条目 keep 不会被淘汰
+
+        Args:
+            keep: 刚写入的缓存键
+        """
+        start = hash(keep) % len(self._segments)
+        order = self._segments[start:] + self._segments[:start]
+        while self._total_bytes() > self.max_bytes:
+            evicted = False
+            for segment in order:
+                with segment.lock:
+                    oldest = next((key for key in segment.entries if key != keep), None)
+                    if oldest is None:
+                        continue
+                    segment.remove(oldest)
+                    segment.evictions += 1
+                    evicted = True
+                if self._total_bytes() <= self.max_bytes:
+                    return
+            if not evicted:
+                return
+
+    def _ensure_cleanup_thread(self):
+        """首次写入时启动后台清理线程"""
+        if self.cleanup_interval <= 0 or self._cleanup_thread is not None:
+            return
+        with self._start_lock:
+            if self._cleanup_thread is None:
+                self._cleanup_thread = threading.Thread(
+                    target=self._cleanup_loop, name='cache-cleanup', daemon=True)
+                self._cleanup_thread.start()
+
+    def _cleanup_loop(self):
+        while not self._stop_event.wait(self.cleanup_interval):
+            self.cleanup()
+
+    def get(self, key: str, default: Any = None) -> Any:
         """
         获取缓存值
 
         Args:
             key: 缓存键
+            default: 不存在或已过期时返回的值
 
         Returns:
-            缓存值，如果不存在或已过期则返回 None
+            缓存值，如果不存在或已过期则返回 default
         """
-        if key not in self._cache:
-            return None
-
-        value, expire_time = self._cache[key]
+        segment = self._segment(key)
+        with segment.lock:
+            entry = segment.entries.get(key)
+            if entry is None:
+                segment.misses += 1
+                return default
 
-        # 检查是否过期
-        if expire_time > 0 and time.time() > expire_time:
-            del self._cache[key]
-            return None
+            expire_time = entry[1]
+            if expire_time > 0 and time.time() > expire_time:
+                segment.remove(key)
+                segment.expirations += 1
+                segment.misses += 1
+                return default
 
-        return value
+            segment.entries.move_to_end(key)
+            segment.hits += 1
+            return entry[0]
 
-    def set(self, key: str, value: Any, ttl: int = 300):
+    def set(self, key: str, value: Any, ttl: Optional[int] = None, namespace: Optional[str] = None):
         """
         设置缓存值
 
         Args:
             key: 缓存键
             value: 缓存值
-            ttl: 过期时间（秒），0 表示永不过期
+            ttl: 过期时间（秒），None 使用默认值，0 表示永不过期
+            namespace: 所属命名空间（通常为配置ID），用于批量失效
         """
+        if ttl is None:
+            ttl = self.default_ttl
         expire_time = time.time() + ttl if ttl > 0 else 0
-        self._cache[key] = (value, expire_time)
+        size = _estimate_size(value) + sys.getsizeof(key)
+
+        segment = self._segment(key)
+        # 单个条目超过总容量时不缓存（计入统计）
+        if size > self.max_bytes:
+            with segment.lock:
+                segment.remove(key)
+                segment.oversize += 1
+            return
+
+        with segment.lock:
+            segment.remove(key)
+            segment.entries[key] = (value, expire_time, size, namespace)
+            segment.bytes += size
+            if namespace is not None:
+                segment.namespaces.setdefault(namespace, set()).add(key)
+
+            # 按 LRU 顺序淘汰，直到满足分段条目数限制
+            while len(segment.entries) > self._segment_max_entries:
+                oldest = next(iter(segment.entries))
+                segment.remove(oldest)
+                segment.evictions += 1
+
+        self._evict_bytes(key)
+        self._ensure_cleanup_thread()
 
     def delete(self, key: str):
         """
@@ -56,68 +230,201 @@ class SimpleCache:
         Args:
             key: 缓存键
         """
-        if key in self._cache:
-            del self._cache[key]
+        segment = self._segment(key)
+        with segment.lock:
+            segment.remove(key)
+
+    def invalidate_namespace(self, namespace: str) -> int:
+        """
+        删除某个命名空间下的所有缓存
+
+        Args:
+            namespace: 命名空间（通常为配置ID）
+
+        Returns:
+            删除的条目数
+        """
+        removed = 0
+        for segment in self._segments:
+            with segment.lock:
+                for key in list(segment.namespaces.get(namespace, ())):
+                    if segment.remove(key):
+                        removed += 1
+        return removed
 
     def clear(self):
         """清空所有缓存"""
-        self._cache.clear()
+        for segment in self._segments:
+            with segment.lock:
+                segment.entries.clear()
+                segment.namespaces.clear()
+                segment.bytes = 0
+
+    def cleanup(self) -> int:
+        """
+        清理过期的缓存项
+
+        Returns:
+            清理的条目数
+        """
+        removed = 0
+        for segment in self._segments:
+            with segment.lock:
+                current_time = time.time()
+                expired_keys = [
+                    key for key, entry in segment.entries.items()
+                    if entry[1] > 0 and current_time > entry[1]
+                ]
+                for key in expired_keys:
+                    segment.remove(key)
+                segment.expirations += len(expired_keys)
+                removed += len(expired_keys)
+        return removed
+
+    def stop(self):
+        """停止后台清理线程"""
+        self._stop_event.set()
 
-    def cleanup(self):
-        """清理过期的缓存项"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, (_, expire_time) in self._cache.items()
-            if expire_time > 0 and current_time > expire_time
-        ]
-        for key in expired_keys:
-            del self._cache[key]
+    def stats(self) -> Dict:
+        """
+        获取缓存统计信息
 
+        Returns:
+            统计信息字典
+        """
+        totals = {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0,
+                  'oversize': 0}
+        for segment in self._segments:
+            with segment.lock:
+                totals['entries'] += len(segment.entries)
+                totals['bytes'] += segment.bytes
+                totals['hits'] += segment.hits
+                totals['misses'] += segment.misses
+                totals['evictions'] += segment.evictions
+                totals['expirations'] += segment.expirations
+                totals['oversize'] += segment.oversize
+        lookups = totals['hits'] + totals['misses']
+        totals['hit_rate'] = round(totals['hits'] / lookups, 4) if lookups else 0.0
+        totals['max_entries'] = self.max_entries
+        totals['max_bytes'] = self.max_bytes
+        return totals
+
+
+# 兼容旧名称
+SimpleCache = LRUCache
 
 # 全局缓存实例
-_global_cache: Optional[SimpleCache] = None
+_global_cache: Optional[LRUCache] = None
+_global_cache_lock = threading.Lock()
 
 
-def get_cache() -> SimpleCache:
+def get_cache() -> LRUCache:
     """
     获取全局缓存实例（单例模式）
 
     Returns:
-        SimpleCache 实例
+        LRUCache 实例
     """
     global _global_cache
     if _global_cache is None:
-        _global_cache = SimpleCache()
+        with _global_cache_lock:
+            if _global_cache is None:
+                _global_cache = LRUCache()
     return _global_cache
 
 
-def cached(ttl: int = 300, key_prefix: str = ""):
+def _stable_repr(value: Any) -> str:
+    """
+    生成参数的稳定表示，用于构造缓存键
+
+    基本类型直接序列化，容器递归处理（dict/set 排序），
+    其他对象需提供 __cache_key__() 方法，否则抛出 TypeError
+
+    Args:
+        value: 参数值
+
+    Returns:
+        稳定的字符串表示
+    """
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_stable_repr(item) for item in value) + ']'
+    if isinstance(value, (set, frozenset)):
+        return '{' + ','.join(sorted(_stable_repr(item) for item in value)) + '}'
+    if isinstance(value, dict):
+        items = sorted((_stable_repr(k), _stable_repr(v)) for k, v in value.items())
+        return '{' + ','.join(f"{k}:{v}" for k, v in items) + '}'
+    cache_key = getattr(value, '__cache_key__', None)
+    if callable(cache_key):
+        return f"{type(value).__qualname__}({_stable_repr(cache_key())})"
+    raise TypeError(f"无法为 {type(value).__qualname__} 生成缓存键")
+
+
+def make_cache_key(prefix: str, *args, **kwargs) -> str:
+    """
+    由参数生成稳定的缓存键
+
+    Args:
+        prefix: 键前缀
+        *args: 位置参数
+        **kwargs: 关键字参数
+
+    Returns:
+        缓存键
+    """
+    digest = hashlib.sha1(_stable_repr([args, kwargs]).encode()).hexdigest()
+    return f"{prefix}:{digest}"
+
+
+def cached(ttl: Optional[int] = 300, key_prefix: str = "",
+           namespace: Optional[Callable[..., Optional[str]]] = None,
+           cache: Optional[LRUCache] = None):
     """
     缓存装饰器
 
+    缓存键由函数名和参数的稳定表示生成；参数无法生成稳定键时直接调用函数而不缓存。
+    返回 None 的结果不会被缓存。被装饰的函数提供 invalidate(*args, **kwargs)，删除对应参数的缓存。
+
     Args:
-        ttl: 缓存过期时间（秒）
+        ttl: 缓存过期时间（秒），None 使用缓存默认值
         key_prefix: 缓存键前缀
+        namespace: 根据调用参数返回命名空间的函数（如 lambda self, *a, **k: self.config_id）
+        cache: 使用的缓存实例，None 表示全局缓存
 
     Returns:
         装饰器函数
     """
     def decorator(func: Callable) -> Callable:
+        prefix = f"{key_prefix}:{func.__module__}.{func.__qualname__}"
+
         @wraps(func)
         def wrapper(*args, **kwargs):
             # 生成缓存键
-            cache_key = f"{key_prefix}:{func.__name__}:{str(args)}:{str(kwargs)}"
+            try:
+                cache_key = make_cache_key(prefix, *args, **kwargs)
+            except TypeError:
+                return func(*args, **kwargs)
 
             # 尝试从缓存获取
-            cache = get_cache()
-            cached_value = cache.get(cache_key)
-            if cached_value is not None:
+            store = cache or get_cache()
+            cached_value = store.get(cache_key, _MISSING)
+            if cached_value is not _MISSING:
                 return cached_value
 
             # 执行函数并缓存结果
             result = func(*args, **kwargs)
-            cache.set(cache_key, result, ttl)
+            if result is not None:
+                ns = namespace(*args, **kwargs) if namespace else None
+                store.set(cache_key, result, ttl, namespace=ns)
             return result
 
+        def invalidate(*args, **kwargs):
+            try:
+                (cache or get_cache()).delete(make_cache_key(prefix, *args, **kwargs))
+            except TypeError:
+                pass
+
+        wrapper.invalidate = invalidate
         return wrapper
     return decorator
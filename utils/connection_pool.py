@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接池模块
+按配置 ID 维护进程级共享的 PyMySQL 连接池，支持借出/归还、健康检查和空闲回收
+"""
+
+import atexit
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+import pymysql
+
+# 后台回收空闲连接的时间间隔（秒）
+EVICT_INTERVAL = 60
+
+
+class PoolTimeoutError(Exception):
+    """等待可用连接超时"""
+
+
+class ConnectionPool:
+    """单个数据库配置对应的连接池"""
+
+    def __init__(self, config: Dict, min_size: int = 1, max_size: int = 10,
+                 idle_timeout: float = 300, health_check_interval: float = 30,
+                 wait_timeout: float = 10, connect_timeout: int = 10):
+        """
+        初始化连接池（连接按需创建，不会在构造时连接数据库）
+
+        Args:
+            config: 数据库配置（含明文密码）
+            min_size: 空闲回收时至少保留的连接数
+            max_size: 最大连接数（借出 + 空闲）
+            idle_timeout: 空闲连接的最长保留时间（秒）
+            health_check_interval: 空闲超过该时间的连接在借出前先 ping 检查（秒）
+            wait_timeout: 连接耗尽时借出的默认等待时间（秒）
+            connect_timeout: 新建连接的超时时间（秒）
+        """
+        self.config = config
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.wait_timeout = wait_timeout
+        self.connect_timeout = connect_timeout
+
+        self._lock = threading.Condition()
+        self._idle: Deque[Tuple[Any, float]] = deque()  # (connection, last_used)
+        self._borrowed = 0
+        self._closed = False
+
+        # 统计信息
+        self._created_count = 0
+        self._discarded_count = 0
+        self._borrow_count = 0
+        self._timeout_count = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _create_connection(self, connect_timeout: Optional[int] = None):
+        """
+        新建一个数据库连接（autocommit 模式：只执行查询，每条语句读取最新数据，
+        连接归还后不会把旧的 REPEATABLE READ 事务快照带给下一个借用方）
+
+        Args:
+            connect_timeout: 连接超时时间（秒），None 表示使用连接池的 connect_timeout
+        """
+        return pymysql.connect(
+            host=self.config['host'],
+            port=self.config['port'],
+            user=self.config['user'],
+            password=self.config['password'],
+            database=self.config['database'],
+            charset='utf8mb4',
+            autocommit=True,
+            connect_timeout=self.connect_timeout if connect_timeout is None else connect_timeout
+        )
+
+    @staticmethod
+    def _close_quietly(conn):
+        """关闭连接并忽略异常"""
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn) -> bool:
+        """检查连接是否可用"""
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle_locked(self, now: float) -> list:
+        """移出超过空闲时间的连接（调用方需持有锁），返回待关闭的连接"""
+        expired = []
+        # 最早归还的连接在队首
+        while self._idle and len(self._idle) + self._borrowed > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used <= self.idle_timeout:
+                break
+            self._idle.popleft()
+            self._discarded_count += 1
+            expired.append(conn)
+        return expired
+
+    def acquire(self, timeout: Optional[float] = None, connect_timeout: Optional[int] = None):
+        """
+        借出一个连接
+
+        Args:
+            timeout: 等待时间（秒），None 表示使用默认的 wait_timeout
+            connect_timeout: 需要新建连接时的连接超时（秒），None 表示使用默认的 connect_timeout
+
+        Returns:
+            PyMySQL 连接
+
+        Raises:
+            PoolTimeoutError: 连接池耗尽且等待超时
+        """
+        timeout = self.wait_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        counted = False
+
+        while True:
+            conn = None
+            last_used = 0.0
+            create = False
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("连接池已关闭")
+
+                while not self._idle and self._borrowed >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeout_count += 1
+                        raise PoolTimeoutError(
+                            f"等待数据库连接超时（{timeout}s，最大连接数 {self.max_size}）")
+                    self._lock.wait(remaining)
+
+                if self._idle:
+                    # 后进先出，优先复用最热的连接
+                    conn, last_used = self._idle.pop()
+                else:
+                    create = True
+                self._borrowed += 1
+
+                if not counted:
+                    counted = True
+                    wait = time.monotonic() - start
+                    self._borrow_count += 1
+                    self._total_wait += wait
+                    self._max_wait = max(self._max_wait, wait)
+
+            if create:
+                try:
+                    conn = self._create_connection(connect_timeout)
+                except Exception:
+                    self._release_slot()
+                    raise
+                with self._lock:
+                    self._created_count += 1
+                return conn
+
+            if time.time() - last_used < self.health_check_interval or self._is_healthy(conn):
+                return conn
+
+            # 连接已失效，丢弃后重试
+            self._close_quietly(conn)
+            with self._lock:
+                self._discarded_count += 1
+            self._release_slot()
+
+    def _release_slot(self):
+        """释放一个借出名额"""
+        with self._lock:
+            self._borrowed -= 1
+            self._lock.notify()
+
+    def release(self, conn, discard: bool = False):
+        """
+        归还连接
+
+        Args:
+            conn: 借出的连接
+            discard: 是否直接丢弃（连接出错时使用）
+        """
+        now = time.time()
+        expired = []
+        with self._lock:
+            self._borrowed -= 1
+            if discard or self._closed or not conn.open:
+                self._discarded_count += 1
+                expired.append(conn)
+            else:
+                self._idle.append((conn, now))
+            expired.extend(self._evict_idle_locked(now))
+            self._lock.notify()
+
+        for stale in expired:
+            self._close_quietly(stale)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None,
+                   connect_timeout: Optional[int] = None) -> Iterator[Any]:
+        """
+        以上下文管理器方式借出连接，退出时自动归还
+
+        Args:
+            timeout: 等待时间（秒）
+            connect_timeout: 需要新建连接时的连接超时（秒）
+
+        Yields:
+            PyMySQL 连接
+        """
+        conn = self.acquire(timeout, connect_timeout)
+        try:
+            yield conn
+        except (pymysql.OperationalError, pymysql.InterfaceError):
+            # 网络/协议错误后连接状态不可信，直接丢弃
+            self.release(conn, discard=True)
+            raise
+        except BaseException:
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def evict_idle(self):
+        """回收超过空闲时间的连接"""
+        with self._lock:
+            expired = self._evict_idle_locked(time.time())
+        for conn in expired:
+            self._close_quietly(conn)
+
+    def close(self):
+        """关闭连接池及所有空闲连接（借出中的连接在归还时关闭）"""
+        with self._lock:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._lock.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> Dict:
+        """
+        获取连接池统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                'borrowed': self._borrowed,
+                'idle': len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'created': self._created_count,
+                'discarded': self._discarded_count,
+                'borrow_count': self._borrow_count,
+                'timeouts': self._timeout_count,
+                'total_wait_ms': round(self._total_wait * 1000, 3),
+                'avg_wait_ms': round(self._total_wait * 1000 / self._borrow_count, 3) if self._borrow_count else 0.0,
+                'max_wait_ms': round(self._max_wait * 1000, 3),
+            }
+
+
+class PoolManager:
+    """进程级连接池管理器，按配置 ID 维护连接池"""
+
+    # 连接参数发生变化时需要重建连接池
+    _CONNECTION_FIELDS = ('host', 'port', 'user', 'password', 'database')
+
+    def __init__(self, **pool_options):
+        """
+        初始化连接池管理器
+
+        Args:
+            **pool_options: 传递给 ConnectionPool 的参数
+        """
+        self.pool_options = pool_options
+        self._pools: Dict[str, Tuple[tuple, ConnectionPool]] = {}
+        self._lock = threading.Lock()
+        self._evictor: Optional[threading.Thread] = None
+        self._evictor_stop = threading.Event()
+
+    def _pool_key(self, config: Dict) -> str:
+        """计算连接池键：优先使用配置 ID"""
+        if config.get('id'):
+            return config['id']
+        return "{user}@{host}:{port}/{database}".format(**config)
+
+    def get_pool(self, config: Dict) -> ConnectionPool:
+        """
+        获取配置对应的连接池，不存在或连接参数变化时新建
+
+        Args:
+            config: 数据库配置（含明文密码）
+
+        Returns:
+            ConnectionPool 实例
+        """
+        key = self._pool_key(config)
+        signature = tuple(config.get(field) for field in self._CONNECTION_FIELDS)
+        stale = None
+        with self._lock:
+            entry = self._pools.get(key)
+            if entry and entry[0] == signature:
+                return entry[1]
+            if entry:
+                stale = entry[1]
+            pool = ConnectionPool(config, **self.pool_options)
+            self._pools[key] = (signature, pool)
+
+        if stale:
+            stale.close()
+        return pool
+
+    def close_pool(self, config_id: str):
+        """
+        关闭并移除指定配置的连接池
+
+        Args:
+            config_id: 配置ID
+        """
+        with self._lock:
+            entry = self._pools.pop(config_id, None)
+        if entry:
+            entry[1].close()
+
+    def evict_idle(self):
+        """回收所有连接池中的过期空闲连接"""
+        with self._lock:
+            pools = [pool for _, pool in self._pools.values()]
+        for pool in pools:
+            pool.evict_idle()
+
+    def start_evictor(self, interval: float = EVICT_INTERVAL):
+        """
+        启动后台线程，按间隔回收所有连接池中的过期空闲连接（重复调用不会启动多个线程）
+
+        Args:
+            interval: 回收间隔（秒）
+        """
+        with self._lock:
+            if self._evictor is not None:
+                return
+            self._evictor_stop = threading.Event()
+            self._evictor = threading.Thread(
+                target=self._evict_loop, args=(interval, self._evictor_stop), name="pool-evictor", daemon=True)
+            self._evictor.start()
+
+    def _evict_loop(self, interval: float, stop: threading.Event):
+        """后台回收线程"""
+        while not stop.wait(interval):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                print(f"回收空闲连接失败: {e}")
+
+    def close_all(self):
+        """停止后台回收线程并关闭所有连接池"""
+        with self._lock:
+            self._evictor_stop.set()
+            self._evictor = None
+            pools = [pool for _, pool in self._pools.values()]
+            self._pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def stats(self) -> Dict[str, Dict]:
+        """
+        获取所有连接池的统计信息
+
+        Returns:
+            {池键: 统计信息}
+        """
+        with self._lock:
+            pools = {key: pool for key, (_, pool) in self._pools.items()}
+        return {key: pool.stats() for key, pool in pools.items()}
+
+
+# 全局连接池管理器实例
+_pool_manager: Optional[PoolManager] = None
+_pool_manager_lock = threading.Lock()
+
+
+def get_pool_manager() -> PoolManager:
+    """
+    获取全局连接池管理器实例（单例模式）
+
+    Returns:
+        PoolManager 实例
+    """
+    global _pool_manager
+    if _pool_manager is None:
+        with _pool_manager_lock:
+            if _pool_manager is None:
+                _pool_manager = PoolManager()
+                _pool_manager.start_evictor()
+                atexit.register(_pool_manager.close_all)
+    return _pool_manager
+
+
+def get_pool(config: Dict) -> ConnectionPool:
+    """
+    获取配置对应连接池的便捷函数
+
+    Args:
+        config: 数据库配置（含明文密码）
+
+    Returns:
+        ConnectionPool 实例
+    """
+    return get_pool_manager().get_pool(config)
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+依赖关系图数据结构
+只依赖标准库，由 Web 端（dependency_graph）和 src/ 下的命令行脚本共用
+"""
+
+import hashlib
+import time
+from array import array
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 对象类型编码
+TYPE_TABLE = 0
+TYPE_VIEW = 1
+
+
+class DependencyGraph:
+    """
+    依赖关系图
+
+    对象按名称排序后编号，正向（依赖）与反向（被依赖）邻接关系都以
+    CSR 形式存储：offsets[i]..offsets[i+1] 是节点 i 在 targets 中的区间。
+    """
+
+    def __init__(self, names: List[str], types: bytearray, edges: Iterable[Tuple[int, int]],
+                 catalog_checksum: Optional[str] = None, definitions_checksum: Optional[str] = None) -> None:
+        """
+        初始化依赖关系图
+
+        Args:
+            names: 按名称排序的对象名列表
+            types: 与 names 对应的类型编码（TYPE_TABLE / TYPE_VIEW）
+            edges: (依赖方编号, 被依赖方编号) 边列表
+            catalog_checksum: 构建时对象目录的校验和
+            definitions_checksum: 构建时视图定义的校验和
+        """
+        self.names = names
+        self.types = types
+        self.index: Dict[str, int] = {name: i for i, name in enumerate(names)}
+        self.catalog_checksum = catalog_checksum
+        self.definitions_checksum = definitions_checksum
+        self.built_at = time.time()
+
+        edges = sorted(set(edges))
+        self.edge_count = len(edges)
+        self._fwd_offsets, self._fwd_targets = self._build_csr(len(names), edges)
+        self._rev_offsets, self._rev_targets = self._build_csr(
+            len(names), sorted((dst, src) for src, dst in edges))
+        self._depths: Optional['array[int]'] = None
+
+    @staticmethod
+    def _build_csr(node_count: int, edges: List[Tuple[int, int]]) -> Tuple['array[int]', 'array[int]']:
+        """将已排序的边列表压缩为 (offsets, targets)"""
+        offsets = array('I', [0]) * (node_count + 1)
+        targets = array('I', (dst for _, dst in edges))
+        for src, _ in edges:
+            offsets[src + 1] += 1
+        for i in range(node_count):
+            offsets[i + 1] += offsets[i]
+        return offsets, targets
+
+    @classmethod
+    def build(cls, objects: Dict[str, str], view_definitions: Dict[str, str],
+              extract: Callable[[str], Iterable[str]],
+              catalog_checksum: Optional[str] = None) -> 'DependencyGraph':
+        """
+        由对象目录和视图定义构建依赖关系图
+
+        Args:
+            objects: {对象名: 'table' | 'view'}
+            view_definitions: {视图名: 视图定义 SQL}
+            extract: 从 SQL 中提取依赖对象名的函数
+            catalog_checksum: 对象目录校验和（用于判断是否过期）
+
+        Returns:
+            DependencyGraph 实例
+        """
+        names = sorted(objects)
+        index = {name: i for i, name in enumerate(names)}
+        types = bytearray(TYPE_VIEW if objects[name] == 'view' else TYPE_TABLE for name in names)
+
+        digest = hashlib.md5()
+        edges = []
+        for view_name in sorted(view_definitions):
+            src = index.get(view_name)
+            sql = view_definitions[view_name]
+            digest.update(view_name.encode())
+            digest.update(sql.encode())
+            if src is None or not sql:
+                continue
+            for dep in extract(sql):
+                dst = index.get(dep)
+                # 只保留实际存在的对象，并忽略自引用
+                if dst is not None and dst != src:
+                    edges.append((src, dst))
+
+        return cls(names, types, edges, catalog_checksum, digest.hexdigest())
+
+    def patch(self, objects: Dict[str, str], view_definitions: Dict[str, str],
+              extract: Callable[[str], Iterable[str]]) -> 'DependencyGraph':
+        """
+        只重新解析发生变化的对象，其余对象的边原样沿用（对象名称集合不变时使用）
+
+        Args:
+            objects: {发生变化的对象名: 'table' | 'view'}
+            view_definitions: {发生变化的视图名: 视图定义 SQL}
+            extract: 从 SQL 中提取依赖对象名的函数
+
+        Returns:
+            新的 DependencyGraph 实例（原实例不变，正在使用它的请求不受影响）
+        """
+        changed = {self.index[name] for name in objects if name in self.index}
+        types = bytearray(self.types)
+        for name, obj_type in objects.items():
+            i = self.index.get(name)
+            if i is not None:
+                types[i] = TYPE_VIEW if obj_type == 'view' else TYPE_TABLE
+
+        edges = [
+            (src, dst)
+            for src in range(len(self.names)) if src not in changed
+            for dst in self._neighbors(self._fwd_offsets, self._fwd_targets, src)
+        ]
+        digest = hashlib.md5((self.definitions_checksum or '').encode())
+        for name in sorted(objects):
+            src = self.index.get(name)
+            sql = view_definitions.get(name, '')
+            digest.update(name.encode())
+            digest.update(sql.encode())
+            if src is None or not sql or types[src] != TYPE_VIEW:
+                continue
+            for dep in extract(sql):
+                dst = self.index.get(dep)
+                if dst is not None and dst != src:
+                    edges.append((src, dst))
+
+        return DependencyGraph(self.names, types, edges, self.catalog_checksum, digest.hexdigest())
+
+    @property
+    def version(self) -> str:
+        """图版本标识：对象目录或视图定义变化时随之变化，可用于缓存派生结果"""
+        return f"{self.catalog_checksum}:{self.definitions_checksum}"
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _neighbors(self, offsets: 'array[int]', targets: 'array[int]', i: int) -> 'array[int]':
+        """获取节点 i 的邻接节点编号"""
+        return targets[offsets[i]:offsets[i + 1]]
+
+    def get_object_type(self, name: str) -> Optional[str]:
+        """获取对象类型：'table', 'view', 或 None"""
+        i = self.index.get(name)
+        if i is None:
+            return None
+        return 'view' if self.types[i] == TYPE_VIEW else 'table'
+
+    def get_dependencies(self, name: str) -> List[str]:
+        """获取直接依赖的对象名（按名称排序）"""
+        i = self.index.get(name)
+        if i is None:
+            return []
+        return [self.names[j] for j in self._neighbors(self._fwd_offsets, self._fwd_targets, i)]
+
+    def get_dependents(self, name: str) -> List[str]:
+        """获取直接依赖该对象的对象名（按名称排序）"""
+        i = self.index.get(name)
+        if i is None:
+            return []
+        return [self.names[j] for j in self._neighbors(self._rev_offsets, self._rev_targets, i)]
+
+    def get_direct_dependencies(self, name: str) -> List[Dict[str, Any]]:
+        """
+        获取对象的直接依赖（与 ViewDependencyAnalyzer 的返回格式一致）
+
+        Args:
+            name: 对象名
+
+        Returns:
+            [{'name', 'type', 'has_children'}, ...]
+        """
+        i = self.index.get(name)
+        if i is None:
+            return []
+        result = []
+        for j in self._neighbors(self._fwd_offsets, self._fwd_targets, i):
+            is_view = self.types[j] == TYPE_VIEW
+            result.append({
+                'name': self.names[j],
+                'type': 'view' if is_view else 'table',
+                'has_children': is_view
+            })
+        return result
+
+    def _bfs(self, offsets: 'array[int]', targets: 'array[int]', name: str,
+             max_depth: Optional[int]) -> Dict[str, int]:
+        """广度优先遍历，返回 {对象名: 最短距离}（不含起点）"""
+        start = self.index.get(name)
+        if start is None:
+            return {}
+        depths = {start: 0}
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            depth = depths[i]
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for j in targets[offsets[i]:offsets[i + 1]]:
+                if j not in depths:
+                    depths[j] = depth + 1
+                    queue.append(j)
+        del depths[start]
+        return {self.names[i]: depth for i, depth in depths.items()}
+
+    def get_transitive_dependencies(self, name: str, max_depth: Optional[int] = None) -> Dict[str, int]:
+        """
+        获取所有（传递）上游依赖
+
+        Args:
+            name: 对象名
+            max_depth: 最大遍历深度，None 表示无限制
+
+        Returns:
+            {对象名: 距离}
+        """
+        return self._bfs(self._fwd_offsets, self._fwd_targets, name, max_depth)
+
+    def get_transitive_dependents(self, name: str, max_depth: Optional[int] = None) -> Dict[str, int]:
+        """
+        获取所有（传递）下游依赖方
+
+        Args:
+            name: 对象名
+            max_depth: 最大遍历深度，None 表示无限制
+
+        Returns:
+            {对象名: 距离}
+        """
+        return self._bfs(self._rev_offsets, self._rev_targets, name, max_depth)
+
+    def iter_closure(self, names: Iterable[str], downstream: bool = False,
+                     max_depth: Optional[int] = None) -> Iterator[Tuple[str, int, str]]:
+        """
+        多起点广度优先遍历：一次遍历得到多个对象的上游（或下游）闭包的并集，共享节点只产出一次
+
+        Args:
+            names: 起点对象名（不存在的对象会被忽略，起点本身不产出）
+            downstream: False 遍历上游依赖，True 遍历下游依赖方
+            max_depth: 最大遍历深度，None 表示无限制
+
+        Yields:
+            (对象名, 到最近起点的距离, 最先到达它的起点名)，按距离从小到大
+        """
+        offsets, targets = (self._rev_offsets, self._rev_targets) if downstream \
+            else (self._fwd_offsets, self._fwd_targets)
+        starts = [i for i in (self.index.get(name) for name in names) if i is not None]
+        # 节点编号 -> (距离, 起点编号)
+        reached = {i: (0, i) for i in starts}
+        queue = deque(reached)
+        while queue:
+            i = queue.popleft()
+            depth, source = reached[i]
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for j in targets[offsets[i]:offsets[i + 1]]:
+                if j not in reached:
+                    reached[j] = (depth + 1, source)
+                    queue.append(j)
+                    yield self.names[j], depth + 1, self.names[source]
+
+    def _compute_depths(self) -> 'array[int]':
+        """迭代计算每个节点到最底层表的最长路径长度（环上的回边忽略）"""
+        node_count = len(self.names)
+        depths = array('i', [-1]) * node_count
+        on_stack = bytearray(node_count)
+        offsets, targets = self._fwd_offsets, self._fwd_targets
+
+        for root in range(node_count):
+            if depths[root] >= 0:
+                continue
+            stack = [(root, offsets[root])]
+            on_stack[root] = 1
+            while stack:
+                i, pos = stack[-1]
+                if pos < offsets[i + 1]:
+                    stack[-1] = (i, pos + 1)
+                    j = targets[pos]
+                    if depths[j] < 0 and not on_stack[j]:
+                        on_stack[j] = 1
+                        stack.append((j, offsets[j]))
+                    continue
+                stack.pop()
+                on_stack[i] = 0
+                depth = 0
+                for j in targets[offsets[i]:offsets[i + 1]]:
+                    if depths[j] >= 0:
+                        depth = max(depth, depths[j] + 1)
+                depths[i] = depth
+        return depths
+
+    def get_depth(self, name: str) -> Optional[int]:
+        """
+        获取对象依赖链的最大深度（表为 0）
+
+        Args:
+            name: 对象名
+
+        Returns:
+            深度，对象不存在时返回 None
+        """
+        i = self.index.get(name)
+        if i is None:
+            return None
+        if self._depths is None:
+            self._depths = self._compute_depths()
+        return self._depths[i]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取依赖图统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return {
+            'objects': len(self.names),
+            'views': sum(self.types),
+            'edges': self.edge_count,
+            'built_at': self.built_at,
+            'catalog_checksum': self.catalog_checksum,
+            'definitions_checksum': self.definitions_checksum
+        }
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+视图依赖解析缓存
+以规范化视图定义的哈希为键缓存解析结果，并持久化到本地 SQLite 文件，重启后无需重新解析
+"""
+
+import atexit
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from utils.sql_parser import DEFAULT_CATALOG, PARSER_VERSION, extract_dependencies
+
+# 默认缓存文件路径
+PARSE_CACHE_FILE = 'parse_cache.db'
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    规范化 SQL 文本（合并空白），仅用于计算缓存键
+
+    Args:
+        sql: SQL 文本
+
+    Returns:
+        规范化后的文本
+    """
+    return ' '.join(sql.split())
+
+
+class ParseCache:
+    """视图定义解析结果缓存（内存 + SQLite 持久化）"""
+
+    def __init__(self, path: str = PARSE_CACHE_FILE, flush_threshold: int = 200,
+                 retention_days: int = 30, max_entries: int = 50000):
+        """
+        初始化解析缓存，并一次性载入磁盘上最近使用的历史结果
+
+        Args:
+            path: SQLite 文件路径
+            flush_threshold: 累积多少条新结果后批量写盘
+            retention_days: 超过该天数未使用（未写入也未命中）的记录在启动时清理
+            max_entries: 内存中最多保留的条目数（按最近使用淘汰，磁盘上的记录保留）
+        """
+        self.path = path
+        self.flush_threshold = flush_threshold
+        self.retention_days = retention_days
+        self.max_entries = max_entries
+
+        self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._pending: Dict[str, Dict] = {}
+        # 命中但尚未写盘的 last_used {key: 时间}
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        self._load()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS parse_cache (
+                key TEXT PRIMARY KEY,
+                dependencies TEXT NOT NULL,
+                lineage TEXT,
+                last_used REAL NOT NULL
+            )
+        """)
+        return conn
+
+    def _load(self):
+        """载入磁盘缓存，同时清理长期未使用的记录"""
+        try:
+            conn = self._connect()
+            try:
+                cutoff = time.time() - self.retention_days * 86400
+                with conn:
+                    conn.execute("DELETE FROM parse_cache WHERE last_used < ?", (cutoff,))
+                rows = conn.execute(
+                    "SELECT key, dependencies, lineage FROM parse_cache ORDER BY last_used DESC LIMIT ?",
+                    (self.max_entries,)
+                ).fetchall()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"加载解析缓存失败: {e}")
+            return
+
+        # 最近使用的条目排在末尾
+        for key, dependencies, lineage in reversed(rows):
+            self._entries[key] = {
+                'dependencies': json.loads(dependencies),
+                'lineage': json.loads(lineage) if lineage else None
+            }
+
+    @staticmethod
+    def make_key(sql: str, database: Optional[str], catalog: str) -> str:
+        """
+        计算缓存键：规范化定义 + 默认库/catalog + 解析器版本
+
+        Args:
+            sql: 视图定义
+            database: 默认数据库
+            catalog: 默认 catalog
+
+        Returns:
+            SHA-256 十六进制字符串
+        """
+        digest = hashlib.sha256()
+        digest.update(f"v{PARSER_VERSION}\0{catalog}\0{database or ''}\0".encode())
+        digest.update(normalize_sql(sql).encode())
+        return digest.hexdigest()
+
+    def get_dependencies(self, sql: str, database: Optional[str] = None,
+                         catalog: str = DEFAULT_CATALOG) -> Set[str]:
+        """
+        获取视图定义的依赖（catalog.db.table），命中缓存时不再解析
+
+        Args:
+            sql: 视图定义
+            database: 默认数据库
+            catalog: 默认 catalog
+
+        Returns:
+            完全限定名集合
+        """
+        key = self.make_key(sql, database, catalog)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # 命中时间随下一次批量写盘一起落盘，常用的记录不会被按保留天数清理
+                self._hits += 1
+                self._entries.move_to_end(key)
+                if key not in self._pending:
+                    self._touched[key] = time.time()
+            else:
+                self._misses += 1
+        if entry is not None:
+            return set(entry['dependencies'])
+
+        dependencies = sorted(extract_dependencies(sql, database, catalog))
+        self.put(key, dependencies)
+        return set(dependencies)
+
+    def extract_local_dependencies(self, sql: str, database: str,
+                                   catalog: str = DEFAULT_CATALOG) -> Set[str]:
+        """
+        带缓存的 utils.sql_parser.extract_local_dependencies
+
+        Args:
+            sql: 视图定义
+            database: 当前数据库
+            catalog: 当前 catalog
+
+        Returns:
+            当前库内的表/视图名集合
+        """
+        prefix = f"{catalog}.{database}."
+        return {
+            name[len(prefix):] for name in self.get_dependencies(sql, database, catalog)
+            if name.startswith(prefix) and '.' not in name[len(prefix):]
+        }
+
+    def put(self, key: str, dependencies: List[str], lineage: Optional[Dict] = None):
+        """
+        写入解析结果（先进入内存，累积到阈值后批量写盘）
+
+        Args:
+            key: make_key 计算的缓存键
+            dependencies: 依赖的完全限定名列表
+            lineage: 字段级血缘（如有）
+        """
+        entry = {'dependencies': dependencies, 'lineage': lineage}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._pending[key] = entry
+            self._touched.pop(key, None)
+            should_flush = len(self._pending) >= self.flush_threshold
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """将尚未持久化的结果和命中记录（last_used）写入磁盘"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            touched, self._touched = self._touched, {}
+        if not pending and not touched:
+            return
+
+        now = time.time()
+        rows: List[Tuple] = [
+            (key, json.dumps(entry['dependencies']),
+             json.dumps(entry['lineage']) if entry['lineage'] is not None else None, now)
+            for key, entry in pending.items()
+        ]
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO parse_cache (key, dependencies, lineage, last_used) "
+                        "VALUES (?, ?, ?, ?)",
+                        rows
+                    )
+                    conn.executemany(
+                        "UPDATE parse_cache SET last_used = ? WHERE key = ? AND last_used < ?",
+                        [(used, key, used) for key, used in touched.items()]
+                    )
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"保存解析缓存失败: {e}")
+
+    def clear(self):
+        """清空内存与磁盘缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            self._touched.clear()
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM parse_cache")
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"清空解析缓存失败: {e}")
+
+    def stats(self) -> Dict:
+        """
+        获取缓存统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'pending': len(self._pending) + len(self._touched),
+            'hits': self._hits,
+            'misses': self._misses
+        }
+
+
+# 全局解析缓存实例
+_parse_cache: Optional[ParseCache] = None
+_parse_cache_lock = threading.Lock()
+
+
+def get_parse_cache() -> ParseCache:
+    """
+    获取全局解析缓存实例（单例模式），进程退出时自动写盘
+
+    Returns:
+        ParseCache 实例
+    """
+    global _parse_cache
+    if _parse_cache is None:
+        with _parse_cache_lock:
+            if _parse_cache is None:
+                _parse_cache = ParseCache()
+                atexit.register(_parse_cache.flush)
+    return _parse_cache
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Graphviz 渲染池模块
+在有界的后台线程池中以子进程方式调用 Graphviz（dot / sfdp），每个任务有独立超时，
+节点过多时改用更快的布局引擎；渲染结果按内容寻址缓存到磁盘，相同的 DOT 源码只渲染一次
+"""
+
+import hashlib
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Dict, Optional
+
+# 默认磁盘缓存目录
+RENDER_CACHE_DIR = 'render_cache'
+
+# 支持的输出格式
+RENDER_FORMATS = ('png', 'svg')
+
+# 节点数超过该值时改用 sfdp 布局（dot 的分层布局在大图上非常慢）
+LARGE_GRAPH_NODES = 300
+# 节点数超过该值时拒绝渲染图片（建议改用 DOT / Mermaid 导出）
+MAX_RENDER_NODES = 5000
+
+
+class RenderError(Exception):
+    """渲染失败"""
+
+
+class RenderTimeoutError(RenderError):
+    """渲染超时"""
+
+
+class RenderQueueFullError(RenderError):
+    """渲染队列已满"""
+
+
+def choose_engine(node_count: int) -> str:
+    """
+    根据节点数选择布局引擎
+
+    Args:
+        node_count: 图中的节点数
+
+    Returns:
+        'dot' 或 'sfdp'
+    """
+    if node_count > MAX_RENDER_NODES:
+        raise RenderError(f"节点数 {node_count} 超过图片渲染上限 {MAX_RENDER_NODES}，请导出 DOT 或 Mermaid")
+    return 'sfdp' if node_count > LARGE_GRAPH_NODES else 'dot'
+
+
+class RenderPool:
+    """有界的 Graphviz 渲染池"""
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, timeout: float = 30,
+                 cache_dir: Optional[str] = RENDER_CACHE_DIR, cache_max_bytes: int = 256 * 1024 * 1024):
+        """
+        初始化渲染池
+
+        Args:
+            max_workers: 同时运行的 Graphviz 进程数
+            max_pending: 除运行中的任务外最多排队的任务数，超过时直接拒绝
+            timeout: 单个渲染任务的超时时间（秒），超时后终止子进程
+            cache_dir: 磁盘缓存目录，None 表示不使用磁盘缓存
+            cache_max_bytes: 磁盘缓存上限（字节），超过时按访问时间删除最旧的文件
+        """
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='graphviz-render')
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        # 正在渲染的任务（内容哈希 -> Future），相同内容的并发请求共用一个子进程
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._cache_bytes: Optional[int] = None
+
+        # 统计信息
+        self._rendered = 0
+        self._cache_hits = 0
+        self._timeouts = 0
+        self._rejected = 0
+        self._failures = 0
+
+    @staticmethod
+    def content_key(source: str, format: str, engine: str) -> str:
+        """DOT 源码 + 格式 + 引擎的内容哈希"""
+        digest = hashlib.sha256()
+        digest.update(f"{engine}\0{format}\0".encode())
+        digest.update(source.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _cache_path(self, key: str, format: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{format}")
+
+    def _read_cache(self, key: str, format: str) -> Optional[bytes]:
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(key, format)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            # 更新访问时间，清理时优先保留最近使用的文件
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write_cache(self, key: str, format: str, data: bytes):
+        """原子写入缓存文件（临时文件 + rename），失败时只打印日志"""
+        if not self.cache_dir:
+            return
+        path = self._cache_path(key, format)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix='.render.', suffix='.tmp', dir=os.path.dirname(path))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except Exception:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+                raise
+        except OSError as e:
+            print(f"写入渲染缓存失败: {e}")
+            return
+
+        with self._lock:
+            if self._cache_bytes is not None:
+                self._cache_bytes += len(data)
+            over_limit = self._cache_bytes is None or self._cache_bytes > self.cache_max_bytes
+        if over_limit:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        磁盘缓存超过上限时，按访问时间从旧到新删除文件
+
+        Returns:
+            删除的文件数
+        """
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return 0
+        files = []
+        for root, _, names in os.walk(self.cache_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        removed = 0
+        for _, size, path in sorted(files):
+            if total <= self.cache_max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+
+        with self._lock:
+            self._cache_bytes = total
+        return removed
+
+    def _run(self, source: str, format: str, engine: str, key: str) -> bytes:
+        """在工作线程中运行 Graphviz 子进程"""
+        try:
+            result = subprocess.run(
+                [engine, f'-T{format}'],
+                input=source.encode('utf-8'),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=self.timeout
+            )
+        except subprocess.TimeoutExpired:
+            # subprocess.run 超时时已终止子进程
+            with self._lock:
+                self._timeouts += 1
+            raise RenderTimeoutError(f"Graphviz 渲染超时（{self.timeout} 秒）")
+        except FileNotFoundError:
+            with self._lock:
+                self._failures += 1
+            raise RenderError(f"未找到 Graphviz 可执行文件: {engine}")
+
+        if result.returncode != 0:
+            with self._lock:
+                self._failures += 1
+            message = result.stderr.decode('utf-8', errors='replace').strip()
+            raise RenderError(f"Graphviz 渲染失败: {message}")
+
+        with self._lock:
+            self._rendered += 1
+        self._write_cache(key, format, result.stdout)
+        return result.stdout
+
+    def submit(self, source: str, format: str = 'png', engine: str = 'dot') -> Future:
+        """
+        提交渲染任务
+
+        Args:
+            source: DOT 源码
+            format: 输出格式（png / svg）
+            engine: 布局引擎（dot / sfdp / neato）
+
+        Returns:
+            Future，结果为图片二进制数据
+
+        Raises:
+            RenderQueueFullError: 排队任务过多
+            RenderError: 渲染池已关闭
+        """
+        if format not in RENDER_FORMATS:
+            raise RenderError(f"不支持的图片格式: {format}")
+
+        key = self.content_key(source, format, engine)
+        data = self._read_cache(key, format)
+        if data is not None:
+            with self._lock:
+                self._cache_hits += 1
+            future = Future()
+            future.set_result(data)
+            return future
+
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            if not self._slots.acquire(blocking=False):
+                self._rejected += 1
+                raise RenderQueueFullError("渲染任务过多，请稍后重试")
+            try:
+                future = self._executor.submit(self._run, source, format, engine, key)
+            except RuntimeError as e:
+                # 渲染池已关闭：归还名额，避免名额泄漏后所有请求都被拒绝
+                self._slots.release()
+                raise RenderError(f"渲染池不可用: {e}") from e
+            self._inflight[key] = future
+
+        def done(_):
+            with self._lock:
+                self._inflight.pop(key, None)
+            self._slots.release()
+
+        future.add_done_callback(done)
+        return future
+
+    def render(self, source: str, format: str = 'png', engine: str = 'dot') -> bytes:
+        """
+        渲染 DOT 源码并等待结果
+
+        Args:
+            source: DOT 源码
+            format: 输出格式（png / svg）
+            engine: 布局引擎（dot / sfdp / neato）
+
+        Returns:
+            图片二进制数据
+
+        Raises:
+            RenderTimeoutError: 排队加渲染的总等待时间超过上限
+        """
+        # 最坏情况下要等前面所有排队任务按批次跑完，再加上自身的运行时间
+        wait_timeout = self.timeout * (self.max_pending // self.max_workers + 2)
+        future = self.submit(source, format, engine)
+        try:
+            return future.result(timeout=wait_timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._timeouts += 1
+            raise RenderTimeoutError(f"等待渲染结果超过 {wait_timeout:.0f} 秒")
+
+    def stats(self) -> Dict:
+        """
+        获取渲染统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'inflight': len(self._inflight),
+                'rendered': self._rendered,
+                'cache_hits': self._cache_hits,
+                'timeouts': self._timeouts,
+                'rejected': self._rejected,
+                'failures': self._failures,
+                'cache_bytes': self._cache_bytes
+            }
+
+    def shutdown(self):
+        """停止接受新任务"""
+        self._executor.shutdown(wait=False)
+
+
+# 全局渲染池实例
+_render_pool: Optional[RenderPool] = None
+_render_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    """
+    获取全局渲染池实例（单例模式）
+
+    Returns:
+        RenderPool 实例
+    """
+    global _render_pool
+    if _render_pool is None:
+        with _render_pool_lock:
+            if _render_pool is None:
+                _render_pool = RenderPool()
+    return _render_pool
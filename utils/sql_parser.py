@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+SQL 依赖解析模块
+基于词法切分的单遍扫描，从视图定义中提取引用的表/视图（catalog.db.table），
+CTE 名称只在定义它的查询块（及其内部的子查询）中排除
+"""
+
+import re
+from typing import List, NamedTuple, Optional, Set, Tuple
+
+# StarRocks 内部表所在的默认 catalog
+DEFAULT_CATALOG = 'default_catalog'
+
+# 解析器版本，解析规则变化时递增，使持久化的解析缓存失效
+PARSER_VERSION = 2
+
+# 词法单元类型
+WORD = 'word'          # 未加引号的标识符或关键字
+QUOTED = 'quoted'      # 反引号标识符
+STRING = 'string'      # 字符串字面量
+PUNCT = 'punct'        # 单字符符号 ( ) , . ;
+OTHER = 'other'        # 运算符等其余符号
+
+# 词法扫描：各分支均为确定性的字符类匹配（字符串/标识符采用展开循环写法），整体线性扫描，
+# 不会回溯爆炸；空白不匹配任何分支，由 findall 在 C 层直接跳过
+_LEXEME_RE = re.compile(r"""
+      --[^\n]* | \#[^\n]* | /\*[^*]*\*+(?:[^/*][^*]*\*+)*/
+    | `[^`]*(?:``[^`]*)*`
+    | '[^'\\]*(?:(?:\\.|'')[^'\\]*)*'
+    | "[^"\\]*(?:(?:\\.|"")[^"\\]*)*"
+    | [\w$]+
+    | \S
+""", re.VERBOSE)
+
+_PUNCT_CHARS = frozenset('(),.;')
+
+# 出现在 FROM 子句内时表示 FROM 子句结束的关键字
+_CLAUSE_END_KEYWORDS = frozenset({
+    'WHERE', 'GROUP', 'HAVING', 'ORDER', 'LIMIT', 'UNION', 'EXCEPT', 'INTERSECT',
+    'MINUS', 'WINDOW', 'QUALIFY', 'INTO', 'VALUES', 'OFFSET',
+})
+
+# 不会作为表名出现、遇到后不再期待表名的关键字
+_NON_TABLE_KEYWORDS = frozenset({
+    'SELECT', 'WHERE', 'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'UNION', 'CASE', 'ON',
+    'USING', 'AS', 'WITH', 'VALUES', 'SET',
+})
+
+
+class Token(NamedTuple):
+    """词法单元"""
+    kind: str
+    value: str
+
+
+class TableReference(NamedTuple):
+    """完全限定的表引用"""
+    catalog: str
+    database: Optional[str]
+    table: str
+
+    @property
+    def qualified_name(self) -> str:
+        """catalog.db.table 形式的名称"""
+        return f"{self.catalog}.{self.database or ''}.{self.table}"
+
+
+def _scan(sql: str) -> List[str]:
+    """切分出原始词素（已去掉注释），一次 C 层扫描完成"""
+    return [
+        lexeme for lexeme in _LEXEME_RE.findall(sql)
+        if not (lexeme[0] == '#' or lexeme.startswith('--') or lexeme.startswith('/*'))
+    ]
+
+
+def _is_word(lexeme: str) -> bool:
+    first = lexeme[0]
+    return first.isalnum() or first == '_' or first == '$'
+
+
+def _is_identifier(lexeme: str) -> bool:
+    return lexeme[0] == '`' or _is_word(lexeme)
+
+
+def _identifier_value(lexeme: str) -> str:
+    """去掉反引号并还原转义"""
+    if lexeme[0] == '`':
+        return lexeme[1:-1].replace('``', '`')
+    return lexeme
+
+
+def tokenize(sql: str) -> List[Token]:
+    """
+    将 SQL 切分为词法单元（单遍线性扫描，跳过空白和注释）
+
+    Args:
+        sql: SQL 文本
+
+    Returns:
+        词法单元列表
+    """
+    tokens = []
+    for lexeme in _scan(sql):
+        first = lexeme[0]
+        if first == '`':
+            tokens.append(Token(QUOTED, _identifier_value(lexeme)))
+        elif first == "'" or first == '"':
+            tokens.append(Token(STRING, lexeme[1:-1]))
+        elif _is_word(lexeme):
+            tokens.append(Token(WORD, lexeme))
+        else:
+            tokens.append(Token(PUNCT if first in _PUNCT_CHARS else OTHER, lexeme))
+    return tokens
+
+
+class _Level:
+    """一层括号（或最外层语句）的解析状态"""
+
+    __slots__ = ('select_seen', 'in_from', 'expect_table', 'cte_state', 'cte_names')
+
+    def __init__(self, in_from: bool = False, expect_table: bool = False):
+        self.select_seen = False
+        self.in_from = in_from
+        self.expect_table = expect_table
+        self.cte_state: Optional[str] = None
+        # 本层 WITH 定义的 CTE 名称（小写），只对本层及内层可见
+        self.cte_names: Optional[Set[str]] = None
+
+
+def _read_qualified_name(lexemes: List[str], i: int) -> Tuple[List[str], int]:
+    """读取 a.b.c 形式的限定名，返回 (各部分, 下一个位置)"""
+    parts = [_identifier_value(lexemes[i])]
+    i += 1
+    count = len(lexemes)
+    while i + 1 < count and lexemes[i] == '.' and _is_identifier(lexemes[i + 1]):
+        parts.append(_identifier_value(lexemes[i + 1]))
+        i += 2
+    return parts, i
+
+
+def _is_visible_cte(stack: List[_Level], name: str) -> bool:
+    """名称是否为当前查询块或其外层定义的 CTE"""
+    name = name.lower()
+    return any(level.cte_names and name in level.cte_names for level in stack)
+
+
+def extract_table_references(sql: str, default_database: Optional[str] = None,
+                             default_catalog: str = DEFAULT_CATALOG) -> Set[TableReference]:
+    """
+    从 SQL 中提取引用的表和视图
+
+    支持 FROM / 各类 JOIN / 逗号连接 / LATERAL / 无别名子查询 / 括号嵌套连接，
+    WITH 定义的 CTE 名称在其所在查询块内不会作为依赖返回（同名的真实表在并列的子查询中仍会返回），
+    表函数（如 unnest(...)）会被忽略。
+
+    Args:
+        sql: SQL 文本（SELECT 或 CREATE VIEW ... AS SELECT）
+        default_database: 未限定库名时使用的数据库
+        default_catalog: 未限定 catalog 时使用的 catalog
+
+    Returns:
+        TableReference 集合
+    """
+    lexemes = _scan(sql)
+    count = len(lexemes)
+    references: List[List[str]] = []
+
+    stack = [_Level()]
+    level = stack[0]
+    i = 0
+    while i < count:
+        lexeme = lexemes[i]
+        first = lexeme[0]
+        is_word = first.isalnum() or first == '_' or first == '$'
+        upper = lexeme.upper() if is_word else ''
+
+        # ---------- CTE 定义：WITH [RECURSIVE] name [(cols)] AS (...) [, ...] ----------
+        state = level.cte_state
+        if state is not None:
+            if state == 'name':
+                if upper == 'RECURSIVE':
+                    i += 1
+                    continue
+                if is_word or first == '`':
+                    if level.cte_names is None:
+                        level.cte_names = set()
+                    level.cte_names.add(_identifier_value(lexeme).lower())
+                    level.cte_state = 'after_name'
+                    i += 1
+                    continue
+            elif state == 'after_name':
+                if lexeme == '(':
+                    # CTE 列名列表
+                    level = _Level()
+                    stack.append(level)
+                    i += 1
+                    continue
+                if upper == 'AS':
+                    level.cte_state = 'as'
+                    i += 1
+                    continue
+            elif state == 'as':
+                if lexeme == '(':
+                    level.cte_state = 'after_body'
+                    level = _Level()
+                    stack.append(level)
+                    i += 1
+                    continue
+            elif state == 'after_body':
+                if lexeme == ',':
+                    level.cte_state = 'name'
+                    i += 1
+                    continue
+            level.cte_state = None
+
+        # ---------- 期待表引用 ----------
+        if level.expect_table:
+            if upper == 'LATERAL':
+                i += 1
+                continue
+            level.expect_table = False
+            if lexeme == '(':
+                # 子查询或括号内的连接
+                level = _Level(in_from=True, expect_table=True)
+                stack.append(level)
+                i += 1
+                continue
+            if (is_word and upper not in _NON_TABLE_KEYWORDS) or first == '`':
+                parts, i = _read_qualified_name(lexemes, i)
+                # 后面紧跟括号的是表函数，如 unnest(...) / generate_series(...) / TABLE(...)
+                if i >= count or lexemes[i] != '(':
+                    # 未限定的名称若是当前可见的 CTE，则不是依赖
+                    if len(parts) > 1 or not _is_visible_cte(stack, parts[0]):
+                        references.append(parts)
+                continue
+
+        # ---------- 一般词法单元 ----------
+        if is_word:
+            if upper == 'SELECT':
+                level.select_seen = True
+                level.in_from = False
+            elif upper == 'FROM':
+                # 仅查询中的 FROM 有效，忽略 EXTRACT(x FROM y) 等函数参数
+                if level.select_seen or level.in_from:
+                    level.in_from = True
+                    level.expect_table = True
+            elif upper == 'JOIN' or upper == 'STRAIGHT_JOIN':
+                level.in_from = True
+                level.expect_table = True
+            elif upper == 'WITH':
+                # 排除 GROUP BY ... WITH ROLLUP 等用法
+                nxt = lexemes[i + 1] if i + 1 < count else ''
+                if nxt and _is_identifier(nxt) and nxt.upper() not in ('ROLLUP', 'CUBE'):
+                    level.cte_state = 'name'
+            elif upper in _CLAUSE_END_KEYWORDS:
+                level.in_from = False
+        elif lexeme == '(':
+            level = _Level()
+            stack.append(level)
+        elif lexeme == ')':
+            if len(stack) > 1:
+                stack.pop()
+                level = stack[-1]
+        elif lexeme == ',':
+            if level.in_from:
+                # 逗号连接
+                level.expect_table = True
+        elif lexeme == ';':
+            stack = [_Level()]
+            level = stack[0]
+
+        i += 1
+
+    result: Set[TableReference] = set()
+    for parts in references:
+        if len(parts) == 1:
+            result.add(TableReference(default_catalog, default_database, parts[0]))
+        elif len(parts) == 2:
+            result.add(TableReference(default_catalog, parts[0], parts[1]))
+        else:
+            result.add(TableReference(parts[-3], parts[-2], parts[-1]))
+    return result
+
+
+def extract_dependencies(sql: str, default_database: Optional[str] = None,
+                         default_catalog: str = DEFAULT_CATALOG) -> Set[str]:
+    """
+    从 SQL 中提取依赖，返回 catalog.db.table 形式的完全限定名
+
+    Args:
+        sql: SQL 文本
+        default_database: 未限定库名时使用的数据库
+        default_catalog: 未限定 catalog 时使用的 catalog
+
+    Returns:
+        完全限定名集合
+    """
+    return {ref.qualified_name for ref in extract_table_references(sql, default_database, default_catalog)}
+
+
+def extract_local_dependencies(sql: str, database: str,
+                               catalog: str = DEFAULT_CATALOG) -> Set[str]:
+    """
+    从 SQL 中提取属于指定数据库的依赖表名（不含库名）
+
+    与早期只取表名的正则实现不同，other_db.table 这类跨库引用不再按表名计入
+    （否则会与当前库中的同名对象混淆）；需要跨库依赖时使用 extract_dependencies
+
+    Args:
+        sql: SQL 文本
+        database: 当前数据库，跨库引用会被排除
+        catalog: 当前 catalog
+
+    Returns:
+        表/视图名集合
+    """
+    return {
+        ref.table for ref in extract_table_references(sql, database, catalog)
+        if ref.database == database and ref.catalog == catalog
+    }
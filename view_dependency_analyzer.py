@@ -5,9 +5,10 @@ StarRocks 视图依赖关系分析工具
 """
 
 import pymysql
-import re
 from typing import Set, List, Tuple
 
+from utils.sql_parser import extract_local_dependencies
+
 
 class ViewDependencyAnalyzer:
     """视图依赖关系分析器"""
@@ -54,43 +55,8 @@ class ViewDependencyAnalyzer:
             return ""
 
     def extract_dependencies(self, sql: str) -> Set[str]:
-        """从 SQL 中提取依赖的表和视图"""
-        # 移除注释
-        sql = re.sub(r'--.*?$', '', sql, flags=re.MULTILINE)
-        sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
-
-        dependencies = set()
-
-        # 匹配 FROM 和 JOIN 后的表名
-        # 支持格式:
-        # 1. `donggua`.`live_base` AS `t1`
-        # 2. donggua.live_base AS t1
-        # 3. `live_base` AS `t1`
-        # 4. live_base AS t1
-        # 5. live_base
-
-        # 匹配带数据库名的表: `db`.`table` 或 db.table
-        pattern1 = r'(?:FROM|JOIN)\s+`?(?:\w+)`?\.`?(\w+)`?\s+(?:AS\s+)?`?\w+`?'
-        matches = re.finditer(pattern1, sql, re.IGNORECASE)
-        for match in matches:
-            table_name = match.group(1)
-            if table_name.upper() not in ['SELECT', 'WHERE', 'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'UNION', 'CASE', 'ON']:
-                dependencies.add(table_name)
-
-        # 匹配不带数据库名的表: `table` 或 table
-        pattern2 = r'(?:FROM|JOIN)\s+`?(\w+)`?\s+(?:AS\s+)?`?\w+`?'
-        matches = re.finditer(pattern2, sql, re.IGNORECASE)
-        for match in matches:
-            table_name = match.group(1)
-            # 检查是否已经被 pattern1 匹配过（避免重复）
-            # 通过检查前面是否有点号来判断
-            match_start = match.start()
-            if match_start > 0 and sql[match_start - 1] == '.':
-                continue
-            if table_name.upper() not in ['SELECT', 'WHERE', 'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'UNION', 'CASE', 'ON']:
-                dependencies.add(table_name)
-
-        return dependencies
+        """从 SQL 中提取依赖的表和视图（仅当前数据库内的对象）"""
+        return extract_local_dependencies(sql, self.database)
 
     def analyze_view(self, view_name: str, indent: int = 0) -> List[Tuple[str, int, bool]]:
         """
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预热任务模块
+激活配置时在后台线程中依次加载对象目录、视图定义、依赖图、搜索索引和表结构，
+并记录每个阶段的进度，激活后的请求直接使用内存中的结果
+"""
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config_manager import add_invalidation_listener
+
+# 阶段函数：无参数，返回处理的对象数（可为 None）
+WarmupStage = Tuple[str, Callable[[], Optional[int]]]
+
+# 任务状态
+STATUS_PENDING = 'pending'
+STATUS_RUNNING = 'running'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+
+
+class WarmupJob:
+    """单个配置的预热任务"""
+
+    def __init__(self, config_id: str, stages: List[WarmupStage]):
+        """
+        初始化预热任务
+
+        Args:
+            config_id: 配置ID
+            stages: [(阶段名, 阶段函数)]，按顺序执行，某一阶段失败时后续阶段不再执行
+        """
+        self.config_id = config_id
+        self._stages = stages
+        self._progress = [
+            {'name': name, 'status': STATUS_PENDING, 'seconds': None, 'items': None}
+            for name, _ in stages
+        ]
+        self.status = STATUS_PENDING
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancelled = False
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self) -> bool:
+        """任务是否已结束（成功、失败或取消）"""
+        return self._done.is_set()
+
+    def start(self):
+        """在后台线程中执行"""
+        thread = threading.Thread(target=self.run, name=f"warmup-{self.config_id}", daemon=True)
+        thread.start()
+
+    def cancel(self):
+        """取消任务（当前阶段执行完后停止）"""
+        self._cancelled = True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待任务结束
+
+        Args:
+            timeout: 超时时间（秒）
+
+        Returns:
+            任务是否已结束
+        """
+        return self._done.wait(timeout)
+
+    def run(self):
+        """依次执行各阶段"""
+        with self._lock:
+            self.status = STATUS_RUNNING
+            self.started_at = time.time()
+        try:
+            for (name, stage), progress in zip(self._stages, self._progress):
+                if self._cancelled:
+                    with self._lock:
+                        self.status = STATUS_CANCELLED
+                    return
+
+                with self._lock:
+                    progress['status'] = STATUS_RUNNING
+                started = time.perf_counter()
+                try:
+                    items = stage()
+                except Exception as e:
+                    print(f"预热阶段 {name} 失败: {e}")
+                    with self._lock:
+                        progress['status'] = STATUS_FAILED
+                        progress['seconds'] = round(time.perf_counter() - started, 3)
+                        self.status = STATUS_FAILED
+                        self.error = f"{name}: {e}"
+                    return
+                with self._lock:
+                    progress['status'] = STATUS_DONE
+                    progress['seconds'] = round(time.perf_counter() - started, 3)
+                    progress['items'] = items
+
+            with self._lock:
+                self.status = STATUS_DONE
+        finally:
+            with self._lock:
+                self.finished_at = time.time()
+            self._done.set()
+
+    def progress(self) -> Dict:
+        """
+        获取任务进度
+
+        Returns:
+            {'config_id', 'status', 'current_stage', 'completed', 'total', 'stages', 'started_at',
+             'finished_at', 'elapsed', 'error'}
+        """
+        with self._lock:
+            stages = [dict(progress) for progress in self._progress]
+            current = next((p['name'] for p in stages if p['status'] == STATUS_RUNNING), None)
+            end = self.finished_at or time.time()
+            return {
+                'config_id': self.config_id,
+                'status': self.status,
+                'current_stage': current,
+                'completed': sum(1 for p in stages if p['status'] == STATUS_DONE),
+                'total': len(stages),
+                'stages': stages,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'elapsed': round(end - self.started_at, 3) if self.started_at else None,
+                'error': self.error
+            }
+
+
+# 全局预热任务注册表（每个配置保留最近一次任务）
+_jobs: Dict[str, WarmupJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def start_warmup(config_id: str, stages: List[WarmupStage]) -> WarmupJob:
+    """
+    启动配置的预热任务；同一配置已有任务在执行时直接返回该任务
+
+    Args:
+        config_id: 配置ID
+        stages: [(阶段名, 阶段函数)]
+
+    Returns:
+        WarmupJob 实例
+    """
+    with _jobs_lock:
+        job = _jobs.get(config_id)
+        if job is not None and not job.finished:
+            return job
+        job = WarmupJob(config_id, stages)
+        _jobs[config_id] = job
+    job.start()
+    return job
+
+
+def get_warmup(config_id: str) -> Optional[WarmupJob]:
+    """
+    获取配置最近一次的预热任务
+
+    Args:
+        config_id: 配置ID
+
+    Returns:
+        WarmupJob 实例，未预热过时返回 None
+    """
+    return _jobs.get(config_id)
+
+
+def invalidate_warmup(config_id: str):
+    """
+    取消并移除配置的预热任务（配置被修改或删除时调用）
+
+    Args:
+        config_id: 配置ID
+    """
+    with _jobs_lock:
+        job = _jobs.pop(config_id, None)
+    if job is not None:
+        job.cancel()
+
+
+add_invalidation_listener(invalidate_warmup)
@@ -4,22 +4,33 @@
 StarRocks 视图依赖关系 Web 分析工具
 """
 
-from flask import Flask, render_template, jsonify, request, session
+from flask import Flask, Response, render_template, jsonify, request, session
 from flask_session import Session
-import pymysql
-import re
 import json
 import os
+import queue
+import threading
 from typing import Set, Dict, List, Optional
-from datetime import datetime
 from dotenv import load_dotenv
-from config_manager import get_config_manager
+from config_manager import add_invalidation_listener, get_config_manager
 from metadata_manager import MetadataManager
-from export_manager import ExportManager
+from export_manager import BUNDLE_FORMATS, STREAM_FORMATS, ExportManager, iter_chunks
+from catalog_manager import get_catalog
+from comment_store import get_comment_store
+from dependency_graph import DependencyGraph, get_dependency_graph, peek_dependency_graph
+from search_index import SearchIndex, get_search_index
+from structure_cache import StructureCache, get_structure_cache, list_structure_caches
+from snapshot_store import get_snapshot_store
+from metadata_watcher import get_metadata_watcher, list_metadata_watchers
+from warmup_manager import WarmupStage, get_warmup, start_warmup
 from flask import send_file
 import io
 
 from utils.cache import get_cache
+from utils.connection_pool import get_pool, get_pool_manager
+from utils.sql_parser import DEFAULT_CATALOG
+from utils.parse_cache import get_parse_cache
+from utils.render_pool import RenderError, RenderQueueFullError, RenderTimeoutError, get_render_pool
 
 
 # 加载环境变量
@@ -30,249 +41,161 @@ app = Flask(__name__)
 # Flask 配置
 app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-change-in-production')
 app.config['SESSION_TYPE'] = os.environ.get('SESSION_TYPE', 'filesystem')
+app.config['SESSION_FILE_DIR'] = os.environ.get('SESSION_FILE_DIR', 'flask_session')
 app.config['SESSION_PERMANENT'] = True
 app.config['PERMANENT_SESSION_LIFETIME'] = 86400  # 24 hours
 
 # 初始化 Session
 Session(app)
 
-# 注释数据文件路径
-COMMENTS_FILE = 'table_comments.json'
-
 
 class ViewDependencyAnalyzer:
     """视图依赖关系分析器"""
 
     def __init__(self, config: Dict):
         self.config = config
+        self.config_id = config.get('id') or config['host']
         self.database = config['database']
-        self.comments = self.load_comments()
-
-    def load_comments(self) -> Dict:
-        """加载注释数据"""
-        if os.path.exists(COMMENTS_FILE):
-            try:
-                with open(COMMENTS_FILE, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"加载注释文件失败: {e}")
-                return {}
-        return {}
-
-    def save_comments(self):
-        """保存注释数据"""
-        try:
-            with open(COMMENTS_FILE, 'w', encoding='utf-8') as f:
-                json.dump(self.comments, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存注释文件失败: {e}")
+        self.catalog = get_catalog(config)
+        self.comment_store = get_comment_store()
 
     def get_connection(self):
-        """获取数据库连接"""
-        return pymysql.connect(
-            host=self.config['host'],
-            port=self.config['port'],
-            user=self.config['user'],
-            password=self.config['password'],
-            database=self.config['database'],
-            charset='utf8mb4'
-        )
+        """从连接池借出数据库连接（上下文管理器，退出时自动归还）"""
+        return get_pool(self.config).connection()
 
     def object_exists(self, object_name: str) -> bool:
         """判断对象（表或视图）是否存在"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            query = """
-                SELECT TABLE_NAME
-                FROM information_schema.TABLES
-                WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
-            """
-            cursor.execute(query, (self.database, object_name))
-            result = cursor.fetchone()
-            return result is not None
-        finally:
-            conn.close()
+        return self.catalog.object_exists(object_name)
 
     def get_object_type(self, object_name: str) -> str:
         """获取对象类型：'table', 'view', 或 None"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            query = """
-                SELECT TABLE_TYPE
-                FROM information_schema.TABLES
-                WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
-            """
-            cursor.execute(query, (self.database, object_name))
-            result = cursor.fetchone()
-            if not result:
-                return None
-            return 'view' if result[0] == 'VIEW' else 'table'
-        finally:
-            conn.close()
+        return self.catalog.get_object_type(object_name)
 
     def is_view(self, object_name: str) -> bool:
         """判断对象是否为视图"""
-        return self.get_object_type(object_name) == 'view'
-
-    def get_view_definition(self, view_name: str) -> str:
-        """获取视图定义 SQL"""
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
-            query = f"SHOW CREATE VIEW `{view_name}`"
-            cursor.execute(query)
-            result = cursor.fetchone()
-            return result[1] if result and len(result) >= 2 else ""
-        except Exception as e:
-            print(f"错误: 无法获取视图 {view_name} 的定义 - {e}")
-            return ""
-        finally:
-            conn.close()
+        return self.catalog.is_view(object_name)
 
     def extract_dependencies(self, sql: str) -> Set[str]:
-        """从 SQL 中提取依赖的表和视图"""
-        # 移除注释
-        sql = re.sub(r'--.*?$', '', sql, flags=re.MULTILINE)
-        sql = re.sub(r'/\*.*?\*/', '', sql, flags=re.DOTALL)
-
-        dependencies = set()
-
-        # 匹配带数据库名的表: `db`.`table` 或 db.table
-        pattern1 = r'(?:FROM|JOIN)\s+`?(?:\w+)`?\.`?(\w+)`?\s+(?:AS\s+)?`?\w+`?'
-        matches = re.finditer(pattern1, sql, re.IGNORECASE)
-        for match in matches:
-            table_name = match.group(1)
-            if table_name.upper() not in ['SELECT', 'WHERE', 'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'UNION', 'CASE', 'ON']:
-                dependencies.add(table_name)
-
-        # 匹配不带数据库名的表: `table` 或 table
-        pattern2 = r'(?:FROM|JOIN)\s+`?(\w+)`?\s+(?:AS\s+)?`?\w+`?'
-        matches = re.finditer(pattern2, sql, re.IGNORECASE)
-        for match in matches:
-            table_name = match.group(1)
-            # 检查是否已经被 pattern1 匹配过
-            match_start = match.start()
-            if match_start > 0 and sql[match_start - 1] == '.':
-                continue
-            if table_name.upper() not in ['SELECT', 'WHERE', 'GROUP', 'ORDER', 'HAVING', 'LIMIT', 'UNION', 'CASE', 'ON']:
-                dependencies.add(table_name)
-
-        return dependencies
-
-    def get_direct_dependencies(self, object_name: str) -> List[Dict]:
-        """获取对象的直接依赖（不递归）"""
-        obj_type = self.get_object_type(object_name)
-
-        # 如果对象不存在，返回空
-        if not obj_type:
-            return []
-
-        # 如果是表，没有依赖，返回空
-        if obj_type == 'table':
-            return []
-
-        # 如果是视图，获取其依赖
-        view_sql = self.get_view_definition(object_name)
-        if not view_sql:
-            return []
+        """从 SQL 中提取依赖的表和视图（仅当前数据库内的对象）"""
+        return get_parse_cache().extract_local_dependencies(
+            sql, self.database, self.config.get('catalog') or DEFAULT_CATALOG)
+
+    @property
+    def graph(self) -> DependencyGraph:
+        """当前数据库的依赖关系图（整库构建一次，之后在内存中查询）"""
+        return get_dependency_graph(self.config, self.extract_dependencies)
+
+    @property
+    def search_index(self) -> SearchIndex:
+        """当前数据库的表/视图搜索索引"""
+        return get_search_index(self.config)
+
+    def prefetch_table_structures(self) -> int:
+        """
+        一次批量查询整库的表结构并写入表结构缓存
+
+        Returns:
+            预取的对象数
+        """
+        return self.structure_cache.load()
+
+    def warmup_stages(self) -> List[WarmupStage]:
+        """
+        预热阶段：对象目录 -> 视图定义 -> 依赖图 -> 搜索索引 -> 表结构
+
+        Returns:
+            [(阶段名, 阶段函数)]
+        """
+        definitions: Dict[str, Dict[str, str]] = {}
+
+        def load_view_definitions() -> Optional[int]:
+            # 依赖图已是最新时不需要重新读取视图定义
+            if peek_dependency_graph(self.config) is not None:
+                return None
+            definitions['views'] = MetadataManager(self.config).get_view_definitions()
+            return len(definitions['views'])
 
-        dependencies = self.extract_dependencies(view_sql)
-        result = []
+        def build_graph() -> int:
+            graph = get_dependency_graph(self.config, self.extract_dependencies, definitions.pop('views', None))
+            return len(graph)
 
-        for dep in sorted(dependencies):
-            # 验证依赖的对象是否存在
-            dep_type = self.get_object_type(dep)
-            if dep_type:  # 只添加存在的对象
-                result.append({
-                    'name': dep,
-                    'type': dep_type,
-                    'has_children': dep_type == 'view'
-                })
+        return [
+            ('catalog', lambda: len(self.catalog.get_objects())),
+            ('view_definitions', load_view_definitions),
+            ('dependency_graph', build_graph),
+            ('search_index', lambda: len(self.search_index)),
+            ('table_structures', self.prefetch_table_structures)
+        ]
 
-        return result
+    def get_direct_dependencies(self, object_name: str) -> List[Dict]:
+        """获取对象的直接依赖（不递归）"""
+        # 表没有依赖，不存在的对象返回空，均由依赖图直接处理
+        return self.graph.get_direct_dependencies(object_name)
+
+    @property
+    def structure_cache(self) -> StructureCache:
+        """当前数据库的表结构缓存（整库批量加载，按元数据指纹增量刷新）"""
+        return get_structure_cache(self.config)
+
+    def _format_table_structure(self, table_name: str, structure: Dict) -> Dict:
+        """合并缓存的表结构与保存的自定义注释（注释随时可能被修改，不进入缓存）"""
+        table_key = f"{self.database}.{table_name}"
+        saved_comments = self.comment_store.get(table_key)
+        table_comment = saved_comments.get('table_comment', structure['db_comment'])
+        column_comments = saved_comments.get('column_comments', {})
+
+        # 构建字段列表
+        column_list = []
+        for col in structure['columns']:
+            column_name = col[0]
+            column_list.append({
+                'name': column_name,
+                'data_type': col[1],
+                'column_type': col[2],
+                'nullable': col[3] == 'YES',
+                'default': col[4],
+                'db_comment': col[5] or '',
+                'custom_comment': column_comments.get(column_name, col[5] or '')
+            })
 
+        return {
+            'table_name': table_name,
+            'table_type': structure['table_type'],
+            'table_comment': table_comment,
+            'columns': column_list
+        }
 
     def get_table_structure(self, table_name: str) -> Dict:
         """获取表结构信息"""
-        conn = self.get_connection()
         try:
-            cursor = conn.cursor()
-
-            # 获取表类型
-            type_query = """
-                SELECT TABLE_TYPE, TABLE_COMMENT
-                FROM information_schema.TABLES
-                WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
-            """
-            cursor.execute(type_query, (self.database, table_name))
-            type_result = cursor.fetchone()
-
-            if not type_result:
+            structure = self.structure_cache.get(table_name)
+            if structure is None:
                 return {'error': '表或视图不存在'}
-
-            table_type = 'view' if type_result[0] == 'VIEW' else 'table'
-            db_comment = type_result[1] or ''
-
-            # 获取字段信息
-            columns_query = """
-                SELECT
-                    COLUMN_NAME,
-                    DATA_TYPE,
-                    COLUMN_TYPE,
-                    IS_NULLABLE,
-                    COLUMN_DEFAULT,
-                    COLUMN_COMMENT
-                FROM information_schema.COLUMNS
-                WHERE TABLE_SCHEMA = %s AND TABLE_NAME = %s
-                ORDER BY ORDINAL_POSITION
-            """
-            cursor.execute(columns_query, (self.database, table_name))
-            columns = cursor.fetchall()
-
-            # 获取保存的注释
-            table_key = f"{self.database}.{table_name}"
-            saved_comments = self.comments.get(table_key, {})
-            table_comment = saved_comments.get('table_comment', db_comment)
-            column_comments = saved_comments.get('column_comments', {})
-
-            # 构建字段列表
-            column_list = []
-            for col in columns:
-                column_name = col[0]
-                column_list.append({
-                    'name': column_name,
-                    'data_type': col[1],
-                    'column_type': col[2],
-                    'nullable': col[3] == 'YES',
-                    'default': col[4],
-                    'db_comment': col[5] or '',
-                    'custom_comment': column_comments.get(column_name, col[5] or '')
-                })
-
-            return {
-                'table_name': table_name,
-                'table_type': table_type,
-                'table_comment': table_comment,
-                'columns': column_list
-            }
-
+            return self._format_table_structure(table_name, structure)
         except Exception as e:
             return {'error': str(e)}
-        finally:
-            conn.close()
+
+    def get_table_structures(self, table_names: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        批量获取表结构信息（缓存中没有或已过期的对象合并为一次查询）
+
+        Args:
+            table_names: 表/视图名列表
+
+        Returns:
+            {对象名: 表结构}，对象不存在时为 None
+        """
+        structures = self.structure_cache.get_many(table_names)
+        return {
+            name: self._format_table_structure(name, structure) if structure is not None else None
+            for name, structure in structures.items()
+        }
 
     def save_table_comments(self, table_name: str, table_comment: str, column_comments: Dict) -> bool:
         """保存表和字段注释"""
         try:
             table_key = f"{self.database}.{table_name}"
-            self.comments[table_key] = {
-                'table_comment': table_comment,
-                'column_comments': column_comments,
-                'updated_at': datetime.now().isoformat()
-            }
-            self.save_comments()
+            self.comment_store.set(table_key, table_comment, column_comments)
             return True
         except Exception as e:
             print(f"保存注释失败: {e}")
@@ -280,44 +203,40 @@ class ViewDependencyAnalyzer:
 
     def get_all_tables_and_views(self) -> List[Dict]:
         """获取所有表和视图列表"""
-        conn = self.get_connection()
         try:
-            cursor = conn.cursor()
-            query = """
-                SELECT TABLE_NAME, TABLE_TYPE, TABLE_COMMENT
-                FROM information_schema.TABLES
-                WHERE TABLE_SCHEMA = %s
-                ORDER BY TABLE_NAME
-            """
-            cursor.execute(query, (self.database,))
-            results = cursor.fetchall()
-
-            tables_and_views = []
-            for row in results:
-                table_name = row[0]
-                table_type = 'view' if row[1] == 'VIEW' else 'table'
-                table_comment = row[2] or ''
-
-                tables_and_views.append({
-                    'name': table_name,
-                    'type': table_type,
-                    'comment': table_comment
-                })
-
-            return tables_and_views
+            return self.catalog.list_objects()
         except Exception as e:
             print(f"获取表和视图列表失败: {e}")
             return []
-        finally:
-            conn.close()
 
 
 # ==================== 原有 API（修改为使用 get_analyzer）====================
 
+# 进程内 analyzer 注册表：每个配置一个长期存活的实例（持有解密后的连接信息）
+_analyzers: Dict[str, ViewDependencyAnalyzer] = {}
+_analyzers_lock = threading.Lock()
+
+
+def invalidate_analyzer(config_id: str):
+    """
+    移除配置对应的 analyzer（配置被修改或删除时由 ConfigManager 回调）
+
+    Args:
+        config_id: 配置ID
+    """
+    with _analyzers_lock:
+        _analyzers.pop(config_id, None)
+
+
+add_invalidation_listener(invalidate_analyzer)
+
+
 def get_analyzer() -> Optional[ViewDependencyAnalyzer]:
     """
     获取当前会话的 analyzer 实例
 
+    同一配置在进程内复用同一个 analyzer，只在首次使用时解密密码
+
     Returns:
         ViewDependencyAnalyzer 实例，如果没有激活的配置则返回 None
     """
@@ -326,14 +245,24 @@ def get_analyzer() -> Optional[ViewDependencyAnalyzer]:
         return None
 
     config_manager = get_config_manager()
-    config = config_manager.get_config_with_password(config_id)
-    if not config:
-        return None
+    # 其他进程修改/删除了配置时，重新加载并触发 invalidate_analyzer
+    config_manager.reload_if_changed()
+
+    analyzer = _analyzers.get(config_id)
+    if analyzer is None:
+        with _analyzers_lock:
+            analyzer = _analyzers.get(config_id)
+            if analyzer is None:
+                config = config_manager.get_config_with_password(config_id)
+                if not config:
+                    return None
+                analyzer = ViewDependencyAnalyzer(config)
+                _analyzers[config_id] = analyzer
 
     # 更新最后使用时间
     config_manager.update_last_used(config_id)
 
-    return ViewDependencyAnalyzer(config)
+    return analyzer
 
 
 @app.route('/')
@@ -393,6 +322,131 @@ def get_dependencies():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/reverse_dependencies', methods=['POST'])
+def get_reverse_dependencies():
+    """获取直接或间接依赖该对象的所有视图（谁在使用这张表）"""
+    analyzer = get_analyzer()
+    if not analyzer:
+        return jsonify({'error': '请先配置并激活数据库连接'}), 400
+
+    data = request.json or {}
+    object_name = (data.get('object_name') or data.get('view_name') or '').strip()
+    if not object_name:
+        return jsonify({'error': '对象名称不能为空'}), 400
+
+    max_depth = data.get('max_depth')
+    try:
+        max_depth = int(max_depth) if max_depth is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'max_depth 必须为整数'}), 400
+    if max_depth is not None and max_depth < 0:
+        return jsonify({'error': 'max_depth 不能为负数'}), 400
+
+    try:
+        graph = analyzer.graph
+        obj_type = graph.get_object_type(object_name)
+        if not obj_type:
+            return jsonify({'error': f"'{object_name}' 不存在"}), 404
+
+        # 反向邻接表在建图时已预先计算，这里只做内存中的广度优先遍历
+        depths = graph.get_transitive_dependents(object_name, max_depth)
+        dependents = [
+            {'name': name, 'type': graph.get_object_type(name), 'depth': depth}
+            for name, depth in sorted(depths.items(), key=lambda item: (item[1], item[0]))
+        ]
+
+        return jsonify({
+            'success': True,
+            'object_name': object_name,
+            'object_type': obj_type,
+            'dependents': dependents,
+            'total': len(dependents),
+            'max_depth': max(depths.values(), default=0)
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# 影响分析单次请求最多包含的对象数
+MAX_IMPACT_OBJECTS = 1000
+
+# 影响分析的方向：upstream 为上游依赖，downstream 为下游依赖方
+IMPACT_DIRECTIONS = {'both': ('upstream', 'downstream'), 'upstream': ('upstream',), 'downstream': ('downstream',)}
+
+
+def _iter_impact(graph: DependencyGraph, objects: List[str], directions, max_depth: Optional[int]):
+    """按方向逐个产出闭包中的对象（每个方向一次多起点遍历，共享节点只出现一次）"""
+    for direction in directions:
+        for name, depth, via in graph.iter_closure(objects, direction == 'downstream', max_depth):
+            yield {
+                'direction': direction,
+                'name': name,
+                'type': graph.get_object_type(name),
+                'depth': depth,
+                'via': via
+            }
+
+
+@app.route('/api/impact_analysis', methods=['POST'])
+def impact_analysis():
+    """批量影响分析：多个对象的上游 / 下游闭包并集，可用 NDJSON 流式返回"""
+    analyzer = get_analyzer()
+    if not analyzer:
+        return jsonify({'error': '请先配置并激活数据库连接'}), 400
+
+    data = request.json or {}
+    objects = data.get('objects')
+    if not isinstance(objects, list) or not objects:
+        return jsonify({'error': 'objects 必须为非空的对象名列表'}), 400
+    if len(objects) > MAX_IMPACT_OBJECTS:
+        return jsonify({'error': f'单次最多分析 {MAX_IMPACT_OBJECTS} 个对象'}), 400
+    # 去重并保持顺序
+    objects = list(dict.fromkeys(str(name).strip() for name in objects if str(name).strip()))
+
+    directions = IMPACT_DIRECTIONS.get(data.get('direction') or 'both')
+    if directions is None:
+        return jsonify({'error': 'direction 必须为 both / upstream / downstream'}), 400
+
+    max_depth = data.get('max_depth')
+    try:
+        max_depth = int(max_depth) if max_depth is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'max_depth 必须为整数'}), 400
+    if max_depth is not None and max_depth < 0:
+        return jsonify({'error': 'max_depth 不能为负数'}), 400
+
+    try:
+        graph = analyzer.graph
+        found = [name for name in objects if name in graph]
+        missing = [name for name in objects if name not in graph]
+
+        stream = data.get('stream') or 'application/x-ndjson' in request.headers.get('Accept', '')
+        if stream:
+            def generate():
+                yield json.dumps({'kind': 'meta', 'objects': found, 'missing': missing}, ensure_ascii=False) + '\n'
+                totals = dict.fromkeys(directions, 0)
+                for record in _iter_impact(graph, found, directions, max_depth):
+                    totals[record['direction']] += 1
+                    yield json.dumps({'kind': 'node', **record}, ensure_ascii=False) + '\n'
+                yield json.dumps({'kind': 'summary', **totals}) + '\n'
+
+            return Response(iter_chunks(generate()), mimetype='application/x-ndjson')
+
+        result = {direction: [] for direction in directions}
+        for record in _iter_impact(graph, found, directions, max_depth):
+            result[record.pop('direction')].append(record)
+
+        return jsonify({
+            'success': True,
+            'objects': found,
+            'missing': missing,
+            **result,
+            'totals': {direction: len(records) for direction, records in result.items()}
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/table_structure', methods=['POST'])
 def get_table_structure():
     """获取表结构信息"""
@@ -415,6 +469,40 @@ def get_table_structure():
         return jsonify({'error': str(e)}), 500
 
 
+# 单次批量获取表结构的最大对象数
+MAX_STRUCTURE_BATCH = 500
+
+
+@app.route('/api/table_structures', methods=['POST'])
+def get_table_structures():
+    """
+    批量获取表结构信息
+
+    请求体: {"tables": ["t1", "t2", ...]}
+    """
+    analyzer = get_analyzer()
+    if not analyzer:
+        return jsonify({'error': '请先配置并激活数据库连接'}), 400
+
+    data = request.get_json(silent=True) or {}
+    tables = data.get('tables')
+    if not isinstance(tables, list) or not tables:
+        return jsonify({'error': 'tables 必须是非空列表'}), 400
+    tables = [str(name).strip() for name in tables if str(name).strip()]
+    if len(tables) > MAX_STRUCTURE_BATCH:
+        return jsonify({'error': f'单次最多获取 {MAX_STRUCTURE_BATCH} 个对象'}), 400
+
+    try:
+        structures = analyzer.get_table_structures(tables)
+        return jsonify({
+            'success': True,
+            'structures': {name: structure for name, structure in structures.items() if structure is not None},
+            'missing': [name for name, structure in structures.items() if structure is None]
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/save_comments', methods=['POST'])
 def save_comments():
     """保存表和字段注释"""
@@ -551,15 +639,29 @@ def activate_config(config_id):
         session['active_config_id'] = config_id
         config_manager.update_last_used(config_id)
 
+        # 后台预热对象目录、依赖图、搜索索引和表结构，进度通过 /api/configs/<id>/warmup 查询
+        analyzer = get_analyzer()
+        warmup = start_warmup(config_id, analyzer.warmup_stages()) if analyzer else None
+
         return jsonify({
             'success': True,
             'message': '配置已激活',
-            'config': config
+            'config': config,
+            'warmup': warmup.progress() if warmup else None
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/configs/<config_id>/warmup', methods=['GET'])
+def get_warmup_progress(config_id):
+    """获取配置预热任务的进度"""
+    job = get_warmup(config_id)
+    if job is None:
+        return jsonify({'success': False, 'error': '该配置没有预热任务'}), 404
+    return jsonify({'success': True, 'warmup': job.progress()})
+
+
 @app.route('/api/configs/test', methods=['POST'])
 def test_config_connection():
     """测试数据库连接"""
@@ -603,6 +705,40 @@ def get_active_config():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@app.route('/api/pool/stats', methods=['GET'])
+def get_pool_stats():
+    """获取数据库连接池统计信息"""
+    try:
+        config_manager = get_config_manager()
+        pools = []
+        for pool_key, stats in get_pool_manager().stats().items():
+            config = config_manager.get_config(pool_key)
+            pools.append({
+                'config_id': pool_key,
+                'config_name': config['name'] if config else None,
+                **stats
+            })
+        return jsonify({
+            'success': True,
+            'pools': pools
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """获取缓存命中/淘汰统计"""
+    return jsonify({
+        'success': True,
+        'cache': get_cache().stats(),
+        'parse_cache': get_parse_cache().stats(),
+        'render': get_render_pool().stats(),
+        'watchers': [watcher.stats() for watcher in list_metadata_watchers()],
+        'structures': [cache.stats() for cache in list_structure_caches()]
+    })
+
+
 @app.route('/api/search_tables', methods=['GET'])
 def search_tables():
     """搜索表和视图 - 支持表名和注释模糊搜索"""
@@ -612,73 +748,323 @@ def search_tables():
 
     query = request.args.get('q', '').strip()
     limit = request.args.get('limit', 20, type=int)  # 默认返回20条
+    offset = request.args.get('offset', 0, type=int)
 
     try:
-        # 获取所有表和视图
-        tables_and_views = analyzer.get_all_tables_and_views()
-
-        # 加载自定义注释并合并
-        custom_comments = analyzer.comments
-        for item in tables_and_views:
-            table_key = f"{analyzer.database}.{item['name']}"
-            if table_key in custom_comments:
-                # 优先使用自定义注释
-                custom_comment = custom_comments[table_key].get('table_comment', '')
-                if custom_comment:
-                    item['comment'] = custom_comment
-                    item['comment_source'] = 'custom'
-                else:
-                    item['comment_source'] = 'db'
-            else:
-                item['comment_source'] = 'db'
-
-        # 如果有搜索关键词，进行过滤和评分
-        if query:
-            filtered = []
-            query_lower = query.lower()
-
-            for item in tables_and_views:
-                # 搜索表名（英文）
-                name_match = query_lower in item['name'].lower()
-
-                # 搜索注释（中文或英文）
-                comment_match = query in item['comment'] if item['comment'] else False
-
-                if name_match or comment_match:
-                    # 计算匹配度分数（用于排序）
-                    score = 0
-                    if item['name'].lower().startswith(query_lower):
-                        score += 100  # 表名前缀匹配优先级最高
-                    elif name_match:
-                        score += 50   # 表名包含匹配
-
-                    if comment_match:
-                        if item['comment'].startswith(query):
-                            score += 30  # 注释前缀匹配
-                        else:
-                            score += 10  # 注释包含匹配
-
-                    item['match_score'] = score
-                    filtered.append(item)
-
-            # 按匹配度排序
-            filtered.sort(key=lambda x: x['match_score'], reverse=True)
-
-            # 限制返回数量
-            filtered = filtered[:limit]
-        else:
-            filtered = tables_and_views[:limit]
+        # 在内存索引中检索（自定义注释已合并），不再扫描 information_schema
+        results, has_more = analyzer.search_index.search(query, limit, offset)
 
         return jsonify({
             'success': True,
-            'results': filtered,
-            'total': len(filtered),
-            'has_more': len(tables_and_views) > limit if not query else False
+            'results': results,
+            'total': len(results),
+            'offset': offset,
+            'has_more': has_more
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+# ==================== 导出 API ====================
+
+# 支持导出的图片格式
+IMAGE_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+def _parse_export_request():
+    """
+    解析导出请求参数
+
+    Returns:
+        (analyzer, root_object, max_depth, 错误响应)，参数合法时错误响应为 None
+    """
+    analyzer = get_analyzer()
+    if not analyzer:
+        return None, None, None, (jsonify({'error': '请先配置并激活数据库连接'}), 400)
+
+    data = request.json or {}
+    root_object = (data.get('root_object') or '').strip()
+    if not root_object:
+        return None, None, None, (jsonify({'error': '对象名称不能为空'}), 400)
+
+    max_depth = data.get('max_depth')
+    if max_depth is not None:
+        try:
+            max_depth = int(max_depth)
+        except (TypeError, ValueError):
+            return None, None, None, (jsonify({'error': 'max_depth 必须为整数'}), 400)
+        if max_depth <= 0:
+            max_depth = None
+
+    if not analyzer.get_object_type(root_object):
+        return None, None, None, (jsonify({'error': f"'{root_object}' 不存在"}), 404)
+
+    return analyzer, root_object, max_depth, None
+
+
+@app.route('/api/export/mermaid', methods=['POST'])
+def export_mermaid():
+    """导出 Mermaid 代码"""
+    analyzer, root_object, max_depth, error = _parse_export_request()
+    if error:
+        return error
+
+    try:
+        code = ExportManager(analyzer).export_mermaid(root_object, max_depth)
+        return jsonify({'success': True, 'code': code})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def _export_error_response(e: Exception):
+    """导出异常对应的响应：渲染队列已满 503，渲染超时 504，渲染失败 422，其余 500"""
+    if isinstance(e, RenderQueueFullError):
+        status = 503
+    elif isinstance(e, RenderTimeoutError):
+        status = 504
+    elif isinstance(e, RenderError):
+        status = 422
+    else:
+        status = 500
+    return jsonify({'error': str(e)}), status
+
+
+@app.route('/api/export/image', methods=['POST'])
+def export_image():
+    """导出 PNG / SVG 图片"""
+    analyzer, root_object, max_depth, error = _parse_export_request()
+    if error:
+        return error
+
+    image_format = (request.json.get('format') or 'png').lower()
+    if image_format not in IMAGE_FORMATS:
+        return jsonify({'error': f'不支持的图片格式: {image_format}'}), 400
+
+    try:
+        data = ExportManager(analyzer).export_image(root_object, image_format, max_depth)
+        return send_file(
+            io.BytesIO(data),
+            mimetype=IMAGE_FORMATS[image_format],
+            as_attachment=True,
+            download_name=f'{root_object}_dependencies.{image_format}'
+        )
+    except Exception as e:
+        return _export_error_response(e)
+
+
+@app.route('/api/export/json', methods=['POST'])
+def export_json():
+    """导出 JSON 格式的依赖树"""
+    analyzer, root_object, max_depth, error = _parse_export_request()
+    if error:
+        return error
+
+    try:
+        return jsonify(ExportManager(analyzer).export_json(root_object, max_depth))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/export/stream', methods=['POST'])
+def export_stream():
+    """流式导出 Mermaid / DOT 文本（适用于整库等超大依赖图，边遍历边发送）"""
+    analyzer, root_object, max_depth, error = _parse_export_request()
+    if error:
+        return error
+
+    export_format = (request.json.get('format') or 'mermaid').lower()
+    if export_format not in STREAM_FORMATS:
+        return jsonify({'error': f'不支持的流式导出格式: {export_format}'}), 400
+
+    # 生成器在请求上下文之外执行，所需对象在此之前全部取好
+    chunks = ExportManager(analyzer).stream(root_object, export_format, max_depth)
+    extension = 'mmd' if export_format == 'mermaid' else 'dot'
+    return Response(
+        chunks,
+        mimetype='text/plain; charset=utf-8',
+        headers={'Content-Disposition': f'attachment; filename="{root_object}_dependencies.{extension}"'}
+    )
+
+
+@app.route('/api/export/bundle', methods=['POST'])
+def export_bundle():
+    """一次请求导出多种格式（mmd / dot / svg / png / json）的 zip 压缩包"""
+    analyzer, root_object, max_depth, error = _parse_export_request()
+    if error:
+        return error
+
+    try:
+        formats = request.json.get('formats') or list(BUNDLE_FORMATS)
+        if not isinstance(formats, list) or not all(isinstance(fmt, str) for fmt in formats):
+            return jsonify({'error': 'formats 必须是字符串列表'}), 400
+        # 重复的格式只导出一次，保持请求中的顺序
+        formats = list(dict.fromkeys(formats))
+        unknown = [fmt for fmt in formats if fmt not in BUNDLE_FORMATS]
+        if unknown:
+            return jsonify({'error': f"不支持的导出格式: {', '.join(unknown)}"}), 400
+
+        data = ExportManager(analyzer).export_bundle(root_object, max_depth, formats)
+        return send_file(
+            io.BytesIO(data),
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name=f'{root_object}_dependencies.zip'
+        )
+    except Exception as e:
+        return _export_error_response(e)
+
+
+# ==================== 元数据 API ====================
+
+def _parse_snapshot_id(value) -> Optional[int]:
+    """解析客户端上次看到的快照ID（缺省或非法时返回 None，即需要完整列表）"""
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+@app.route('/api/metadata/snapshot', methods=['GET'])
+def get_metadata_snapshot():
+    """获取最新元数据快照的ID和校验和（full=1 时附带完整的表/视图列表）"""
+    analyzer = get_analyzer()
+    if not analyzer:
+        return jsonify({'error': '请先配置并激活数据库连接'}), 400
+
+    try:
+        store = get_snapshot_store(analyzer.config)
+        store.check()
+        snapshot_id, snapshot = store.current()
+        result = {
+            'success': True,
+            'snapshot_id': snapshot_id,
+            'database': snapshot['database'],
+            'checksum': snapshot['checksum'],
+            'timestamp': snapshot['timestamp'],
+            'table_count': len(snapshot['tables']),
+            'view_count': len(snapshot['views']),
+            'total_count': snapshot['total_count']
+        }
+        if request.args.get('full') in ('1', 'true'):
+            result['tables'] = snapshot['tables']
+            result['views'] = snapshot['views']
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/metadata/changes', methods=['POST'])
+def get_metadata_changes():
+    """
+    检测元数据变化，只返回客户端快照ID（since）之后的增量
+
+    请求体: {"since": 12}，省略 since 或快照已超出保留范围时返回完整列表（reset=true）
+    """
+    analyzer = get_analyzer()
+    if not analyzer:
+        return jsonify({'error': '请先配置并激活数据库连接'}), 400
+
+    try:
+        data = request.get_json(silent=True) or {}
+        store = get_snapshot_store(analyzer.config)
+        store.check()
+        return jsonify({'success': True, **store.changes_since(_parse_snapshot_id(data.get('since')))})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/metadata/refresh', methods=['POST'])
+def refresh_metadata():
+    """立即查询数据库并记录新快照（忽略轮询最小间隔），返回 since 之后的增量"""
+    analyzer = get_analyzer()
+    if not analyzer:
+        return jsonify({'error': '请先配置并激活数据库连接'}), 400
+
+    try:
+        data = request.get_json(silent=True) or {}
+        store = get_snapshot_store(analyzer.config)
+        store.check(force=True)
+        return jsonify({'success': True, **store.changes_since(_parse_snapshot_id(data.get('since')))})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# SSE 心跳间隔（秒），用于及时发现已断开的连接
+SSE_HEARTBEAT_INTERVAL = 15
+
+
+def _sse_event(event: str, snapshot_id: int, data: Dict) -> str:
+    """格式化一条 SSE 事件（id 为快照ID，浏览器重连时通过 Last-Event-ID 带回）"""
+    return f"id: {snapshot_id}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _iter_metadata_events(watcher, since: Optional[int]):
+    """
+    单个 SSE 连接的事件流：连接时补发 since 之后的增量，之后每次被监视器唤醒时发送新的增量
+
+    Args:
+        watcher: MetadataWatcher 实例
+        since: 客户端最后看到的快照ID，None 表示只需要当前快照ID
+    """
+    store = watcher.store
+    subscriber = watcher.subscribe()
+    try:
+        yield "retry: 5000\n\n"
+        last_id = since if since and since > 0 else None
+        while not watcher.stopped:
+            snapshot_id, _ = store.current()
+            if last_id is None or snapshot_id <= 0:
+                # 首次连接（或尚未记录快照）只同步快照ID，不把整库对象当作变化推送
+                if snapshot_id > 0:
+                    last_id = snapshot_id
+                    yield _sse_event('snapshot', snapshot_id, {'snapshot_id': snapshot_id})
+            elif snapshot_id != last_id:
+                changes = store.changes_since(last_id)
+                last_id = changes['snapshot_id']
+                yield _sse_event('changes', last_id, changes)
+
+            try:
+                subscriber.get(timeout=SSE_HEARTBEAT_INTERVAL)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+    finally:
+        watcher.unsubscribe(subscriber)
+
+
+@app.route('/api/metadata/events', methods=['GET'])
+def metadata_events():
+    """
+    元数据变化推送（Server-Sent Events）
+
+    同一配置的所有连接共用一个后台监视线程，每个检测间隔只查询一次数据库
+    """
+    analyzer = get_analyzer()
+    if not analyzer:
+        return jsonify({'error': '请先配置并激活数据库连接'}), 400
+
+    since = _parse_snapshot_id(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    watcher = get_metadata_watcher(analyzer.config)
+    return Response(
+        _iter_metadata_events(watcher, since),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/metadata/objects', methods=['GET'])
+def get_metadata_objects():
+    """获取所有表和视图（来自对象目录）"""
+    analyzer = get_analyzer()
+    if not analyzer:
+        return jsonify({'error': '请先配置并激活数据库连接'}), 400
+
+    try:
+        objects = analyzer.catalog.list_objects()
+        return jsonify({'success': True, 'objects': objects, 'total': len(objects)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 if __name__ == '__main__':
     print("=" * 60)
     print("StarRocks 视图依赖关系 Web 分析工具")